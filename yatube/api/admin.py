@@ -0,0 +1,14 @@
+from django.contrib import admin
+
+from .models import Token
+
+
+@admin.register(Token)
+class TokenAdmin(admin.ModelAdmin):
+    list_display = (
+        "user",
+        "key",
+        "created",
+    )
+    search_fields = ("user__username",)
+    raw_id_fields = ("user",)
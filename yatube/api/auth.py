@@ -0,0 +1,39 @@
+"""Аутентификация запросов к API.
+
+Клиенты передают токен в заголовке ``Authorization: Token <key>``.
+Без заголовка действует обычная сессия сайта, но тогда изменяющие
+запросы, как и формы сайта, проверяются на CSRF.
+"""
+from django.middleware.csrf import CsrfViewMiddleware
+
+from .exceptions import ApiError
+from .models import Token
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def _check_csrf(request):
+    # Сама вьюха помечена csrf_exempt, поэтому проверяем вручную.
+    def callback(request):
+        pass
+
+    rejected = CsrfViewMiddleware().process_view(request, callback, (), {})
+    if rejected is not None:
+        raise ApiError(403, "Ошибка проверки CSRF.")
+
+
+def authenticate(request):
+    header = request.META.get("HTTP_AUTHORIZATION", "")
+    if header:
+        scheme, _, key = header.partition(" ")
+        if scheme.lower() != "token" or not key:
+            raise ApiError(401, "Неверный заголовок Authorization.")
+        token = Token.objects.select_related("user").filter(
+            key=key.strip()
+        ).first()
+        if token is None or not token.user.is_active:
+            raise ApiError(401, "Неверный токен.")
+        request.user = token.user
+        return
+    if request.method not in SAFE_METHODS and request.user.is_authenticated:
+        _check_csrf(request)
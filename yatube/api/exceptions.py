@@ -0,0 +1,8 @@
+class ApiError(Exception):
+    """Ошибка, которая отдаётся клиенту как {"detail": ...}."""
+
+    def __init__(self, status, detail, errors=None):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+        self.errors = errors
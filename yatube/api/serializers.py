@@ -0,0 +1,75 @@
+"""Превращение моделей в словари для ответов API.
+
+Для каждой модели описан набор полей: имя -> функция от объекта.
+Параметр ?fields= выбирает подмножество полей, и вычисляются только они.
+Функции берут связанные объекты только из select_related/prefetch,
+поэтому число запросов не зависит от длины страницы.
+"""
+from .exceptions import ApiError
+
+
+def _image_url(post):
+    return post.image.url if post.image else None
+
+
+def _thumbnail_url(post):
+    return post.thumbnail.url if post.thumbnail else None
+
+
+POST_FIELDS = {
+    "id": lambda post: post.pk,
+    "text": lambda post: post.text,
+    "pub_date": lambda post: post.pub_date.isoformat(),
+    "author": lambda post: post.author.username,
+    "group": lambda post: post.group.slug if post.group_id else None,
+    "image": _image_url,
+    "thumbnail": _thumbnail_url,
+    "comments_count": lambda post: post.comments_count,
+}
+
+GROUP_FIELDS = {
+    "id": lambda group: group.pk,
+    "title": lambda group: group.title,
+    "slug": lambda group: group.slug,
+    "description": lambda group: group.description,
+}
+
+COMMENT_FIELDS = {
+    "id": lambda comment: comment.pk,
+    "post": lambda comment: comment.post_id,
+    "author": lambda comment: comment.author.username,
+    "text": lambda comment: comment.text,
+    "created": lambda comment: comment.created.isoformat(),
+    "parent": lambda comment: comment.parent_id,
+    "replies_count": lambda comment: comment.replies_count,
+}
+
+FOLLOW_FIELDS = {
+    "user": lambda follow: follow.user.username,
+    "author": lambda follow: follow.author.username,
+}
+
+
+def select_fields(request, available):
+    """Поля из ?fields=a,b в порядке описания; без параметра — все."""
+    requested = request.GET.get("fields")
+    if not requested:
+        return list(available)
+    names = {name.strip() for name in requested.split(",") if name.strip()}
+    unknown = names - set(available)
+    if unknown:
+        raise ApiError(
+            400, "Неизвестные поля: " + ", ".join(sorted(unknown))
+        )
+    return [name for name in available if name in names]
+
+
+def serialize(obj, available, fields):
+    return {name: available[name](obj) for name in fields}
+
+
+def serialize_many(objects, available, fields):
+    getters = [(name, available[name]) for name in fields]
+    return [
+        {name: getter(obj) for name, getter in getters} for obj in objects
+    ]
@@ -0,0 +1,254 @@
+import json
+import shutil
+import tempfile
+from http import HTTPStatus
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from django.urls import reverse
+from PIL import Image
+
+from posts.models import Comment, Follow, Group, Post, User
+
+from .models import Token
+
+
+class ApiTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="auth", password="pass")
+        cls.other = User.objects.create_user(username="other")
+        cls.group = Group.objects.create(
+            title="Группа", slug="group", description="Описание"
+        )
+        cls.token = Token.objects.create(user=cls.user)
+
+    def setUp(self):
+        self.client = Client(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        self.guest = Client()
+
+    def send(self, method, url, data=None, client=None):
+        client = client or self.client
+        return getattr(client, method)(
+            url, json.dumps(data or {}), content_type="application/json"
+        )
+
+
+class PostApiTests(ApiTestCase):
+    def test_list_constant_queries(self):
+        """Число запросов не зависит от числа постов на странице."""
+        Post.objects.bulk_create(
+            Post(text=f"Пост {i}", author=self.user, group=self.group)
+            for i in range(30)
+        )
+        url = reverse("api:post_list")
+        with self.assertNumQueries(1):
+            response = self.guest.get(url, {"limit": 25})
+        self.assertEqual(len(response.json()["results"]), 25)
+
+    def test_cursor_pagination(self):
+        posts = [
+            Post.objects.create(text=f"Пост {i}", author=self.user)
+            for i in range(5)
+        ]
+        url = reverse("api:post_list")
+        first = self.guest.get(url, {"limit": 3}).json()
+        self.assertEqual(
+            [post["id"] for post in first["results"]],
+            [post.pk for post in posts[:1:-1]],
+        )
+        self.assertIsNone(first["previous"])
+        second = self.guest.get(first["next"]).json()
+        self.assertEqual(
+            [post["id"] for post in second["results"]],
+            [posts[1].pk, posts[0].pk],
+        )
+        self.assertIsNone(second["next"])
+
+    def test_sparse_fields(self):
+        Post.objects.create(text="Пост", author=self.user, group=self.group)
+        url = reverse("api:post_list")
+        response = self.guest.get(url, {"fields": "text,group"})
+        self.assertEqual(
+            response.json()["results"], [{"text": "Пост", "group": "group"}]
+        )
+        response = self.guest.get(url, {"fields": "text,password"})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+    def test_filters(self):
+        Post.objects.create(
+            text="В группе", author=self.user, group=self.group
+        )
+        Post.objects.create(text="Чужой", author=self.other)
+        url = reverse("api:post_list")
+        by_group = self.guest.get(url, {"group": "group", "fields": "text"})
+        by_author = self.guest.get(url, {"author": "other", "fields": "text"})
+        self.assertEqual(by_group.json()["results"], [{"text": "В группе"}])
+        self.assertEqual(by_author.json()["results"], [{"text": "Чужой"}])
+
+    def test_create_with_token(self):
+        response = self.send(
+            "post", reverse("api:post_list"),
+            {"text": "Из API", "group": "group"},
+        )
+        self.assertEqual(response.status_code, HTTPStatus.CREATED)
+        post = Post.objects.get(text="Из API")
+        self.assertEqual(post.author, self.user)
+        self.assertEqual(post.group, self.group)
+        self.assertEqual(response.json()["id"], post.pk)
+
+    def test_create_validation(self):
+        response = self.send("post", reverse("api:post_list"), {"text": ""})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertIn("text", response.json()["errors"])
+        response = self.send(
+            "post", reverse("api:post_list"), {"text": "Т", "group": "none"}
+        )
+        self.assertIn("group", response.json()["errors"])
+
+    def test_anonymous_cannot_write(self):
+        response = self.send(
+            "post", reverse("api:post_list"), {"text": "Т"}, self.guest
+        )
+        self.assertEqual(response.status_code, HTTPStatus.UNAUTHORIZED)
+        bad_token = Client(HTTP_AUTHORIZATION="Token nope")
+        response = bad_token.get(reverse("api:post_list"))
+        self.assertEqual(response.status_code, HTTPStatus.UNAUTHORIZED)
+
+    def test_session_write_needs_csrf(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        response = self.send(
+            "post", reverse("api:post_list"), {"text": "Т"}, client
+        )
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
+
+    def test_patch_and_delete_by_author(self):
+        post = Post.objects.create(
+            text="Пост", author=self.user, group=self.group
+        )
+        url = reverse("api:post_detail", args=[post.pk])
+        response = self.send("patch", url, {"text": "Изменён"})
+        self.assertEqual(response.json()["text"], "Изменён")
+        self.assertEqual(response.json()["group"], "group")
+        foreign = Post.objects.create(text="Чужой", author=self.other)
+        response = self.send(
+            "delete", reverse("api:post_detail", args=[foreign.pk])
+        )
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
+        response = self.send("delete", url)
+        self.assertEqual(response.status_code, HTTPStatus.NO_CONTENT)
+        self.assertFalse(Post.objects.filter(pk=post.pk).exists())
+        response = self.guest.get(url)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+        self.assertEqual(response.json(), {"detail": "Не найдено."})
+
+    def test_patch_replaces_image(self):
+        """PATCH в multipart заменяет картинку поста."""
+        media_root = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        post = Post.objects.create(text="Пост", author=self.user)
+        image = BytesIO()
+        Image.new("RGB", (20, 10), "green").save(image, "PNG")
+        with override_settings(MEDIA_ROOT=media_root):
+            response = self.client.patch(
+                reverse("api:post_detail", args=[post.pk]),
+                encode_multipart(BOUNDARY, {
+                    "text": "С картинкой",
+                    "image": SimpleUploadedFile("new.png", image.getvalue()),
+                }),
+                content_type=MULTIPART_CONTENT,
+            )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        post.refresh_from_db()
+        self.assertEqual(post.text, "С картинкой")
+        self.assertTrue(post.image.name.endswith(".png"))
+
+
+class CommentGroupFollowApiTests(ApiTestCase):
+    def test_comments(self):
+        post = Post.objects.create(text="Пост", author=self.other)
+        url = reverse("api:comment_list", args=[post.pk])
+        response = self.send("post", url, {"text": "Коммент"})
+        self.assertEqual(response.status_code, HTTPStatus.CREATED)
+        Comment.objects.create(post=post, author=self.other, text="Второй")
+        with self.assertNumQueries(3):
+            response = self.client.get(url, {"fields": "author,text"})
+        self.assertEqual(response.json()["results"], [
+            {"author": "other", "text": "Второй"},
+            {"author": "auth", "text": "Коммент"},
+        ])
+
+    def test_groups(self):
+        response = self.guest.get(reverse("api:group_list"))
+        self.assertEqual(response.json()["results"][0]["slug"], "group")
+        response = self.guest.get(reverse("api:group_detail", args=["group"]))
+        self.assertEqual(response.json()["title"], "Группа")
+
+    def test_groups_paginated(self):
+        Group.objects.create(title="Архив", slug="archive")
+        Group.objects.create(title="Вести", slug="news")
+        url = reverse("api:group_list")
+        first = self.guest.get(url, {"limit": 2}).json()
+        self.assertEqual(
+            [group["slug"] for group in first["results"]], ["archive", "news"]
+        )
+        second = self.guest.get(first["next"]).json()
+        self.assertEqual(
+            [group["slug"] for group in second["results"]], ["group"]
+        )
+        self.assertIsNone(second["next"])
+
+    def test_follows_paginated(self):
+        for name in ("b-author", "a-author", "c-author"):
+            Follow.objects.create(
+                user=self.user,
+                author=User.objects.create_user(username=name),
+            )
+        url = reverse("api:follow_list")
+        first = self.client.get(url, {"limit": 2}).json()
+        self.assertEqual(
+            [follow["author"] for follow in first["results"]],
+            ["a-author", "b-author"],
+        )
+        second = self.client.get(first["next"]).json()
+        self.assertEqual(
+            [follow["author"] for follow in second["results"]], ["c-author"]
+        )
+        previous = self.client.get(second["previous"]).json()
+        self.assertEqual(previous["results"], first["results"])
+
+    def test_follow(self):
+        url = reverse("api:follow_list")
+        response = self.send("post", url, {"author": "other"})
+        self.assertEqual(response.status_code, HTTPStatus.CREATED)
+        self.assertTrue(
+            Follow.objects.filter(user=self.user, author=self.other).exists()
+        )
+        response = self.send("post", url, {"author": "auth"})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertEqual(
+            self.client.get(url).json()["results"],
+            [{"user": "auth", "author": "other"}],
+        )
+        response = self.send(
+            "delete", reverse("api:follow_detail", args=["other"])
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NO_CONTENT)
+        self.assertFalse(Follow.objects.exists())
+
+    def test_obtain_token(self):
+        response = self.send(
+            "post", reverse("api:token"),
+            {"username": "auth", "password": "pass"}, self.guest,
+        )
+        self.assertEqual(response.json(), {"token": self.token.key})
+        response = self.send(
+            "post", reverse("api:token"),
+            {"username": "auth", "password": "wrong"}, self.guest,
+        )
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
@@ -0,0 +1,29 @@
+from django.urls import path
+
+from . import views
+
+app_name = "api"
+
+urlpatterns = [
+    path("token/", views.obtain_token, name="token"),
+    path("posts/", views.post_list, name="post_list"),
+    path("posts/<int:post_id>/", views.post_detail, name="post_detail"),
+    path(
+        "posts/<int:post_id>/comments/",
+        views.comment_list,
+        name="comment_list"
+    ),
+    path(
+        "posts/<int:post_id>/comments/<int:comment_id>/",
+        views.comment_detail,
+        name="comment_detail"
+    ),
+    path("groups/", views.group_list, name="group_list"),
+    path("groups/<slug:slug>/", views.group_detail, name="group_detail"),
+    path("follow/", views.follow_list, name="follow_list"),
+    path(
+        "follow/<str:username>/",
+        views.follow_detail,
+        name="follow_detail"
+    ),
+]
@@ -0,0 +1,307 @@
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.contrib import auth as django_auth
+from django.db.models import F
+from django.http import Http404, HttpResponse, QueryDict
+from django.http.multipartparser import MultiPartParserError
+from django.shortcuts import get_object_or_404
+from django.views.decorators.csrf import csrf_exempt
+
+from posts import comments, thumbnails
+from posts.forms import CommentForm, PostForm
+from posts.models import Comment, Follow, Group, Post, User
+from posts.paginators import CursorPaginator
+
+from . import serializers
+from .auth import SAFE_METHODS, authenticate
+from .encoding import JSONResponse
+from .exceptions import ApiError
+from .models import Token
+
+
+def api_view(*methods, anonymous_writes=False):
+    """Оборачивает функцию (request, ...) -> данные в JSON-эндпоинт.
+
+    Проверяет метод и аутентификацию, а ApiError и Http404 превращает
+    в ответы с кодом ошибки. Изменяющие методы требуют пользователя,
+    если не передан anonymous_writes.
+    """
+    def decorator(view):
+        @csrf_exempt
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            try:
+                if request.method not in methods:
+                    raise ApiError(405, "Метод не поддерживается.")
+                authenticate(request)
+                if not (
+                    anonymous_writes
+                    or request.method in SAFE_METHODS
+                    or request.user.is_authenticated
+                ):
+                    raise ApiError(401, "Нужна аутентификация.")
+                result = view(request, *args, **kwargs)
+            except ApiError as error:
+                data = {"detail": error.detail}
+                if error.errors is not None:
+                    data["errors"] = error.errors
+                return JSONResponse(data, status=error.status)
+            except Http404:
+                return JSONResponse({"detail": "Не найдено."}, status=404)
+            if result is None:
+                return HttpResponse(status=204)
+            status, data = result if isinstance(result, tuple) else (
+                200, result
+            )
+            return JSONResponse(data, status=status)
+        return wrapper
+    return decorator
+
+
+def _request_data(request):
+    """Тело запроса: JSON-объект или обычная форма."""
+    if request.content_type == "application/json":
+        try:
+            data = json.loads(request.body or b"{}")
+        except ValueError:
+            raise ApiError(400, "Тело запроса — не JSON.")
+        if not isinstance(data, dict):
+            raise ApiError(400, "Ожидается JSON-объект.")
+        return data
+    if request.method == "POST":
+        return request.POST.dict()
+    return QueryDict(request.body).dict()
+
+
+def _request_upload(request):
+    """Данные и файлы формы поста.
+
+    Django разбирает multipart только у POST, поэтому у PUT и PATCH
+    тело с картинкой разбирается здесь, теми же обработчиками загрузки.
+    """
+    if request.method == "POST" or request.content_type != (
+        "multipart/form-data"
+    ):
+        return _request_data(request), request.FILES
+    try:
+        data, files = request.parse_file_upload(request.META, request)
+    except MultiPartParserError:
+        raise ApiError(400, "Неверное тело multipart.")
+    return data.dict(), files
+
+
+def _form_errors(form):
+    return ApiError(
+        400,
+        "Неверные данные.",
+        {field: list(errors) for field, errors in form.errors.items()},
+    )
+
+
+def _page_size(request):
+    try:
+        size = int(request.GET.get("limit", settings.API_PAGE_SIZE))
+    except ValueError:
+        raise ApiError(400, "limit должен быть числом.")
+    return max(1, min(size, settings.API_MAX_PAGE_SIZE))
+
+
+def _page_link(request, cursor):
+    if cursor is None:
+        return None
+    params = request.GET.copy()
+    params["cursor"] = cursor
+    return request.build_absolute_uri("?" + params.urlencode())
+
+
+def _paginate(request, queryset, available, date_field="pub_date",
+              **options):
+    fields = serializers.select_fields(request, available)
+    page = CursorPaginator(
+        queryset, _page_size(request), date_field, **options
+    ).get_page(request.GET.get("cursor"))
+    return {
+        "results": serializers.serialize_many(page, available, fields),
+        "next": _page_link(request, page.next_cursor),
+        "previous": _page_link(request, page.previous_cursor),
+    }
+
+
+def _serialize(request, obj, available):
+    fields = serializers.select_fields(request, available)
+    return serializers.serialize(obj, available, fields)
+
+
+@api_view("POST", anonymous_writes=True)
+def obtain_token(request):
+    data = _request_data(request)
+    user = django_auth.authenticate(
+        request,
+        username=data.get("username"),
+        password=data.get("password"),
+    )
+    if user is None:
+        raise ApiError(400, "Неверное имя пользователя или пароль.")
+    token, _ = Token.objects.get_or_create(user=user)
+    return {"token": token.key}
+
+
+def _post_form_data(data, post=None):
+    """Данные для PostForm: группа задаётся slug, PATCH дополняет пост."""
+    if post is not None:
+        data = {"text": post.text, "group": post.group_id, **data}
+    group = data.get("group")
+    if isinstance(group, str) and group:
+        group_id = Group.objects.filter(slug=group).values_list(
+            "pk", flat=True
+        ).first()
+        if group_id is None:
+            raise ApiError(
+                400, "Неверные данные.", {"group": ["Нет такой группы."]}
+            )
+        data["group"] = group_id
+    return data
+
+
+@api_view("GET", "POST")
+def post_list(request):
+    if request.method == "POST":
+        data, files = _request_upload(request)
+        form = PostForm(_post_form_data(data), files=files or None)
+        if not form.is_valid():
+            raise _form_errors(form)
+        post = form.save(commit=False)
+        post.author = request.user
+        post.save()
+        thumbnails.schedule(post)
+        return 201, _serialize(request, post, serializers.POST_FIELDS)
+    posts = Post.objects.for_feed()
+    if "group" in request.GET:
+        posts = posts.filter(group__slug=request.GET["group"])
+    if "author" in request.GET:
+        posts = posts.filter(author__username=request.GET["author"])
+    return _paginate(request, posts, serializers.POST_FIELDS)
+
+
+@api_view("GET", "PUT", "PATCH", "DELETE")
+def post_detail(request, post_id):
+    post = get_object_or_404(Post.objects.for_feed(), pk=post_id)
+    if request.method == "GET":
+        return _serialize(request, post, serializers.POST_FIELDS)
+    if post.author_id != request.user.pk:
+        raise ApiError(403, "Изменять пост может только автор.")
+    if request.method == "DELETE":
+        post.delete()
+        return None
+    data, files = _request_upload(request)
+    form = PostForm(
+        _post_form_data(data, post if request.method == "PATCH" else None),
+        files=files or None,
+        instance=post,
+    )
+    if not form.is_valid():
+        raise _form_errors(form)
+    post = form.save(commit=False)
+    image_changed = "image" in form.changed_data
+    if image_changed:
+        post.thumbnail = ""
+        post.image_variants = ""
+    post.save()
+    if image_changed:
+        thumbnails.schedule(post)
+    post = Post.objects.for_feed().get(pk=post.pk)
+    return _serialize(request, post, serializers.POST_FIELDS)
+
+
+@api_view("GET")
+def group_list(request):
+    # По алфавиту; ключ курсора — (название, id).
+    return _paginate(
+        request, Group.objects.all(), serializers.GROUP_FIELDS, "title",
+        ascending=True, parse_key=str,
+    )
+
+
+@api_view("GET")
+def group_detail(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return _serialize(request, group, serializers.GROUP_FIELDS)
+
+
+@api_view("GET", "POST")
+def comment_list(request, post_id):
+    post = get_object_or_404(Post.objects.only("pk"), pk=post_id)
+    if request.method == "POST":
+        data = _request_data(request)
+        form = CommentForm(data)
+        if not form.is_valid():
+            raise _form_errors(form)
+        comment = form.save(commit=False)
+        comment.author = request.user
+        comment.post = post
+        comment.parent_id = comments.resolve_parent(
+            post.pk, data.get("parent")
+        )
+        comment.save()
+        return 201, _serialize(request, comment, serializers.COMMENT_FIELDS)
+    post_comments = Comment.objects.with_related().filter(post=post)
+    return _paginate(
+        request, post_comments, serializers.COMMENT_FIELDS, "created"
+    )
+
+
+@api_view("GET", "DELETE")
+def comment_detail(request, post_id, comment_id):
+    comment = get_object_or_404(
+        Comment.objects.with_related(), pk=comment_id, post_id=post_id
+    )
+    if request.method == "GET":
+        return _serialize(request, comment, serializers.COMMENT_FIELDS)
+    if comment.author_id != request.user.pk:
+        raise ApiError(403, "Удалять комментарий может только автор.")
+    comment.delete()
+    return None
+
+
+@api_view("GET", "POST")
+def follow_list(request):
+    if not request.user.is_authenticated:
+        raise ApiError(401, "Нужна аутентификация.")
+    if request.method == "POST":
+        username = _request_data(request).get("author")
+        author = User.objects.filter(username=username).first()
+        if author is None:
+            raise ApiError(
+                400, "Неверные данные.", {"author": ["Нет такого автора."]}
+            )
+        if author == request.user:
+            raise ApiError(
+                400,
+                "Неверные данные.",
+                {"author": ["Нельзя подписаться на себя."]},
+            )
+        follow, created = Follow.objects.get_or_create(
+            user=request.user, author=author
+        )
+        data = _serialize(request, follow, serializers.FOLLOW_FIELDS)
+        return (201 if created else 200), data
+    follows = Follow.objects.filter(user=request.user).select_related(
+        "user", "author"
+    ).annotate(author_username=F("author__username"))
+    # По имени автора; ключ курсора — (имя автора, id подписки).
+    return _paginate(
+        request, follows, serializers.FOLLOW_FIELDS, "author_username",
+        ascending=True, parse_key=str,
+    )
+
+
+@api_view("DELETE")
+def follow_detail(request, username):
+    deleted, _ = Follow.objects.filter(
+        user=request.user, author__username=username
+    ).delete()
+    if not deleted:
+        raise Http404
+    return None
@@ -0,0 +1,78 @@
+"""Сопрограммы поверх синхронного ORM и кеша Django 2.2.
+
+run_in_thread() выполняет блокирующий вызов в общем пуле потоков, так
+что независимые запросы к базе и кешу одной страницы идут параллельно
+через asyncio.gather(). async_view() превращает представление-
+сопрограмму в обычное представление Django: под ASGI (core.asgi) она
+выполняется в цикле сервера, под WSGI — в собственном цикле запроса.
+
+Это только параллельная выборка, а не экономия потоков: поток
+обработчика (ASGI_THREADS) ждёт результата сопрограммы, а каждый вызов
+run_in_thread() занимает ещё поток пула ASYNC_DB_THREADS со своим
+соединением с базой. Асинхронная страница выигрывает во времени ответа,
+но держит больше потоков и соединений, чем синхронная; пул общий для
+всех запросов процесса, поэтому соединений не больше ASGI_THREADS +
+ASYNC_DB_THREADS.
+"""
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.ASYNC_DB_THREADS,
+                thread_name_prefix="async-db",
+            )
+        return _executor
+
+
+def _call(func, args, kwargs):
+    try:
+        return func(*args, **kwargs)
+    finally:
+        # Соединения потоков пула живут по правилам CONN_MAX_AGE,
+        # как соединения обычных запросов.
+        close_old_connections()
+
+
+async def run_in_thread(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    # Контекстные переменные запроса (например, core.monitoring) видны
+    # и в потоке пула.
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        _get_executor(), context.run, _call, func, args, kwargs
+    )
+
+
+async def _in_context(context, coroutine):
+    for variable, value in context.items():
+        variable.set(value)
+    return await coroutine
+
+
+def async_view(view):
+    """Обёртка, через которую Django вызывает представление-сопрограмму."""
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        coroutine = view(request, *args, **kwargs)
+        loop = getattr(request, "asgi_loop", None)
+        if loop is None:
+            return asyncio.run(coroutine)
+        # Задача в цикле сервера не наследует контекст потока запроса.
+        coroutine = _in_context(contextvars.copy_context(), coroutine)
+        return asyncio.run_coroutine_threadsafe(coroutine, loop).result()
+
+    return wrapper
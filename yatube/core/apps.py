@@ -1,5 +1,16 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.db.backends.signals import connection_created
 
 
 class CoreConfig(AppConfig):
     name = "core"
+
+    def ready(self):
+        from .database import apply_sqlite_pragmas
+
+        connection_created.connect(apply_sqlite_pragmas)
+        if settings.METRICS_ENABLED:
+            from . import monitoring
+
+            connection_created.connect(monitoring.install)
@@ -0,0 +1,166 @@
+"""Минимальный ASGI-обработчик для Django 2.2.
+
+Django 2.2 понимает только WSGI, поэтому ASGIHandler собирает из scope
+и тела запроса окружение WSGI и прогоняет запрос через обычный стек
+middleware в пуле из ASGI_THREADS потоков. Пока медленный клиент
+досылает тело запроса, он занимает только сопрограмму, а не поток, а
+представления, обёрнутые core.aio.async_view, выполняются в цикле
+сервера и параллельно ходят в базу и кеш. Поток пула при этом ждёт
+представление, так что потоков и соединений такие страницы занимают
+больше, а не меньше (см. core.aio).
+
+Запросы обслуживаются по ASGI_URLCONF, где часть страниц заменена
+асинхронными версиями; остальные адреса те же, что под WSGI.
+"""
+import asyncio
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote
+
+from django.conf import settings
+from django.core import signals
+from django.core.handlers import base
+from django.core.handlers.wsgi import WSGIRequest, get_script_name
+from django.urls import set_script_prefix
+
+
+class ASGIHandler(base.BaseHandler):
+    request_class = WSGIRequest
+
+    def __init__(self):
+        super().__init__()
+        self.load_middleware()
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=settings.ASGI_THREADS,
+                    thread_name_prefix="asgi",
+                )
+            return self._executor
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            raise ValueError(
+                "ASGIHandler обслуживает только HTTP, "
+                "получено: {}".format(scope["type"])
+            )
+        body = await self.read_body(receive)
+        if body is None:
+            return
+        environ = self.get_environ(scope, body)
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(
+                self._get_executor(), self.handle, environ, send, loop
+            )
+        finally:
+            body.close()
+
+    async def read_body(self, receive):
+        """Тело запроса; None, если клиент ушёл, не дослав его."""
+        body = tempfile.SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE, mode="w+b"
+        )
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                body.close()
+                return None
+            body.write(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        body.seek(0)
+        return body
+
+    @staticmethod
+    def get_environ(scope, body):
+        server = scope.get("server") or ("localhost", 80)
+        client = scope.get("client") or ("", 0)
+        environ = {
+            "REQUEST_METHOD": scope["method"],
+            "SCRIPT_NAME": scope.get("root_path", ""),
+            "PATH_INFO": unquote(scope["path"]),
+            "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+            "SERVER_NAME": server[0],
+            "SERVER_PORT": str(server[1]),
+            "REMOTE_ADDR": client[0],
+            "SERVER_PROTOCOL": "HTTP/{}".format(
+                scope.get("http_version", "1.1")
+            ),
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": scope.get("scheme", "http"),
+            "wsgi.input": body,
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": True,
+            "wsgi.run_once": False,
+        }
+        for name, value in scope.get("headers", []):
+            name = name.decode("latin-1").upper().replace("-", "_")
+            value = value.decode("latin-1")
+            if name in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+                key = name
+            else:
+                key = "HTTP_" + name
+            if key in environ:
+                separator = "; " if key == "HTTP_COOKIE" else ","
+                value = environ[key] + separator + value
+            environ[key] = value
+        # Тело уже прочитано целиком, в том числе переданное по частям
+        # без Content-Length.
+        body.seek(0, 2)
+        environ["CONTENT_LENGTH"] = str(body.tell())
+        body.seek(0)
+        return environ
+
+    def handle(self, environ, send, loop):
+        """Обрабатывает запрос в потоке пула и отправляет ответ.
+
+        Запрос, ответ и закрытие ответа (сигнал request_finished) остаются
+        в одном потоке: соединения с базой у Django на поток.
+        """
+        set_script_prefix(get_script_name(environ))
+        signals.request_started.send(sender=self.__class__, environ=environ)
+        request = self.request_class(environ)
+        request.urlconf = settings.ASGI_URLCONF
+        request.asgi_loop = loop
+        response = self.get_response(request)
+        try:
+            self.send_response(response, send, loop)
+        finally:
+            response.close()
+
+    @staticmethod
+    def send_response(response, send, loop):
+        def call(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        headers = [
+            (name.encode("latin-1"), str(value).encode("latin-1"))
+            for name, value in response.items()
+        ]
+        for cookie in response.cookies.values():
+            headers.append(
+                (b"set-cookie", cookie.output(header="").strip().encode())
+            )
+        call({
+            "type": "http.response.start",
+            "status": response.status_code,
+            "headers": headers,
+        })
+        if response.streaming:
+            for chunk in response:
+                call({
+                    "type": "http.response.body",
+                    "body": chunk,
+                    "more_body": True,
+                })
+            call({"type": "http.response.body"})
+        else:
+            call({"type": "http.response.body", "body": response.content})
@@ -0,0 +1,554 @@
+"""Общие для всех воркеров бэкенды кеша.
+
+* RedisCache — кеш в Redis (нужен пакет ``redis``);
+* SQLiteCache — кеш в файле SQLite, общий для процессов одной машины,
+  подходит для тестов и для развёртывания без Redis;
+* TieredCache — небольшой LRU в памяти процесса перед общим кешем;
+* LocMemCache — LocMemCache Django с учётом попаданий и промахов, для
+  развёртывания без общего кеша.
+"""
+import itertools
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends import locmem
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.exceptions import ImproperlyConfigured
+
+from .metrics import MetricsMixin
+
+_MISSING = object()
+
+
+class SQLiteCache(MetricsMixin, BaseCache):
+    """Кеш в файле SQLite в режиме WAL.
+
+    LOCATION — путь к файлу базы; все процессы, открывшие один файл,
+    видят общий кеш.
+
+    OPTIONS:
+        MAX_ENTRIES, CULL_FREQUENCY — как у кешей Django;
+        CULL_EVERY — раз во сколько записей процесса проверять размер
+            таблицы (по умолчанию 100). Между проверками таблица может
+            превысить MAX_ENTRIES на столько записей, зато запись не
+            считает строки таблицы каждый раз.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self._cull_every = max(int(options.get("CULL_EVERY", 100)), 1)
+        self._writes = itertools.count(1)
+        self._path = location
+        self._local = threading.local()
+        self._init_metrics(location)
+
+    @property
+    def _db(self):
+        # Соединение SQLite нельзя делить между потоками.
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self._path, timeout=30, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)"
+            )
+            self._local.db = db
+        return db
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _fetch(self, key):
+        row = self._db.execute(
+            "SELECT value, expires FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return _MISSING
+        value, expires = row
+        if expires is not None and expires <= time.time():
+            self._db.execute(
+                "DELETE FROM cache WHERE key = ? AND expires <= ?",
+                (key, time.time()),
+            )
+            return _MISSING
+        return pickle.loads(value)
+
+    def get(self, key, default=None, version=None):
+        value = self._fetch(self._key(key, version))
+        if value is _MISSING:
+            self._record("misses")
+            return default
+        self._record("hits")
+        return value
+
+    def get_many(self, keys, version=None):
+        mapping = {self._key(key, version): key for key in keys}
+        if not mapping:
+            return {}
+        placeholders = ",".join("?" * len(mapping))
+        rows = self._db.execute(
+            f"SELECT key, value FROM cache WHERE key IN ({placeholders}) "
+            "AND (expires IS NULL OR expires > ?)",
+            [*mapping, time.time()],
+        ).fetchall()
+        result = {mapping[key]: pickle.loads(value) for key, value in rows}
+        self._record("hits", len(result))
+        self._record("misses", len(mapping) - len(result))
+        return result
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._cull()
+        self._db.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires) "
+            "VALUES (?, ?, ?)",
+            (
+                self._key(key, version),
+                pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+                self.get_backend_timeout(timeout),
+            ),
+        )
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        self._cull()
+        expires = self.get_backend_timeout(timeout)
+        self._db.executemany(
+            "INSERT OR REPLACE INTO cache (key, value, expires) "
+            "VALUES (?, ?, ?)",
+            [
+                (
+                    self._key(key, version),
+                    pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+                    expires,
+                )
+                for key, value in data.items()
+            ],
+        )
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        db = self._db
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.execute(
+                "DELETE FROM cache WHERE key = ? AND expires <= ?",
+                (key, time.time()),
+            )
+            added = db.execute(
+                "INSERT OR IGNORE INTO cache (key, value, expires) "
+                "VALUES (?, ?, ?)",
+                (
+                    key,
+                    pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+                    self.get_backend_timeout(timeout),
+                ),
+            ).rowcount
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+        return added == 1
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        db = self._db
+        # Читаем и пишем под одной блокировкой на запись, чтобы
+        # инкременты из разных процессов не терялись.
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            value = self._fetch(key)
+            if value is _MISSING:
+                raise ValueError("Key '%s' not found" % key)
+            value += delta
+            db.execute(
+                "UPDATE cache SET value = ? WHERE key = ?",
+                (pickle.dumps(value, pickle.HIGHEST_PROTOCOL), key),
+            )
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._db.execute(
+            "UPDATE cache SET expires = ? WHERE key = ? "
+            "AND (expires IS NULL OR expires > ?)",
+            (
+                self.get_backend_timeout(timeout),
+                self._key(key, version),
+                time.time(),
+            ),
+        ).rowcount == 1
+
+    def delete(self, key, version=None):
+        self._db.execute(
+            "DELETE FROM cache WHERE key = ?", (self._key(key, version),)
+        )
+
+    def delete_many(self, keys, version=None):
+        self._db.executemany(
+            "DELETE FROM cache WHERE key = ?",
+            [(self._key(key, version),) for key in keys],
+        )
+
+    def has_key(self, key, version=None):
+        return self._fetch(self._key(key, version)) is not _MISSING
+
+    def clear(self):
+        self._db.execute("DELETE FROM cache")
+
+    def close(self, **kwargs):
+        # Соединение живёт весь поток: открывать файл на каждый запрос
+        # дороже, чем держать его.
+        pass
+
+    def _cull(self):
+        # next() у itertools.count атомарен под GIL, блокировка не нужна.
+        if next(self._writes) % self._cull_every:
+            return
+        db = self._db
+        db.execute("DELETE FROM cache WHERE expires <= ?", (time.time(),))
+        (count,) = db.execute("SELECT COUNT(*) FROM cache").fetchone()
+        if count < self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            db.execute("DELETE FROM cache")
+            return
+        db.execute(
+            "DELETE FROM cache WHERE key IN ("
+            "SELECT key FROM cache ORDER BY expires IS NULL, expires LIMIT ?)",
+            (count // self._cull_frequency,),
+        )
+
+
+_redis_pools = {}
+_redis_pools_lock = threading.Lock()
+
+
+class RedisCache(MetricsMixin, BaseCache):
+    """Кеш в Redis. LOCATION — URL вида ``redis://host:6379/0``.
+
+    Целые числа хранятся как есть, поэтому incr() выполняется командой
+    INCRBY на сервере; остальные значения сериализуются pickle.
+    """
+
+    def __init__(self, server, params):
+        super().__init__(params)
+        try:
+            import redis
+        except ImportError as error:
+            raise ImproperlyConfigured(
+                "Для RedisCache установите пакет redis."
+            ) from error
+        # Бэкенд создаётся в каждом потоке, а пул соединений — один
+        # на процесс для каждого сервера.
+        with _redis_pools_lock:
+            pool = _redis_pools.get(server)
+            if pool is None:
+                pool = redis.ConnectionPool.from_url(server)
+                _redis_pools[server] = pool
+        self._client = redis.Redis(connection_pool=pool)
+        self._init_metrics(server)
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _ttl_ms(self, timeout):
+        """Срок жизни в миллисекундах; None — бессрочно, 0 — уже истёк."""
+        if timeout == DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return None
+        return max(int(timeout * 1000), 0)
+
+    @staticmethod
+    def _dump(value):
+        if isinstance(value, int) and not isinstance(value, bool):
+            return str(value).encode()
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _load(raw):
+        try:
+            return int(raw)
+        except ValueError:
+            return pickle.loads(raw)
+
+    def get(self, key, default=None, version=None):
+        raw = self._client.get(self._key(key, version))
+        if raw is None:
+            self._record("misses")
+            return default
+        self._record("hits")
+        return self._load(raw)
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        if not keys:
+            return {}
+        raws = self._client.mget([self._key(key, version) for key in keys])
+        result = {
+            key: self._load(raw)
+            for key, raw in zip(keys, raws)
+            if raw is not None
+        }
+        self._record("hits", len(result))
+        self._record("misses", len(keys) - len(result))
+        return result
+
+    def _set(self, client, key, value, timeout, nx=False):
+        ttl = self._ttl_ms(timeout)
+        if ttl == 0:
+            client.delete(key)
+            return False
+        return client.set(key, self._dump(value), px=ttl, nx=nx)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._set(self._client, self._key(key, version), value, timeout)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        pipeline = self._client.pipeline()
+        for key, value in data.items():
+            self._set(pipeline, self._key(key, version), value, timeout)
+        pipeline.execute()
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return bool(
+            self._set(
+                self._client, self._key(key, version), value, timeout, nx=True
+            )
+        )
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        if not self._client.exists(key):
+            raise ValueError("Key '%s' not found" % key)
+        return self._client.incrby(key, delta)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        ttl = self._ttl_ms(timeout)
+        if ttl is None:
+            return bool(self._client.persist(key)) or bool(
+                self._client.exists(key)
+            )
+        return bool(self._client.pexpire(key, max(ttl, 1)))
+
+    def delete(self, key, version=None):
+        self._client.delete(self._key(key, version))
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        if keys:
+            self._client.delete(*keys)
+
+    def has_key(self, key, version=None):
+        return bool(self._client.exists(self._key(key, version)))
+
+    def clear(self):
+        if not self.key_prefix:
+            self._client.flushdb()
+            return
+        for key in self._client.scan_iter(match=f"{self.key_prefix}:*"):
+            self._client.delete(key)
+
+
+_local_stores = {}
+_local_stores_lock = threading.Lock()
+
+
+class _LocalStore:
+    """LRU-словарь процесса: ключ -> (срок годности, pickle значения)."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.data = OrderedDict()
+
+    def get(self, key):
+        with self.lock:
+            item = self.data.get(key)
+            if item is None:
+                return _MISSING
+            expires, raw = item
+            if expires <= time.monotonic():
+                del self.data[key]
+                return _MISSING
+            self.data.move_to_end(key)
+        return pickle.loads(raw)
+
+    def set(self, key, value, timeout):
+        raw = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self.lock:
+            self.data[key] = (time.monotonic() + timeout, raw)
+            self.data.move_to_end(key)
+            while len(self.data) > self.max_entries:
+                self.data.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.data.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+
+class TieredCache(MetricsMixin, BaseCache):
+    """Двухуровневый кеш: LRU в памяти процесса перед общим кешем.
+
+    OPTIONS:
+        SHARED — псевдоним общего кеша из settings.CACHES (обязательно);
+        LOCAL_TIMEOUT — сколько секунд значение живёт в памяти процесса
+            (по умолчанию 1). Записи этого процесса обновляют локальный
+            уровень сразу, записи других воркеров видны не позже чем
+            через LOCAL_TIMEOUT;
+        LOCAL_MAX_ENTRIES — размер LRU (по умолчанию 1000).
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        try:
+            self._shared_alias = options["SHARED"]
+        except KeyError:
+            raise ImproperlyConfigured(
+                "Для TieredCache укажите OPTIONS['SHARED']."
+            )
+        self._local_timeout = float(options.get("LOCAL_TIMEOUT", 1))
+        max_entries = int(options.get("LOCAL_MAX_ENTRIES", 1000))
+        store_name = (location, self._shared_alias)
+        with _local_stores_lock:
+            store = _local_stores.get(store_name)
+            if store is None:
+                store = _LocalStore(max_entries)
+                _local_stores[store_name] = store
+        self._store = store
+        self._init_metrics(location)
+
+    @property
+    def shared(self):
+        return caches[self._shared_alias]
+
+    def _local_key(self, key, version):
+        return self.shared.make_key(key, version=version)
+
+    def _remember(self, key, version, value, timeout=DEFAULT_TIMEOUT):
+        if timeout == DEFAULT_TIMEOUT:
+            timeout = self.shared.default_timeout
+        local_timeout = self._local_timeout
+        if timeout is not None:
+            local_timeout = min(local_timeout, timeout)
+        if local_timeout > 0:
+            self._store.set(
+                self._local_key(key, version), value, local_timeout
+            )
+        else:
+            self._store.delete(self._local_key(key, version))
+
+    def get(self, key, default=None, version=None):
+        value = self._store.get(self._local_key(key, version))
+        if value is not _MISSING:
+            self._record("hits")
+            self._record("local_hits")
+            return value
+        value = self.shared.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            self._record("misses")
+            return default
+        self._record("hits")
+        self._remember(key, version, value)
+        return value
+
+    def get_many(self, keys, version=None):
+        result = {}
+        missing = []
+        for key in keys:
+            value = self._store.get(self._local_key(key, version))
+            if value is _MISSING:
+                missing.append(key)
+            else:
+                result[key] = value
+        self._record("local_hits", len(result))
+        if missing:
+            shared = self.shared.get_many(missing, version=version)
+            for key, value in shared.items():
+                self._remember(key, version, value)
+            result.update(shared)
+            self._record("misses", len(missing) - len(shared))
+        self._record("hits", len(result))
+        return result
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version=version)
+        self._remember(key, version, value, timeout)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, timeout, version=version)
+        for key, value in data.items():
+            if key not in failed:
+                self._remember(key, version, value, timeout)
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, timeout, version=version)
+        if added:
+            self._remember(key, version, value, timeout)
+        return added
+
+    def incr(self, key, delta=1, version=None):
+        value = self.shared.incr(key, delta, version=version)
+        self._remember(key, version, value)
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self._store.delete(self._local_key(key, version))
+        return self.shared.touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        self._store.delete(self._local_key(key, version))
+        self.shared.delete(key, version=version)
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        for key in keys:
+            self._store.delete(self._local_key(key, version))
+        self.shared.delete_many(keys, version=version)
+
+    def has_key(self, key, version=None):
+        if self._store.get(self._local_key(key, version)) is not _MISSING:
+            return True
+        return self.shared.has_key(key, version=version)
+
+    def clear(self):
+        self._store.clear()
+        self.shared.clear()
+
+
+class LocMemCache(MetricsMixin, locmem.LocMemCache):
+    """Кеш в памяти процесса, который считает попадания и промахи."""
+
+    def __init__(self, name, params):
+        super().__init__(name, params)
+        self._init_metrics(name)
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version=version)
+        if value is _MISSING:
+            self._record("misses")
+            return default
+        self._record("hits")
+        return value
@@ -0,0 +1,70 @@
+"""Счётчики попаданий и промахов кеша, общие для всех потоков процесса.
+
+Django создаёт свой экземпляр бэкенда в каждом потоке, поэтому счётчики
+хранятся на уровне модуля и связываются с бэкендом по его классу и
+LOCATION. snapshot() сопоставляет их с псевдонимами из settings.CACHES.
+Слушатели из add_listener() получают каждое событие, например чтобы
+считать попадания отдельного запроса (core.monitoring).
+"""
+import threading
+from collections import Counter, defaultdict
+
+from django.conf import settings
+
+_lock = threading.Lock()
+_counters = defaultdict(Counter)
+_listeners = []
+
+
+def backend_name(backend_path, location):
+    return f"{backend_path}:{location}"
+
+
+def record(name, event, count=1):
+    with _lock:
+        _counters[name][event] += count
+    for listener in _listeners:
+        listener(name, event, count)
+
+
+def add_listener(listener):
+    """listener(name, event, count) вызывается на каждое событие."""
+    if listener not in _listeners:
+        _listeners.append(listener)
+
+
+def alias_name(alias):
+    """Имя счётчиков бэкенда с псевдонимом alias из settings.CACHES."""
+    conf = settings.CACHES[alias]
+    return backend_name(conf["BACKEND"], conf.get("LOCATION", ""))
+
+
+def snapshot():
+    """Счётчики по псевдонимам кеша, например {"default": {"hits": 3}}."""
+    with _lock:
+        counters = {name: dict(counter) for name, counter in _counters.items()}
+    result = {}
+    for alias in settings.CACHES:
+        name = alias_name(alias)
+        if name in counters:
+            result[alias] = counters[name]
+    return result
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+
+
+class MetricsMixin:
+    """Добавляет бэкенду кеша учёт попаданий и промахов."""
+
+    def _init_metrics(self, location):
+        cls = type(self)
+        self._metrics_name = backend_name(
+            f"{cls.__module__}.{cls.__qualname__}", location
+        )
+
+    def _record(self, event, count=1):
+        if count:
+            record(self._metrics_name, event, count)
@@ -0,0 +1,21 @@
+"""Настройка новых соединений с базой.
+
+apply_sqlite_pragmas — обработчик connection_created: выполняет на каждом
+новом соединении с SQLite PRAGMA из settings.SQLITE_PRAGMAS. PRAGMA
+действуют на соединение, а не на файл базы (кроме journal_mode=WAL),
+поэтому их нельзя задать один раз миграцией. С постоянными соединениями
+(CONN_MAX_AGE) обработчик срабатывает лишь при открытии соединения.
+"""
+from django.conf import settings
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    if connection.vendor != "sqlite" or not settings.SQLITE_PRAGMAS:
+        return
+    # Сырой курсор sqlite3: без execute_wrappers и подсчёта запросов.
+    cursor = connection.connection.cursor()
+    try:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+    finally:
+        cursor.close()
@@ -0,0 +1,72 @@
+"""Подсчёт ссылок на файлы хранилища.
+
+Записи, которые хранят имена файлов, вызывают acquire() для новых имён
+и release() для тех, что перестали использовать. Файл удаляется из
+хранилища после коммита транзакции, в которой пропала последняя ссылка.
+Считаются только имена, выданные ContentAddressedStorage: файлы старых
+загрузок и чужие пути не учитываются и никогда не удаляются.
+"""
+from collections import defaultdict
+
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F
+
+from .models import StoredFile
+from .storage import is_content_name
+
+
+def _names(names):
+    return {name for name in names if name and is_content_name(name)}
+
+
+def acquire(*names):
+    acquire_counts({name: 1 for name in _names(names)})
+
+
+def acquire_counts(counts):
+    """Добавляет counts[name] ссылок на каждое имя."""
+    names_by_count = defaultdict(list)
+    for name, count in counts.items():
+        if is_content_name(name):
+            names_by_count[count].append(name)
+    if not names_by_count:
+        return
+    # Сначала записи для новых имён, затем одно UPDATE на каждое число
+    # ссылок: запросов не больше, сколько бы файлов ни было у записи.
+    StoredFile.objects.bulk_create(
+        [
+            StoredFile(name=name, references=0)
+            for names in names_by_count.values() for name in names
+        ],
+        ignore_conflicts=True,
+    )
+    for count, names in names_by_count.items():
+        StoredFile.objects.filter(name__in=names).update(
+            references=F("references") + count
+        )
+
+
+def release(*names):
+    names = _names(names)
+    if not names:
+        return
+    StoredFile.objects.filter(name__in=names).update(
+        references=F("references") - 1
+    )
+    orphans = StoredFile.objects.filter(name__in=names, references__lte=0)
+    orphan_names = list(orphans.values_list("name", flat=True))
+    if not orphan_names:
+        return
+    orphans.delete()
+
+    def delete_files():
+        # Пока шла транзакция, на файл могли сослаться снова.
+        alive = set(StoredFile.objects.filter(
+            name__in=orphan_names
+        ).values_list("name", flat=True))
+        for name in orphan_names:
+            if name not in alive:
+                default_storage.delete(name)
+
+    transaction.on_commit(delete_files)
@@ -12,3 +12,24 @@ class CreatedModel(models.Model):
     class Meta:
         # Это абстрактная модель:
         abstract = True
+
+
+class StoredFile(models.Model):
+    """Число ссылок на файл в хранилище (см. core.media)."""
+
+    name = models.CharField(
+        max_length=255,
+        unique=True,
+        verbose_name="Имя файла"
+    )
+    references = models.IntegerField(
+        default=0,
+        verbose_name="Число ссылок"
+    )
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        verbose_name = "Файл"
+        verbose_name_plural = "Файлы"
@@ -0,0 +1,398 @@
+"""Метрики запросов: SQL, шаблоны, кеш и время ответа.
+
+MetricsMiddleware заводит на каждый запрос RequestMetrics и кладёт его
+в контекстную переменную. В неё пишут:
+
+* обёртка выполнения SQL, которую connection_created ставит каждому
+  соединению с базой, — число запросов и их время;
+* бэкенд шаблонов DjangoTemplates — время отрисовки шаблона страницы
+  вместе со всеми include и запросами, которые выполняет сам шаблон;
+* счётчики core.cache.metrics — попадания и промахи кеша default.
+
+После ответа метрики добавляются к счётчикам процесса по имени
+маршрута, которые отдаёт в формате Prometheus представление metrics_view
+(/metrics, только по токену или с внутренних адресов, см. metrics_view),
+и пишутся строкой JSON в логгер core.metrics: каждый запрос
+с уровнем INFO, медленный — с WARNING. Для доли METRICS_CAPTURE_RATE
+запросов запоминается и текст SQL: если такой запрос окажется медленным,
+запросы попадут в его строку лога.
+
+Счётчики у каждого процесса свои: при нескольких воркерах Prometheus
+должен опрашивать каждый из них.
+
+Заодно запросы одного HTTP-запроса группируются по форме — тексту SQL
+без параметров, где списки IN (...) любой длины совпадают. Форма,
+повторившаяся больше NPLUSONE_THRESHOLD раз, — признак N+1: в логгер
+core.nplusone пишется предупреждение со стеком шаблонов и кода проекта,
+из которого шли запросы, а при NPLUSONE_RAISE (в тестах, см.
+core.testing) выбрасывается NPlusOneError.
+"""
+import contextvars
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed, PermissionDenied
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+from django.template.backends import django as django_backend
+from django.template.base import Node, TokenType
+
+from .cache import metrics as cache_metrics
+
+logger = logging.getLogger("core.metrics")
+nplusone_logger = logging.getLogger("core.nplusone")
+
+_current = contextvars.ContextVar("request_metrics", default=None)
+
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+
+
+_IN_LIST = re.compile(r"\((?:%s, )+%s\)")
+_TAGS = {TokenType.VAR: "{{{{ {} }}}}", TokenType.BLOCK: "{{% {} %}}"}
+
+
+class NPlusOneError(Exception):
+    """Запрос одной формы выполнился за HTTP-запрос слишком много раз."""
+
+
+def query_shape(sql):
+    return _IN_LIST.sub("(...)", sql)
+
+
+class RequestMetrics:
+    """Метрики одного запроса; в них пишут и потоки асинхронных страниц."""
+
+    def __init__(self, capture=False):
+        self.lock = threading.Lock()
+        self.view = None
+        self.threshold = settings.NPLUSONE_THRESHOLD
+        self.shapes = Counter()
+        self.queries = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.captured = [] if capture else None
+        self.rendering = False
+
+    def add_query(self, sql, elapsed):
+        """Учитывает запрос; возвращает его форму, если это похоже на N+1."""
+        with self.lock:
+            self.queries += 1
+            self.sql_time += elapsed
+            if self.captured is not None:
+                self.captured.append(
+                    {"sql": sql, "ms": round(elapsed * 1000, 3)}
+                )
+            if self.threshold is None:
+                return None
+            shape = query_shape(sql)
+            self.shapes[shape] += 1
+            # Сообщаем один раз на форму, на первом лишнем повторе.
+            if self.shapes[shape] == self.threshold + 1:
+                return shape
+        return None
+
+
+def current():
+    """Метрики текущего запроса или None вне MetricsMiddleware."""
+    return _current.get()
+
+
+def record_sql(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        result = execute(sql, params, many, context)
+    finally:
+        shape = metrics.add_query(sql, time.perf_counter() - started)
+    # Ошибка самого запроса важнее: о повторах сообщаем только после
+    # успешного выполнения.
+    if shape is not None:
+        _report_repeats(metrics, shape)
+    return result
+
+
+def query_stack():
+    """Строки шаблонов и кода проекта, из которых выполняется запрос.
+
+    Для шаблонов — имя и строка тега или переменной, для кода — файл,
+    строка и функция; снаружи внутрь.
+    """
+    lines = []
+    frame = sys._getframe(1)
+    while frame is not None:
+        code = frame.f_code
+        node = frame.f_locals.get("self")
+        if code.co_name == "render_annotated" and isinstance(node, Node):
+            token = getattr(node, "token", None)
+            origin = getattr(node, "origin", None)
+            if token is not None and origin is not None:
+                tag = _TAGS.get(token.token_type, "{}").format(
+                    token.contents
+                )
+                name = origin.template_name or origin.name
+                lines.append(f"{name}:{token.lineno} {tag}")
+        elif (
+            code.co_filename.startswith(settings.BASE_DIR)
+            and code.co_filename != __file__
+        ):
+            path = os.path.relpath(code.co_filename, settings.BASE_DIR)
+            lines.append(f"{path}:{frame.f_lineno} {code.co_name}")
+        frame = frame.f_back
+    return "\n".join(reversed(lines))
+
+
+def _report_repeats(metrics, shape):
+    message = (
+        f"{metrics.view or 'unresolved'}: запрос выполнен больше "
+        f"{metrics.threshold} раз: {shape}\n{query_stack()}"
+    )
+    if settings.NPLUSONE_RAISE:
+        raise NPlusOneError(message)
+    nplusone_logger.warning(message)
+
+
+def install(sender, connection, **kwargs):
+    """Обработчик connection_created: ставит соединению record_sql."""
+    if record_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_sql)
+
+
+def _count_cache_event(name, event, count):
+    metrics = _current.get()
+    if metrics is None or event not in ("hits", "misses"):
+        return
+    # Уровни TieredCache считают и сами: берём только кеш default.
+    if name != cache_metrics.alias_name("default"):
+        return
+    with metrics.lock:
+        if event == "hits":
+            metrics.cache_hits += count
+        else:
+            metrics.cache_misses += count
+
+
+cache_metrics.add_listener(_count_cache_event)
+
+
+class Template(django_backend.Template):
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        if metrics is None or metrics.rendering:
+            return super().render(context, request)
+        metrics.rendering = True
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.rendering = False
+            metrics.template_time += time.perf_counter() - started
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """Бэкенд шаблонов Django, который засекает время отрисовки."""
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return Template(template.template, self)
+
+
+def _escape(value):
+    return (
+        str(value).replace("\\", "\\\\").replace('"', '\\"')
+        .replace("\n", "\\n")
+    )
+
+
+def _labels(**labels):
+    return "{%s}" % ",".join(
+        f'{name}="{_escape(value)}"' for name, value in labels.items()
+    )
+
+
+class Registry:
+    """Счётчики процесса по маршрутам в формате Prometheus."""
+
+    # Имя метрики, поле RequestMetrics, описание.
+    TOTALS = (
+        ("yatube_db_queries_total", "queries", "SQL-запросы"),
+        ("yatube_db_seconds_total", "sql_time", "Время SQL-запросов"),
+        (
+            "yatube_template_seconds_total", "template_time",
+            "Время отрисовки шаблонов",
+        ),
+        ("yatube_cache_hits_total", "cache_hits", "Попадания в кеш"),
+        ("yatube_cache_misses_total", "cache_misses", "Промахи кеша"),
+    )
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.requests = Counter()
+            self.buckets = defaultdict(lambda: [0] * len(DURATION_BUCKETS))
+            self.durations = Counter()
+            self.totals = defaultdict(Counter)
+
+    def observe(self, view, method, status, duration, metrics):
+        with self.lock:
+            self.requests[view, method, status] += 1
+            buckets = self.buckets[view]
+            for number, bound in enumerate(DURATION_BUCKETS):
+                if duration <= bound:
+                    buckets[number] += 1
+            self.durations[view] += duration
+            totals = self.totals[view]
+            for _, field, _ in self.TOTALS:
+                totals[field] += getattr(metrics, field)
+
+    def render(self):
+        with self.lock:
+            lines = [
+                "# HELP yatube_requests_total Обработанные запросы.",
+                "# TYPE yatube_requests_total counter",
+            ]
+            for (view, method, status), count in sorted(
+                self.requests.items()
+            ):
+                labels = _labels(view=view, method=method, status=status)
+                lines.append(f"yatube_requests_total{labels} {count}")
+            lines += [
+                "# HELP yatube_request_duration_seconds Время ответа.",
+                "# TYPE yatube_request_duration_seconds histogram",
+            ]
+            views = sorted(self.buckets)
+            for view in views:
+                name = "yatube_request_duration_seconds"
+                total = sum(
+                    count for (other, _, _), count in self.requests.items()
+                    if other == view
+                )
+                for bound, count in zip(DURATION_BUCKETS, self.buckets[view]):
+                    labels = _labels(view=view, le=bound)
+                    lines.append(f"{name}_bucket{labels} {count}")
+                labels = _labels(view=view, le="+Inf")
+                lines.append(f"{name}_bucket{labels} {total}")
+                labels = _labels(view=view)
+                lines.append(f"{name}_sum{labels} {self.durations[view]}")
+                lines.append(f"{name}_count{labels} {total}")
+            for metric, field, description in self.TOTALS:
+                lines += [
+                    f"# HELP {metric} {description}.",
+                    f"# TYPE {metric} counter",
+                ]
+                for view in views:
+                    value = self.totals[view][field]
+                    lines.append(f"{metric}{_labels(view=view)} {value}")
+        lines += [
+            "# HELP yatube_cache_events_total События кешей процесса.",
+            "# TYPE yatube_cache_events_total counter",
+        ]
+        for alias, events in sorted(cache_metrics.snapshot().items()):
+            for event, count in sorted(events.items()):
+                labels = _labels(alias=alias, event=event)
+                lines.append(f"yatube_cache_events_total{labels} {count}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+def _view_name(request):
+    # У маршрутов без имени (yatube.asgi_urls) это путь к функции.
+    match = getattr(request, "resolver_match", None)
+    return "unresolved" if match is None else match.view_name
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metrics = _current.get()
+        if metrics is not None:
+            metrics.view = _view_name(request)
+
+    def __call__(self, request):
+        capture = random.random() < settings.METRICS_CAPTURE_RATE
+        metrics = RequestMetrics(capture)
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        duration = time.perf_counter() - started
+        view = _view_name(request)
+        registry.observe(
+            view, request.method, response.status_code, duration, metrics
+        )
+        self.log(request, response, view, duration, metrics)
+        return response
+
+    def log(self, request, response, view, duration, metrics):
+        slow = duration >= settings.METRICS_SLOW_REQUEST
+        level = logging.WARNING if slow else logging.INFO
+        if not logger.isEnabledFor(level):
+            return
+        line = {
+            "view": view,
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "ms": round(duration * 1000, 3),
+            "queries": metrics.queries,
+            "sql_ms": round(metrics.sql_time * 1000, 3),
+            "template_ms": round(metrics.template_time * 1000, 3),
+            "cache_hits": metrics.cache_hits,
+            "cache_misses": metrics.cache_misses,
+        }
+        if slow:
+            line["slow"] = True
+            if metrics.captured is not None:
+                line["sql"] = metrics.captured
+        logger.log(level, json.dumps(line, ensure_ascii=False))
+
+
+# Заголовки, которые ставит обратный прокси: REMOTE_ADDR у такого
+# запроса — адрес прокси, а не клиента.
+PROXY_HEADERS = ("HTTP_X_FORWARDED_FOR", "HTTP_X_REAL_IP")
+
+
+def _metrics_allowed(request):
+    token = settings.METRICS_TOKEN
+    if token:
+        header = request.META.get("HTTP_AUTHORIZATION", "")
+        if constant_time_compare(header, f"Bearer {token}"):
+            return True
+    if any(name in request.META for name in PROXY_HEADERS):
+        return False
+    return request.META.get("REMOTE_ADDR") in settings.METRICS_ALLOWED_IPS
+
+
+def metrics_view(request):
+    if not _metrics_allowed(request):
+        raise PermissionDenied
+    return HttpResponse(
+        registry.render(), content_type="text/plain; version=0.0.4"
+    )
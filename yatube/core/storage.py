@@ -0,0 +1,47 @@
+"""Хранилище, которое называет файлы по хешу содержимого.
+
+Одинаковые файлы получают одно имя и записываются один раз, поэтому
+одну и ту же картинку, загруженную многими пользователями, диск хранит
+в единственном экземпляре. Сколько записей ссылается на файл, считает
+core.media: файл удаляется, когда ссылок не осталось.
+"""
+import hashlib
+import os
+import posixpath
+import re
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+CONTENT_NAME_RE = re.compile(r"^(?:[\w-]+/)*[0-9a-f]{64}(?:\.\w+)?$")
+
+
+def content_name(name, content):
+    """Имя в каталоге исходного name: sha256 содержимого + расширение."""
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    extension = os.path.splitext(name)[1].lower()
+    return posixpath.join(
+        posixpath.dirname(name), digest.hexdigest() + extension
+    )
+
+
+def is_content_name(name):
+    """Имя дало это хранилище, а не осталось от старых загрузок."""
+    return bool(CONTENT_NAME_RE.match(name))
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        name = content_name(name, content)
+        # Файл с таким именем уже содержит те же байты. Если его
+        # одновременно записывают два запроса, второй получит копию
+        # с суффиксом — это лишь упущенная дедупликация.
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length=max_length)
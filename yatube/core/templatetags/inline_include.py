@@ -0,0 +1,37 @@
+"""{% inline_include %} — {% include %}, встроенный при разборе шаблона.
+
+{% include %} в цикле на каждой итерации вычисляет имя шаблона, ищет
+его в кеше отрисовки, добавляет слой контекста и заново входит в
+Template.render(). inline_include с постоянным именем загружает шаблон
+один раз, при разборе родителя, и вставляет его узлы на своё место:
+в цикле рисуются уже готовые узлы, в контексте родителя. С кеширующим
+загрузчиком родитель вместе со встроенными шаблонами разбирается один
+раз за жизнь процесса.
+
+Аргументы with и only не поддерживаются: встроенный шаблон видит
+переменные родителя как есть.
+"""
+from django import template
+from django.template.engine import Engine
+
+register = template.Library()
+
+
+class InlineIncludeNode(template.Node):
+    def __init__(self, nodelist):
+        self.nodelist = nodelist
+
+    def render(self, context):
+        return self.nodelist.render(context)
+
+
+@register.tag
+def inline_include(parser, token):
+    bits = token.split_contents()
+    if len(bits) != 2 or bits[1][0] not in "'\"" or bits[1][0] != bits[1][-1]:
+        raise template.TemplateSyntaxError(
+            f"{bits[0]} принимает только имя шаблона в кавычках."
+        )
+    loader = getattr(parser.origin, "loader", None)
+    engine = loader.engine if loader is not None else Engine.get_default()
+    return InlineIncludeNode(engine.get_template(bits[1][1:-1]).nodelist)
@@ -0,0 +1,10 @@
+from django.conf import settings
+from django.test import runner
+
+
+class DiscoverRunner(runner.DiscoverRunner):
+    """Запуск тестов, в котором N+1 в запросе — ошибка (core.monitoring)."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        settings.NPLUSONE_RAISE = True
@@ -1,6 +1,43 @@
+import asyncio
+import importlib
+import json
+import os
+import sys
+import tempfile
 from http import HTTPStatus
+from unittest import mock
 
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile
+from django.db import DatabaseError, connection, transaction
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.http import HttpResponse
+from django.template import TemplateSyntaxError, engines
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import path
+
+from posts.models import Post
+
+from . import media, monitoring
+from .cache import metrics
+from .cache.backends import SQLiteCache
+from .models import StoredFile
+from .storage import ContentAddressedStorage
+
+User = get_user_model()
+
+
+def authors_view(request):
+    """Классический N+1: автор каждого поста читается отдельным запросом."""
+    template = engines["django"].from_string(
+        "{% for post in posts %}{{ post.author.username }}{% endfor %}"
+    )
+    return HttpResponse(template.render({"posts": Post.objects.all()}))
+
+
+urlpatterns = [path("authors/", authors_view, name="authors")]
 
 
 class ViewTestClass(TestCase):
@@ -8,3 +45,381 @@ class ViewTestClass(TestCase):
         response = self.client.get("/nonexist-page/")
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
         self.assertTemplateUsed(response, "core/404.html")
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        monitoring.registry.reset()
+
+    def test_page_metrics_exported(self):
+        """Запросы, SQL, шаблоны и кеш считаются по маршрутам."""
+        self.client.get("/")
+        self.client.get("/")
+        response = self.client.get("/metrics")
+        self.assertIn(
+            'yatube_requests_total{view="posts:index",method="GET",'
+            'status="200"} 2',
+            response.content.decode(),
+        )
+        totals = monitoring.registry.totals["posts:index"]
+        self.assertGreater(totals["queries"], 0)
+        self.assertGreater(totals["template_time"], 0)
+        self.assertGreater(totals["cache_hits"], 0)
+        self.assertGreater(totals["cache_misses"], 0)
+
+    @override_settings(METRICS_SLOW_REQUEST=0, METRICS_CAPTURE_RATE=1)
+    def test_slow_request_logged_with_sql(self):
+        with self.assertLogs("core.metrics", "WARNING") as logs:
+            self.client.get("/")
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual(line["view"], "posts:index")
+        self.assertTrue(line["slow"])
+        self.assertEqual(len(line["sql"]), line["queries"])
+
+    def test_metrics_only_for_allowed_ips(self):
+        response = self.client.get("/metrics", REMOTE_ADDR="10.0.0.1")
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
+        # Через локальный прокси REMOTE_ADDR у всех 127.0.0.1.
+        response = self.client.get(
+            "/metrics", HTTP_X_FORWARDED_FOR="203.0.113.5"
+        )
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
+        with override_settings(METRICS_ALLOWED_IPS=[]):
+            response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
+
+    @override_settings(METRICS_TOKEN="secret", METRICS_ALLOWED_IPS=[])
+    def test_metrics_by_token(self):
+        response = self.client.get(
+            "/metrics", HTTP_AUTHORIZATION="Bearer secret",
+            HTTP_X_FORWARDED_FOR="203.0.113.5",
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        response = self.client.get(
+            "/metrics", HTTP_AUTHORIZATION="Bearer wrong"
+        )
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
+
+
+@override_settings(ROOT_URLCONF="core.tests", NPLUSONE_THRESHOLD=3)
+class NPlusOneTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for number in range(5):
+            author = User.objects.create_user(username=f"author{number}")
+            Post.objects.create(text="Пост", author=author)
+
+    def test_raises_in_tests(self):
+        with self.assertRaises(monitoring.NPlusOneError) as raised:
+            self.client.get("/authors/")
+        message = str(raised.exception)
+        self.assertIn("authors: запрос выполнен больше 3 раз", message)
+        self.assertIn('FROM "auth_user"', message)
+        self.assertIn(":1 {{ post.author.username }}", message)
+        self.assertIn("core/tests.py", message)
+
+    @override_settings(NPLUSONE_RAISE=False)
+    def test_warns_in_production(self):
+        with self.assertLogs("core.nplusone", "WARNING") as logs:
+            response = self.client.get("/authors/")
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(len(logs.records), 1)
+
+    def test_database_error_not_masked(self):
+        """Ошибка запроса не подменяется сообщением о повторах."""
+        token = monitoring._current.set(monitoring.RequestMetrics())
+        self.addCleanup(monitoring._current.reset, token)
+        for _ in range(4):
+            with self.assertRaises(DatabaseError):
+                with transaction.atomic(), connection.cursor() as cursor:
+                    cursor.execute("SELECT 1 FROM missing_table")
+
+    def test_in_lists_have_one_shape(self):
+        self.assertEqual(
+            monitoring.query_shape("SELECT 1 WHERE id IN (%s, %s, %s)"),
+            monitoring.query_shape("SELECT 1 WHERE id IN (%s, %s)"),
+        )
+
+
+class InlineIncludeTests(TestCase):
+    def render(self, source, **context):
+        template = engines["django"].from_string(
+            "{% load inline_include %}" + source
+        )
+        return template.render(context)
+
+    def test_same_output_as_include(self):
+        author = User(username="author")
+        posts = [
+            Post(pk=number, text=f"Пост {number}", author=author)
+            for number in (1, 2)
+        ]
+        name = "'posts/includes/post_list.html'"
+        self.assertHTMLEqual(
+            self.render(
+                "{% for post in posts %}{% inline_include " + name
+                + " %}{% endfor %}",
+                posts=posts,
+            ),
+            self.render(
+                "{% for post in posts %}{% include " + name
+                + " %}{% endfor %}",
+                posts=posts,
+            ),
+        )
+
+    def test_name_must_be_constant(self):
+        with self.assertRaises(TemplateSyntaxError):
+            self.render("{% inline_include name %}")
+
+
+class SettingsTests(TestCase):
+    def prod_settings(self, **environ):
+        with mock.patch.dict(os.environ, environ):
+            importlib.reload(importlib.import_module("yatube.settings.base"))
+            sys.modules.pop("yatube.settings.prod", None)
+            return importlib.import_module("yatube.settings.prod")
+
+    def test_prod_profile(self):
+        prod = self.prod_settings(SECRET_KEY="secret", DB_CONN_MAX_AGE="30")
+        self.assertFalse(prod.DEBUG)
+        self.assertEqual(prod.DATABASES["default"]["CONN_MAX_AGE"], 30)
+        self.assertEqual(prod.SQLITE_PRAGMAS["journal_mode"], "WAL")
+        self.assertNotIn("debug_toolbar", prod.INSTALLED_APPS)
+        self.assertNotIn(
+            "debug_toolbar.middleware.DebugToolbarMiddleware",
+            prod.MIDDLEWARE,
+        )
+
+    def test_prod_requires_secret_key(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self.prod_settings(SECRET_KEY="")
+
+    def test_postgres_backend(self):
+        prod = self.prod_settings(
+            SECRET_KEY="secret",
+            DB_ENGINE="django.db.backends.postgresql",
+            DB_NAME="yatube",
+            DB_HOST="db",
+        )
+        database = prod.DATABASES["default"]
+        self.assertEqual(database["ENGINE"], "django.db.backends.postgresql")
+        self.assertEqual(database["HOST"], "db")
+        self.assertIn("CONN_MAX_AGE", database)
+
+    @override_settings(SQLITE_PRAGMAS={
+        "journal_mode": "WAL", "synchronous": "NORMAL", "cache_size": -2000,
+    })
+    def test_sqlite_pragmas_on_connect(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        connection = DatabaseWrapper({
+            "NAME": os.path.join(directory.name, "db.sqlite3"),
+            "CONN_MAX_AGE": 0, "OPTIONS": {}, "TIME_ZONE": None,
+            "AUTOCOMMIT": True, "ATOMIC_REQUESTS": False,
+        })
+        self.addCleanup(connection.close)
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode")
+            self.assertEqual(cursor.fetchone()[0], "wal")
+            cursor.execute("PRAGMA synchronous")
+            self.assertEqual(cursor.fetchone()[0], 1)
+            cursor.execute("PRAGMA cache_size")
+            self.assertEqual(cursor.fetchone()[0], -2000)
+
+
+class SharedCacheTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "cache.sqlite3")
+        self.path = os.path.join(directory.name, "culled.sqlite3")
+        settings_override = override_settings(CACHES={
+            "default": {
+                "BACKEND": "core.cache.backends.TieredCache",
+                "OPTIONS": {"SHARED": "shared", "LOCAL_TIMEOUT": 60},
+            },
+            "shared": {
+                "BACKEND": "core.cache.backends.SQLiteCache",
+                "LOCATION": path,
+            },
+        })
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(lambda: caches["default"].clear())
+        metrics.reset()
+
+    def test_sqlite_cache_operations(self):
+        """SQLiteCache поддерживает основные операции кеша."""
+        shared = caches["shared"]
+        shared.set("key", {"value": 1})
+        self.assertEqual(shared.get("key"), {"value": 1})
+        self.assertFalse(shared.add("key", "other"))
+        self.assertTrue(shared.add("counter", 1))
+        self.assertEqual(shared.incr("counter", 2), 3)
+        with self.assertRaises(ValueError):
+            shared.incr("missing")
+        shared.set("expired", 1, timeout=0)
+        self.assertIsNone(shared.get("expired"))
+        self.assertEqual(
+            shared.get_many(["key", "counter", "missing"]),
+            {"key": {"value": 1}, "counter": 3},
+        )
+        shared.delete("key")
+        self.assertFalse(shared.has_key("key"))
+
+    def test_sqlite_cache_culls_every_n_writes(self):
+        """Размер таблицы проверяется раз в CULL_EVERY записей."""
+        shared = SQLiteCache(self.path, {"OPTIONS": {
+            "MAX_ENTRIES": 10, "CULL_FREQUENCY": 2, "CULL_EVERY": 5,
+        }})
+        statements = []
+        shared._db.set_trace_callback(statements.append)
+        for number in range(14):
+            shared.set(f"key{number}", number)
+        counts = [sql for sql in statements if "COUNT(*)" in sql]
+        self.assertEqual(len(counts), 2)
+        (count,) = shared._db.execute("SELECT COUNT(*) FROM cache").fetchone()
+        self.assertEqual(count, 14)
+        shared.set("key14", 14)
+        (count,) = shared._db.execute("SELECT COUNT(*) FROM cache").fetchone()
+        self.assertEqual(count, 14 - 14 // 2 + 1)
+
+    def test_tiered_cache_reads_local_tier(self):
+        """Повторное чтение обслуживается из памяти процесса."""
+        cache = caches["default"]
+        cache.set("key", "value")
+        # Значение в общем кеше поменял другой воркер.
+        caches["shared"].set("key", "changed")
+        self.assertEqual(cache.get("key"), "value")
+        cache.delete("key")
+        self.assertIsNone(cache.get("key"))
+
+    def test_tiered_cache_incr_is_shared(self):
+        """incr() проходит через общий кеш и обновляет локальный уровень."""
+        cache = caches["default"]
+        cache.set("version", 1)
+        caches["shared"].incr("version")
+        self.assertEqual(cache.incr("version"), 3)
+        self.assertEqual(cache.get("version"), 3)
+
+    def test_metrics_per_alias(self):
+        """Попадания и промахи считаются по псевдонимам кеша."""
+        cache = caches["default"]
+        cache.get("missing")
+        cache.set("key", "value")
+        cache.get("key")
+        stats = metrics.snapshot()
+        self.assertEqual(stats["default"]["misses"], 1)
+        self.assertEqual(stats["default"]["hits"], 1)
+        self.assertEqual(stats["default"]["local_hits"], 1)
+        self.assertEqual(stats["shared"]["misses"], 1)
+
+
+class ContentAddressedStorageTests(TransactionTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.storage = ContentAddressedStorage(location=directory.name)
+        settings_override = override_settings(MEDIA_ROOT=directory.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_same_content_same_name(self):
+        """Одинаковые файлы хранятся один раз под именем-хешем."""
+        first = self.storage.save("posts/a.JPG", ContentFile(b"data"))
+        second = self.storage.save("posts/b.jpg", ContentFile(b"data"))
+        other = self.storage.save("posts/c.jpg", ContentFile(b"other"))
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        self.assertRegex(first, r"^posts/[0-9a-f]{64}\.jpg$")
+        self.assertEqual(len(os.listdir(self.storage.path("posts"))), 2)
+
+    def test_file_deleted_with_last_reference(self):
+        name = self.storage.save("posts/a.jpg", ContentFile(b"data"))
+        media.acquire(name)
+        media.acquire(name)
+        media.release(name)
+        self.assertTrue(self.storage.exists(name))
+        media.release(name)
+        self.assertFalse(self.storage.exists(name))
+        self.assertFalse(StoredFile.objects.exists())
+
+    def test_untracked_file_kept(self):
+        name = self.storage.save("posts/a.jpg", ContentFile(b"data"))
+        media.release(name)
+        self.assertTrue(self.storage.exists(name))
+
+
+class ASGIHandlerTests(TransactionTestCase):
+    def request(self, method, path, body=b"", headers=()):
+        from yatube.asgi import application
+
+        async def main():
+            inbox = asyncio.Queue()
+            # Тело приходит двумя частями, как от настоящего сервера.
+            middle = len(body) // 2
+            await inbox.put({
+                "type": "http.request",
+                "body": body[:middle],
+                "more_body": True,
+            })
+            await inbox.put({"type": "http.request", "body": body[middle:]})
+            sent = []
+
+            async def send(message):
+                sent.append(message)
+
+            scope = {
+                "type": "http",
+                "method": method,
+                "path": path,
+                "query_string": b"",
+                "headers": [(b"host", b"testserver"), *headers],
+            }
+            await application(scope, inbox.get, send)
+            return sent
+
+        sent = asyncio.run(main())
+        headers = dict(sent[0]["headers"])
+        body = b"".join(message.get("body", b"") for message in sent[1:])
+        return sent[0]["status"], headers, body
+
+    def test_pages(self):
+        status, headers, body = self.request("GET", "/")
+        self.assertEqual(status, HTTPStatus.OK)
+        self.assertTrue(headers[b"Content-Type"].startswith(b"text/html"))
+        self.assertIn("Последние обновления".encode(), body)
+        status, _, _ = self.request("GET", "/nonexist-page/")
+        self.assertEqual(status, HTTPStatus.NOT_FOUND)
+
+    def test_post_body_and_cookies(self):
+        """Тело POST и куки доходят до Django, куки ответа — до клиента."""
+        User.objects.create_user(username="user", password="secret")
+        token = "a" * 64
+        status, headers, _ = self.request(
+            "POST",
+            "/auth/login/",
+            "username=user&password=secret&csrfmiddlewaretoken={}".format(
+                token
+            ).encode(),
+            [
+                (b"content-type", b"application/x-www-form-urlencoded"),
+                (b"cookie", "csrftoken={}".format(token).encode()),
+            ],
+        )
+        self.assertEqual(status, HTTPStatus.FOUND)
+        self.assertIn(b"sessionid=", headers[b"set-cookie"])
+
+    def test_async_page_metrics(self):
+        """SQL из потоков асинхронной страницы попадает в её метрики."""
+        cache.clear()
+        monitoring.registry.reset()
+        self.request("GET", "/")
+        totals = monitoring.registry.totals["posts.async_views.index"]
+        self.assertGreater(totals["queries"], 0)
+
+    def test_events_are_routed_to_sse(self):
+        status, _, _ = self.request("GET", "/events/group/missing/")
+        self.assertEqual(status, HTTPStatus.NOT_FOUND)
@@ -0,0 +1,172 @@
+"""Асинхронные версии страниц только для чтения.
+
+Делают то же, что index, group_posts, profile, post_detail и
+follow_index из posts.views, но независимые обращения к базе и кешу
+одной страницы выполняются одновременно: число постов ленты считается
+параллельно с выборкой страницы, счётчики автора и проверка подписки —
+параллельно с лентой, первая порция комментариев — параллельно с постом.
+Выигрыш только во времени ответа: одновременно страница занимает до
+четырёх потоков и соединений пула core.aio.
+
+Подключаются через yatube.asgi_urls, то есть только под ASGI
+(yatube/asgi.py); WSGI-процессы продолжают обслуживать posts.views.
+"""
+import asyncio
+
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.core.paginator import Page, Paginator
+from django.db.models import QuerySet
+from django.shortcuts import get_object_or_404, render
+from django.urls import path
+from django.views.decorators.http import condition
+
+from core.aio import async_view, run_in_thread
+
+from . import comments, etags, feed_cache, ingest
+from .counters import get_stats
+from .forms import CommentForm
+from .models import Follow, Group, Post, User
+from .paginators import CursorPaginator
+from .timeline import timeline_posts
+from .views import NUMBER_POSTS
+
+
+def _page_number(request):
+    try:
+        return max(int(request.GET.get("page", 1)), 1)
+    except ValueError:
+        return 1
+
+
+async def _paginate(posts, request):
+    """То же, что views._paginate, но count и страница — одновременно."""
+    cursor = request.GET.get("cursor")
+    if isinstance(posts, QuerySet) and (cursor is not None or (
+        settings.POSTS_CURSOR_PAGINATION and "page" not in request.GET
+    )):
+        paginator = CursorPaginator(posts, NUMBER_POSTS)
+        return await run_in_thread(paginator.get_page, cursor)
+    paginator = Paginator(posts, NUMBER_POSTS)
+    number = _page_number(request)
+    bottom = (number - 1) * NUMBER_POSTS
+    count, object_list = await asyncio.gather(
+        run_in_thread(paginator.object_list.count),
+        run_in_thread(list, posts[bottom:bottom + NUMBER_POSTS]),
+    )
+    # count — cached_property, подставляем уже посчитанное значение.
+    paginator.count = count
+    if number > paginator.num_pages:
+        # Номер за концом ленты: как get_page(), отдаём последнюю страницу.
+        return await run_in_thread(paginator.get_page, number)
+    return Page(object_list, number, paginator)
+
+
+async def _feed_page(posts, request, feed):
+    """Асинхронный views.paginator_func для названной ленты."""
+    version = await run_in_thread(feed_cache.get_version, feed)
+    page_obj = await run_in_thread(
+        feed_cache.get_page, feed, version, request, posts, NUMBER_POSTS
+    )
+    if page_obj is None:
+        page_obj = await _paginate(posts, request)
+        await run_in_thread(
+            feed_cache.set_page, feed, version, request, page_obj
+        )
+    return page_obj
+
+
+async def _render(request, template_name, context):
+    return await run_in_thread(render, request, template_name, context)
+
+
+async def index(request):
+    posts = Post.objects.for_feed()
+    page_obj = await _feed_page(posts, request, feed_cache.GLOBAL_FEED)
+    return await _render(request, "posts/index.html", {"page_obj": page_obj})
+
+
+async def group_posts(request, slug):
+    group = await run_in_thread(get_object_or_404, Group, slug=slug)
+    posts = group.posts.for_feed()
+    page_obj = await _feed_page(
+        posts, request, feed_cache.group_feed(group.pk)
+    )
+    context = {
+        "group": group,
+        "page_obj": page_obj,
+        "posts": posts,
+    }
+    return await _render(request, "posts/group_list.html", context)
+
+
+def _is_following(user, author):
+    return user.is_authenticated and Follow.objects.filter(
+        user=user, author=author
+    ).exists()
+
+
+async def profile(request, username):
+    author = await run_in_thread(get_object_or_404, User, username=username)
+    posts = author.posts.for_feed()
+    page_obj, stats, following = await asyncio.gather(
+        _feed_page(posts, request, feed_cache.author_feed(author.pk)),
+        run_in_thread(get_stats, author),
+        run_in_thread(_is_following, request.user, author),
+    )
+    context = {
+        "author": author,
+        "page_obj": page_obj,
+        "posts_count": stats.posts_count,
+        "followers_count": stats.followers_count,
+        "following": following,
+    }
+    return await _render(request, "posts/profile.html", context)
+
+
+async def post_detail(request, post_id):
+    post, comment_page, pending = await asyncio.gather(
+        run_in_thread(
+            get_object_or_404,
+            Post.objects.for_feed().select_related("author__stats"),
+            pk=post_id,
+        ),
+        run_in_thread(comments.comment_page, post_id, request),
+        run_in_thread(ingest.pending_comments, post_id, request.user),
+    )
+    stats = await run_in_thread(get_stats, post.author)
+    context = {
+        "post": post,
+        "author": post.author,
+        "posts_count": stats.posts_count,
+        "comments": comment_page,
+        "pending_comments": pending,
+        "form": CommentForm(request.POST or None),
+    }
+    return await _render(request, "posts/post_detail.html", context)
+
+
+async def follow_index(request):
+    posts = await run_in_thread(timeline_posts, request.user)
+    page_obj = await _paginate(posts.for_feed(), request)
+    return await _render(request, "posts/follow.html", {"page_obj": page_obj})
+
+
+# Пути и декораторы те же, что у posts.views; имена маршрутов остаются
+# за posts.urls, поэтому reverse() работает одинаково в обоих режимах.
+urlpatterns = [
+    path(
+        "group/<slug:slug>/",
+        condition(etag_func=etags.group_etag)(async_view(group_posts)),
+    ),
+    path(
+        "profile/<str:username>/",
+        condition(etag_func=etags.profile_etag)(async_view(profile)),
+    ),
+    path(
+        "posts/<int:post_id>/",
+        condition(etag_func=etags.post_detail_etag)(async_view(post_detail)),
+    ),
+    path("follow/", login_required(async_view(follow_index))),
+    path("", condition(etag_func=etags.index_etag)(async_view(index))),
+]
@@ -0,0 +1,86 @@
+"""Комментарии поста порциями по курсору и ответы одного уровня.
+
+Страница поста показывает только первую порцию корневых комментариев,
+поэтому её стоимость не зависит от их числа. Следующие порции и ответы
+ветки подгружает posts:comment_list — HTML-фрагментом или JSON. Порядок
+задаётся ?order=newest|oldest: корневые по умолчанию новые сверху,
+ответы — по порядку.
+"""
+from django.conf import settings
+from django.urls import reverse
+from django.utils.http import urlencode
+
+from .models import Comment
+from .paginators import CursorPaginator
+
+ORDERS = ("newest", "oldest")
+
+
+def get_order(request, parent_id=None):
+    order = request.GET.get("order")
+    if order in ORDERS:
+        return order
+    return "newest" if parent_id is None else "oldest"
+
+
+def get_parent_id(request):
+    """id ветки из ?parent=; None — корневые комментарии."""
+    try:
+        return int(request.GET["parent"])
+    except (KeyError, ValueError):
+        return None
+
+
+def comment_page(post_id, request, parent_id=None):
+    """Порция корневых комментариев поста или ответов ветки parent_id."""
+    order = get_order(request, parent_id)
+    comments = Comment.objects.with_related().filter(
+        post_id=post_id, parent_id=parent_id
+    )
+    paginator = CursorPaginator(
+        comments,
+        settings.POSTS_COMMENTS_PER_PAGE,
+        date_field="created",
+        ascending=order == "oldest",
+    )
+    page = paginator.get_page(request.GET.get("cursor"))
+    page.order = order
+    page.next_url = None
+    if page.has_next():
+        query = {"cursor": page.next_cursor, "order": order}
+        if parent_id is not None:
+            query["parent"] = parent_id
+        page.next_url = "{}?{}".format(
+            reverse("posts:comment_list", args=[post_id]), urlencode(query)
+        )
+    return page
+
+
+def resolve_parent(post_id, value):
+    """Корень ветки для ответа на комментарий value того же поста.
+
+    Ответ на ответ попадает в ту же ветку; неизвестный комментарий
+    даёт None, и ответ становится обычным комментарием.
+    """
+    try:
+        pk = int(value)
+    except (TypeError, ValueError):
+        return None
+    parent = Comment.objects.filter(pk=pk, post_id=post_id).values_list(
+        "pk", "parent_id"
+    ).first()
+    if parent is None:
+        return None
+    pk, parent_id = parent
+    return parent_id or pk
+
+
+def serialize(comment):
+    return {
+        "id": comment.pk,
+        "author": comment.author.username,
+        "text": comment.text,
+        "created": comment.created.isoformat(),
+        "parent": comment.parent_id,
+        "replies_count": comment.replies_count,
+    }
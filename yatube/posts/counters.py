@@ -0,0 +1,102 @@
+"""Денормализованные счётчики постов, подписок и комментариев.
+
+Счётчики меняются сигналами одним UPDATE с F()-выражением, поэтому
+параллельные запросы не теряют инкременты. Если значения разошлись с
+данными, их пересчитывает команда ``manage.py recount_stats``.
+"""
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Post, User, UserStats
+
+
+def recount(user_id):
+    """Считает счётчики пользователя заново и сохраняет их."""
+    stats, _ = UserStats.objects.update_or_create(
+        user_id=user_id,
+        defaults={
+            "posts_count": Post.objects.filter(author_id=user_id).count(),
+            "followers_count": Follow.objects.filter(
+                author_id=user_id
+            ).count(),
+            "following_count": Follow.objects.filter(
+                user_id=user_id
+            ).count(),
+        },
+    )
+    return stats
+
+
+def get_stats(user):
+    """Счётчики пользователя; при первом обращении они подсчитываются."""
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        return recount(user.pk)
+
+
+def bump(user_id, create=True, **deltas):
+    """Сдвигает счётчики пользователя на заданные величины.
+
+    Если строки со счётчиками ещё нет, она создаётся пересчётом, который
+    уже учитывает изменение. При удалении (create=False) строку не
+    создаём: пользователь может удаляться каскадом в этой же транзакции.
+    """
+    updated = UserStats.objects.filter(user_id=user_id).update(
+        **{name: F(name) + delta for name, delta in deltas.items()}
+    )
+    if not updated and create:
+        recount(user_id)
+
+
+def bump_comments(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comments_count=F("comments_count") + delta
+    )
+
+
+def bump_replies(comment_id, delta):
+    Comment.objects.filter(pk=comment_id).update(
+        replies_count=F("replies_count") + delta
+    )
+
+
+def _count_subquery(model, field):
+    counts = (
+        model.objects.filter(**{field: OuterRef("pk")})
+        .order_by()
+        .values(field)
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+@transaction.atomic
+def recount_all():
+    """Пересчитывает все счётчики массовыми запросами.
+
+    Возвращает число пользователей, для которых записаны счётчики.
+    """
+    Post.objects.update(comments_count=_count_subquery(Comment, "post"))
+    Comment.objects.update(replies_count=_count_subquery(Comment, "parent"))
+    UserStats.objects.all().delete()
+    users = User.objects.annotate(
+        posts_total=_count_subquery(Post, "author"),
+        followers_total=_count_subquery(Follow, "author"),
+        following_total=_count_subquery(Follow, "user"),
+    ).values_list("pk", "posts_total", "followers_total", "following_total")
+    stats = UserStats.objects.bulk_create(
+        (
+            UserStats(
+                user_id=pk,
+                posts_count=posts_total,
+                followers_count=followers_total,
+                following_count=following_total,
+            )
+            for pk, posts_total, followers_total, following_total in users
+        ),
+        batch_size=1000,
+    )
+    return len(stats)
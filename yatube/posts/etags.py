@@ -0,0 +1,87 @@
+"""ETag для условных GET-запросов к лентам и странице поста.
+
+Значения собираются без рендеринга: из счётчиков поколений лент
+(feed_cache) и, для страницы поста, из числа и последнего id
+комментариев. В ETag входят пользователь (от него зависят шапка и кнопка
+подписки) и строка запроса (номер страницы или курсор), а для страницы
+поста с формой комментария — ещё и CSRF-токен. Если ETag
+совпал с If-None-Match, декоратор condition отвечает 304 и представление
+не вызывается.
+
+Last-Modified не отдаётся: pub_date и created не меняются при правке
+поста, подписке или готовности превью, и клиент, присылающий только
+If-Modified-Since, получал бы устаревшую страницу.
+"""
+import hashlib
+
+from django.db.models import Max
+from django.middleware.csrf import get_token
+
+from . import feed_cache, ingest
+from .models import Group, Post, User
+
+
+def _etag(request, *parts):
+    user = request.user.pk if request.user.is_authenticated else ""
+    raw = "|".join(map(str, (*parts, user, request.GET.urlencode())))
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def index_etag(request):
+    return _etag(request, feed_cache.get_version(feed_cache.GLOBAL_FEED))
+
+
+def group_etag(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        "pk", flat=True
+    ).first()
+    if group_id is None:
+        return None
+    feed = feed_cache.group_feed(group_id)
+    return _etag(request, feed, feed_cache.get_version(feed))
+
+
+def profile_etag(request, username):
+    author_id = User.objects.filter(username=username).values_list(
+        "pk", flat=True
+    ).first()
+    if author_id is None:
+        return None
+    # Лента автора меняет поколение и при подписке на него, так что
+    # счётчики и кнопка подписки тоже учтены.
+    feed = feed_cache.author_feed(author_id)
+    return _etag(request, feed, feed_cache.get_version(feed))
+
+
+def _csrf_token(request):
+    """CSRF-токен из куки запроса; вход и выход его меняют.
+
+    get_token() заводит токен, если куки ещё нет, и тот же токен уходит
+    в куке ответа, так что следующий запрос даёт тот же ETag.
+    """
+    if not request.user.is_authenticated:
+        return ""
+    get_token(request)
+    return request.META["CSRF_COOKIE"]
+
+
+def post_detail_etag(request, post_id):
+    post = Post.objects.filter(pk=post_id).order_by().annotate(
+        last_comment_id=Max("comments__pk")
+    ).values_list("author_id", "comments_count", "last_comment_id").first()
+    if post is None:
+        return None
+    author_id, comments_count, last_comment_id = post
+    # Правка поста и готовность превью меняют поколение ленты автора.
+    feed = feed_cache.author_feed(author_id)
+    return _etag(
+        request,
+        post_id,
+        feed_cache.get_version(feed),
+        comments_count,
+        last_comment_id,
+        # Свои комментарии, ещё не записанные буфером, тоже на странице.
+        ingest.pending_tokens(post_id, request.user),
+        # Страница с 304 должна нести действующий токен формы.
+        _csrf_token(request),
+    )
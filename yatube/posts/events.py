@@ -0,0 +1,160 @@
+"""Уведомления о новых постах для открытых страниц лент.
+
+Сохранение нового поста публикует событие в каналы его лент (те же
+имена, что в feed_cache: общая, группы, автора). Подписчики — потоки
+Server-Sent Events в posts.sse — держат на клиента лишь счётчик и
+asyncio.Event, поэтому тысячи простаивающих соединений почти ничего
+не стоят.
+
+Брокер задаётся настройкой POSTS_EVENTS_BROKER:
+
+* LocalBroker — внутри процесса; годится, когда сайт и SSE работают
+  в одном процессе (разработка, тесты);
+* RedisBroker — через Redis pub/sub (нужен пакет ``redis``), для
+  развёртывания, где WSGI и ASGI — разные процессы.
+"""
+import asyncio
+import json
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from . import feed_cache
+
+
+class Subscription:
+    """Счётчик новых постов для одного клиента.
+
+    Создаётся внутри работающего цикла asyncio, а notify() можно вызывать
+    из любого потока.
+    """
+
+    def __init__(self, broker, channels):
+        self.broker = broker
+        self.channels = channels
+        self.loop = asyncio.get_running_loop()
+        self.changed = asyncio.Event()
+        self.count = 0
+        self.latest = None
+
+    def notify(self, message):
+        try:
+            self.loop.call_soon_threadsafe(self._notify, message)
+        except RuntimeError:
+            # Цикл уже закрыт, клиент ушёл.
+            pass
+
+    def _notify(self, message):
+        self.count += 1
+        self.latest = message["post"]
+        self.changed.set()
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class LocalBroker:
+    def __init__(self, location=None):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    async def start(self):
+        pass
+
+    def subscribe(self, channels):
+        subscription = Subscription(self, list(channels))
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscribers[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscribers.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[channel]
+
+    def subscribers_count(self):
+        with self._lock:
+            return len(set().union(*self._subscribers.values()))
+
+    def publish(self, channels, message):
+        self._deliver(channels, message)
+
+    def _deliver(self, channels, message):
+        with self._lock:
+            targets = set().union(
+                *(self._subscribers.get(channel, ()) for channel in channels)
+            )
+        for subscription in targets:
+            subscription.notify(message)
+
+
+class RedisBroker(LocalBroker):
+    """Публикует через Redis; каждый ASGI-процесс слушает один канал
+    и раздаёт события своим подписчикам как LocalBroker.
+    """
+
+    channel = "posts:events"
+
+    def __init__(self, location=None):
+        super().__init__(location)
+        try:
+            import redis
+        except ImportError as error:
+            raise ImproperlyConfigured(
+                "Для RedisBroker установите пакет redis."
+            ) from error
+        self._location = location
+        self._client = redis.Redis.from_url(location)
+        self._listener = None
+
+    async def start(self):
+        if self._listener is None:
+            self._listener = asyncio.ensure_future(self._listen())
+
+    async def _listen(self):
+        import redis.asyncio
+
+        pubsub = redis.asyncio.Redis.from_url(self._location).pubsub()
+        await pubsub.subscribe(self.channel)
+        async for item in pubsub.listen():
+            if item["type"] != "message":
+                continue
+            data = json.loads(item["data"])
+            self._deliver(data["channels"], data["message"])
+
+    def publish(self, channels, message):
+        self._client.publish(
+            self.channel,
+            json.dumps({"channels": list(channels), "message": message}),
+        )
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            broker_class = import_string(settings.POSTS_EVENTS_BROKER)
+            _broker = broker_class(settings.POSTS_EVENTS_LOCATION)
+        return _broker
+
+
+def publish_post(post):
+    """Сообщает подписчикам лент нового поста о нём после коммита."""
+    message = {"post": post.pk}
+    channels = feed_cache.feeds_for_post(post)
+    transaction.on_commit(
+        lambda: get_broker().publish(channels, message)
+    )
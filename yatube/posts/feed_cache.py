@@ -0,0 +1,138 @@
+"""Кеш лент с версиями (поколениями) для каждой ленты.
+
+У каждой ленты (общей, группы, автора) есть счётчик поколения. Он входит
+в ключи кеша страницы, поэтому сохранение или удаление поста просто
+увеличивает счётчик, и старые ключи больше не читаются. TTL при этом
+может быть долгим, а инвалидация происходит сразу.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+from django.utils.functional import SimpleLazyObject
+
+from .paginators import CursorPage, CursorPaginator
+
+GLOBAL_FEED = "global"
+
+
+def group_feed(group_id):
+    return f"group:{group_id}"
+
+
+def author_feed(author_id):
+    return f"author:{author_id}"
+
+
+def _version_key(feed):
+    return f"posts:feed-version:{feed}"
+
+
+def _initial_version():
+    # Если ключ версии вытеснен из кеша, новая версия не должна совпасть
+    # со старой, поэтому начинаем не с единицы, а с текущего времени.
+    return int(time.time() * 1000000)
+
+
+def get_version(feed):
+    version = cache.get(_version_key(feed))
+    if version is None:
+        version = _initial_version()
+        cache.add(_version_key(feed), version, None)
+        version = cache.get(_version_key(feed), version)
+    return version
+
+
+def bump(*feeds):
+    """Делает устаревшими все закешированные страницы указанных лент."""
+    for feed in feeds:
+        try:
+            cache.incr(_version_key(feed))
+        except ValueError:
+            cache.set(_version_key(feed), _initial_version(), None)
+
+
+def feeds_for_post(post, previous_group_id=None):
+    feeds = [GLOBAL_FEED, author_feed(post.author_id)]
+    for group_id in {post.group_id, previous_group_id}:
+        if group_id is not None:
+            feeds.append(group_feed(group_id))
+    return feeds
+
+
+def _page_key(feed, version, request):
+    position = "{}|{}".format(
+        request.GET.get("page", ""), request.GET.get("cursor", "")
+    )
+    digest = hashlib.md5(position.encode()).hexdigest()
+    return f"posts:feed-page:{feed}:{version}:{digest}"
+
+
+def get_ids(feed, version, posts, limit):
+    """id первых limit постов ленты, закешированные на это поколение."""
+    key = f"posts:feed-ids:{feed}:{version}:{limit}"
+    ids = cache.get(key)
+    if ids is None:
+        ids = list(posts.order_by("-pub_date", "-pk").values_list(
+            "pk", flat=True
+        )[:limit])
+        cache.set(key, ids, settings.POSTS_FEED_CACHE_TIMEOUT)
+    return ids
+
+
+def _lazy_posts(posts, ids):
+    def load():
+        by_pk = posts.in_bulk(ids)
+        return [by_pk[pk] for pk in ids if pk in by_pk]
+    return SimpleLazyObject(load)
+
+
+def get_page(feed, version, request, posts, per_page):
+    """Собирает страницу по закешированному списку id или возвращает None.
+
+    Посты загружаются только при обращении к странице, так что при
+    попадании во фрагментный кеш шаблона запросов к постам нет совсем.
+    """
+    data = cache.get(_page_key(feed, version, request))
+    if data is None:
+        return None
+    object_list = _lazy_posts(posts, data["ids"])
+    if data["kind"] == "cursor":
+        page = CursorPage(
+            object_list,
+            CursorPaginator(posts, per_page),
+            request.GET.get("cursor"),
+            data["has_next"],
+            data["has_previous"],
+        )
+    else:
+        paginator = Paginator(posts, per_page)
+        # count — cached_property, заранее подставляем сохранённое значение.
+        paginator.count = data["count"]
+        page = Page(object_list, data["number"], paginator)
+    page.feed_version = version
+    return page
+
+
+def set_page(feed, version, request, page):
+    data = {"ids": [post.pk for post in page]}
+    if isinstance(page, CursorPage):
+        data.update(
+            kind="cursor",
+            has_next=page.has_next(),
+            has_previous=page.has_previous(),
+        )
+    else:
+        data.update(
+            kind="page",
+            number=page.number,
+            count=page.paginator.count,
+        )
+    cache.set(
+        _page_key(feed, version, request),
+        data,
+        settings.POSTS_FEED_CACHE_TIMEOUT,
+    )
+    page.feed_version = version
@@ -1,5 +1,6 @@
 from django import forms
 
+from . import uploads
 from .models import Comment, Post
 
 
@@ -18,6 +19,25 @@ class PostForm(forms.ModelForm):
         help_text = {"group": "Группа поста"}
         fields = ("group", "text", "image")
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Поле остаётся ImageField, меняется только разбор загрузки.
+        self.fields["image"].to_python = self.image_to_python
+
+    def image_to_python(self, data):
+        """Проверяет картинку по заголовку и нормализует её в uploads.
+
+        ImageField.to_python вызывает verify() на всём файле, а нам нужен
+        только разбор заголовка, поэтому берём проверки FileField.
+        """
+        f = forms.FileField.to_python(self.fields["image"], data)
+        if f is None:
+            return None
+        try:
+            return uploads.normalize(f, uploads.inspect(f))
+        except uploads.ImageRejected as exc:
+            raise forms.ValidationError(str(exc), code="invalid_image")
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
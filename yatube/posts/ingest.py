@@ -0,0 +1,366 @@
+"""Отложенная пакетная запись комментариев.
+
+При POSTS_COMMENT_BUFFER add_comment не вставляет комментарий сразу,
+а кладёт его в буфер процесса. Буфер сбрасывается в базу одним
+bulk_create, когда набралось POSTS_COMMENT_BATCH_SIZE комментариев или
+прошло POSTS_COMMENT_FLUSH_INTERVAL секунд, и счётчики комментариев
+постов и ответов веток меняются одним UPDATE на пакет. Во время
+«шторма» комментариев к горячему посту блокировку записи SQLite берёт
+один поток раз в интервал, а не каждый запрос.
+
+Буферы:
+
+* CommentBuffer — в памяти; комментарии, не дождавшиеся сброса,
+  пропадают при падении процесса;
+* DurableCommentBuffer — каждый комментарий до ответа пользователю
+  дописывается в журнал процесса в POSTS_COMMENT_LOG_DIR. Журналы
+  упавших процессов досылает команда ``manage.py flush_comment_log``
+  (запускается до старта воркеров, как migrate).
+
+Автор видит свой комментарий сразу: пока комментарий в буфере, он
+лежит в кеше в списке ожидающих для пары (пост, автор), и страница
+поста показывает его вместе с сохранёнными. Сигналы post_save для
+пакета не отправляются, поэтому всё, что они делали бы, делает сброс.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.module_loading import import_string
+
+from .models import Comment, Post, User
+
+logger = logging.getLogger(__name__)
+
+PENDING_TIMEOUT = 60 * 60
+
+
+def _pending_key(post_id, author_id):
+    return f"posts:pending_comments:{post_id}:{author_id}"
+
+
+def pending_comments(post_id, user):
+    """Комментарии пользователя к посту, ещё не записанные в базу."""
+    if settings.POSTS_COMMENT_BUFFER is None or not user.is_authenticated:
+        return []
+    entries = cache.get(_pending_key(post_id, user.pk)) or []
+    return [
+        Comment(
+            post_id=entry["post"],
+            author=user,
+            text=entry["text"],
+            parent_id=entry["parent"],
+            created=parse_datetime(entry["created"]),
+        )
+        for entry in entries
+    ]
+
+
+def pending_tokens(post_id, user):
+    """Метки ожидающих комментариев: входят в ETag страницы поста."""
+    if settings.POSTS_COMMENT_BUFFER is None or not user.is_authenticated:
+        return ""
+    entries = cache.get(_pending_key(post_id, user.pk)) or []
+    return ",".join(entry["token"] for entry in entries)
+
+
+def _add_pending(entry):
+    key = _pending_key(entry["post"], entry["author"])
+    entries = cache.get(key) or []
+    cache.set(key, [*entries, entry], PENDING_TIMEOUT)
+
+
+def _remove_pending(entries):
+    tokens = {}
+    for entry in entries:
+        key = _pending_key(entry["post"], entry["author"])
+        tokens.setdefault(key, set()).add(entry["token"])
+    for key, flushed in tokens.items():
+        left = [
+            entry for entry in cache.get(key) or []
+            if entry["token"] not in flushed
+        ]
+        if left:
+            cache.set(key, left, PENDING_TIMEOUT)
+        else:
+            cache.delete(key)
+
+
+def _increments(field, deltas):
+    """F(field) + n для каждой строки из deltas одним выражением."""
+    return F(field) + Case(
+        *(When(pk=pk, then=Value(delta)) for pk, delta in deltas.items()),
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+
+def _keep_created(field):
+    """Даёт bulk_create записать заданную дату вместо auto_now_add.
+
+    Флаг ставится на сами объекты, а не на поле, поэтому комментарии,
+    которые в это время сохраняют другие потоки, получают текущее время.
+    """
+    pre_save = field.pre_save
+
+    def keep(model_instance, add):
+        if getattr(model_instance, "_keep_created", False):
+            return getattr(model_instance, field.attname)
+        return pre_save(model_instance, add)
+
+    field.pre_save = keep
+
+
+_keep_created(Comment._meta.get_field("created"))
+
+
+def _comment(entry):
+    comment = Comment(
+        post_id=entry["post"],
+        author_id=entry["author"],
+        text=entry["text"],
+        parent_id=entry["parent"],
+        created=parse_datetime(entry["created"]),
+    )
+    comment._keep_created = True
+    return comment
+
+
+def write_batch(entries):
+    """Записывает пакет комментариев; возвращает число записанных.
+
+    Комментарии к удалённым постам, ответы на удалённые комментарии и
+    комментарии удалённых авторов отбрасываются, чтобы один такой не
+    сорвал весь пакет. Дата комментария — время, когда его написали, а
+    не время сброса или повтора журнала.
+    """
+    post_ids = {entry["post"] for entry in entries}
+    parent_ids = {entry["parent"] for entry in entries} - {None}
+    author_ids = {entry["author"] for entry in entries}
+    live_posts = set(
+        Post.objects.filter(pk__in=post_ids).values_list("pk", flat=True)
+    )
+    live_parents = set(
+        Comment.objects.filter(pk__in=parent_ids).values_list(
+            "pk", flat=True
+        )
+    )
+    live_authors = set(
+        User.objects.filter(pk__in=author_ids).values_list("pk", flat=True)
+    )
+    comments = [
+        _comment(entry)
+        for entry in entries
+        if entry["post"] in live_posts
+        and entry["parent"] in live_parents | {None}
+        and entry["author"] in live_authors
+    ]
+    if len(comments) < len(entries):
+        logger.warning(
+            "Отброшено комментариев без поста, ветки или автора: %d",
+            len(entries) - len(comments),
+        )
+    posts, parents = {}, {}
+    for comment in comments:
+        posts[comment.post_id] = posts.get(comment.post_id, 0) + 1
+        if comment.parent_id is not None:
+            parents[comment.parent_id] = (
+                parents.get(comment.parent_id, 0) + 1
+            )
+    with transaction.atomic():
+        Comment.objects.bulk_create(comments)
+        if posts:
+            Post.objects.filter(pk__in=posts).update(
+                comments_count=_increments("comments_count", posts)
+            )
+        if parents:
+            Comment.objects.filter(pk__in=parents).update(
+                replies_count=_increments("replies_count", parents)
+            )
+    _remove_pending(entries)
+    return len(comments)
+
+
+class CommentBuffer:
+    """Буфер комментариев процесса со сбросом по размеру и по времени."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._pending = []
+        self._flusher = None
+        atexit.register(self.flush)
+
+    def add(self, comment):
+        """Ставит комментарий в очередь; возвращает его метку."""
+        entry = {
+            "token": uuid.uuid4().hex,
+            "post": comment.post_id,
+            "author": comment.author_id,
+            "text": comment.text,
+            "parent": comment.parent_id,
+            "created": timezone.now().isoformat(),
+        }
+        # Сначала в список ожидающих: иначе сброс мог бы успеть раньше,
+        # и запись в кеше осталась бы висеть.
+        _add_pending(entry)
+        with self._lock:
+            self._append(entry)
+            self._pending.append(entry)
+            if len(self._pending) >= settings.POSTS_COMMENT_BATCH_SIZE:
+                self._wakeup.notify()
+            self._start_flusher()
+        return entry["token"]
+
+    def _append(self, entry):
+        pass
+
+    def _start_flusher(self):
+        interval = settings.POSTS_COMMENT_FLUSH_INTERVAL
+        if self._flusher is not None or interval is None:
+            return
+        self._flusher = threading.Thread(
+            target=self._run, args=(interval,), name="comment-flusher",
+            daemon=True,
+        )
+        self._flusher.start()
+
+    def _run(self, interval):
+        while True:
+            with self._lock:
+                self._wakeup.wait(interval)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Не удалось записать пакет комментариев")
+            finally:
+                close_old_connections()
+
+    def _take(self):
+        """Забирает очередь; вызывается под блокировкой."""
+        entries, self._pending = self._pending, []
+        return entries, None
+
+    def _restore(self, entries, segments):
+        with self._lock:
+            self._pending[:0] = entries
+
+    def _done(self, segments):
+        pass
+
+    def flush(self):
+        """Записывает всё, что накопилось; возвращает число комментариев."""
+        with self._lock:
+            entries, segments = self._take()
+        if not entries:
+            self._done(segments)
+            return 0
+        try:
+            written = write_batch(entries)
+        except IntegrityError:
+            # Пост или автор удалён между проверкой и вставкой: такой
+            # пакет не запишется и со следующим сбросом.
+            written = self._write_each(entries)
+        except Exception:
+            # Пакет вернётся в очередь и уйдёт со следующим сбросом.
+            self._restore(entries, segments)
+            raise
+        self._done(segments)
+        return written
+
+    def _write_each(self, entries):
+        """Пишет пакет по одному; нарушающие ограничения отбрасывает."""
+        written = 0
+        for entry in entries:
+            try:
+                written += write_batch([entry])
+            except IntegrityError:
+                logger.exception("Отброшен комментарий %s", entry["token"])
+                _remove_pending([entry])
+        return written
+
+
+class DurableCommentBuffer(CommentBuffer):
+    """Буфер, который до ответа пишет каждый комментарий в журнал.
+
+    Журнал процесса делится на сегменты: при сбросе текущий файл
+    закрывается, и сегменты удаляются после коммита пакета. Комментарий
+    всегда лежит либо в текущем файле, либо в закрытом сегменте.
+    """
+
+    def __init__(self):
+        self._directory = settings.POSTS_COMMENT_LOG_DIR
+        os.makedirs(self._directory, exist_ok=True)
+        self._prefix = f"comments-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._sequence = 0
+        self._file = None
+        self._segments = []
+        super().__init__()
+
+    def _open(self):
+        self._sequence += 1
+        path = os.path.join(
+            self._directory, f"{self._prefix}-{self._sequence}.ndjson"
+        )
+        self._file = open(path, "a", encoding="utf-8")
+
+    def _append(self, entry):
+        if self._file is None:
+            self._open()
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def _take(self):
+        entries, _ = super()._take()
+        if self._file is not None:
+            self._file.close()
+            self._segments.append(self._file.name)
+            self._file = None
+        segments, self._segments = self._segments, []
+        return entries, segments
+
+    def _restore(self, entries, segments):
+        with self._lock:
+            self._pending[:0] = entries
+            self._segments[:0] = segments
+
+    def _done(self, segments):
+        for path in segments or ():
+            os.remove(path)
+
+
+def read_log(path):
+    with open(path, encoding="utf-8") as log:
+        # Последняя строка могла остаться недописанной при падении.
+        entries = []
+        for line in log:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                logger.warning("Пропущена повреждённая строка в %s", path)
+        return entries
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_buffer():
+    """Буфер процесса или None, если комментарии пишутся сразу."""
+    global _buffer
+    if settings.POSTS_COMMENT_BUFFER is None:
+        return None
+    with _buffer_lock:
+        if _buffer is None:
+            _buffer = import_string(settings.POSTS_COMMENT_BUFFER)()
+        return _buffer
@@ -0,0 +1,170 @@
+import asyncio
+import io
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+
+from posts.models import Group, Post, User
+
+
+def _environ(path):
+    path, _, query = path.partition("?")
+    return {
+        "REQUEST_METHOD": "GET",
+        "SCRIPT_NAME": "",
+        "PATH_INFO": path,
+        "QUERY_STRING": query,
+        "SERVER_NAME": "localhost",
+        "SERVER_PORT": "80",
+        "SERVER_PROTOCOL": "HTTP/1.1",
+        "HTTP_HOST": "localhost",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": "http",
+        "wsgi.input": io.BytesIO(),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+
+
+def _summary(latencies, elapsed):
+    latencies = sorted(latencies)
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50": statistics.median(latencies) * 1000,
+        "p99": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает пропускную способность страниц под WSGI и под ASGI "
+        "(yatube/asgi.py) при одновременных запросах внутри процесса."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=500,
+            help="Сколько запросов сделать к каждой странице.",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=50,
+            help="Сколько клиентов запрашивают страницу одновременно.",
+        )
+        parser.add_argument(
+            "--threads",
+            type=int,
+            default=8,
+            help="Число потоков WSGI-сервера (как gthread у gunicorn).",
+        )
+        parser.add_argument(
+            "--path",
+            action="append",
+            dest="paths",
+            help="Страница для замера; по умолчанию основные ленты.",
+        )
+
+    def default_paths(self):
+        paths = ["/"]
+        group = Group.objects.first()
+        if group is not None:
+            paths.append(f"/group/{group.slug}/")
+        author = User.objects.filter(posts__isnull=False).first()
+        if author is not None:
+            paths.append(f"/profile/{author.username}/")
+        post = Post.objects.order_by("-comments_count").first()
+        if post is not None:
+            paths.append(f"/posts/{post.pk}/")
+        return paths
+
+    def run_wsgi(self, path, total, concurrency, threads):
+        application = get_wsgi_application()
+
+        def serve():
+            response = application(
+                _environ(path), lambda status, headers: None
+            )
+            try:
+                b"".join(response)
+            finally:
+                response.close()
+
+        def request(server):
+            # Время клиента: вместе с ожиданием свободного потока сервера.
+            started = time.perf_counter()
+            server.submit(serve).result()
+            return time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as server, \
+                ThreadPoolExecutor(max_workers=concurrency) as clients:
+            latencies = list(clients.map(
+                lambda _: request(server), range(total)
+            ))
+        return _summary(latencies, time.perf_counter() - started)
+
+    def run_asgi(self, path, total, concurrency):
+        from yatube.asgi import django_application
+
+        path, _, query = path.partition("?")
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "path": path,
+            "query_string": query.encode(),
+            "headers": [(b"host", b"localhost")],
+        }
+
+        async def request():
+            async def receive():
+                return {"type": "http.request", "body": b""}
+
+            async def send(message):
+                pass
+
+            started = time.perf_counter()
+            await django_application(scope, receive, send)
+            return time.perf_counter() - started
+
+        async def client(count, latencies):
+            for _ in range(count):
+                latencies.append(await request())
+
+        async def main():
+            latencies = []
+            clients = [
+                client(total // concurrency + (i < total % concurrency),
+                       latencies)
+                for i in range(concurrency)
+            ]
+            started = time.perf_counter()
+            await asyncio.gather(*clients)
+            return _summary(latencies, time.perf_counter() - started)
+
+        return asyncio.run(main())
+
+    def handle(self, *args, **options):
+        total = options["requests"]
+        concurrency = options["concurrency"]
+        for path in options["paths"] or self.default_paths():
+            self.stdout.write(self.style.MIGRATE_HEADING(path))
+            results = {
+                "wsgi": self.run_wsgi(
+                    path, total, concurrency, options["threads"]
+                ),
+                "asgi": self.run_asgi(path, total, concurrency),
+            }
+            for mode, result in results.items():
+                self.stdout.write(
+                    "{}: {rps:.0f} запросов/с, p50 {p50:.1f} мс, "
+                    "p99 {p99:.1f} мс".format(mode, **result)
+                )
@@ -0,0 +1,179 @@
+import json
+import statistics
+import subprocess
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Comment, Follow, Group, Post, User
+
+
+def _percentile(latencies, share):
+    return latencies[max(int(len(latencies) * share) - 1, 0)] * 1000
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=settings.BASE_DIR,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Замеряет p50/p99 и число SQL-запросов основных страниц и "
+        "сохраняет результат в JSON для сравнения между коммитами."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=200,
+            help="Сколько замеряемых запросов сделать к каждой странице.",
+        )
+        parser.add_argument(
+            "--warmup",
+            type=int,
+            default=20,
+            help="Сколько запросов сделать до замера.",
+        )
+        parser.add_argument(
+            "--cold",
+            action="store_true",
+            help="Очищать кеш перед каждым запросом.",
+        )
+        parser.add_argument("--output", help="Куда сохранить JSON.")
+        parser.add_argument(
+            "--compare",
+            help="JSON прошлого замера: показать изменения относительно него.",
+        )
+
+    def pages(self):
+        """Страницы и читатель ленты подписок: всегда одни и те же.
+
+        Берутся самое большое сообщество, автор с наибольшим числом
+        постов, пост с наибольшим числом комментариев и пользователь
+        с наибольшим числом подписок; при равенстве — меньший id.
+        """
+        pages = {"index": reverse("posts:index")}
+        group = Group.objects.annotate(
+            total=Count("posts")
+        ).order_by("-total", "pk").first()
+        if group is not None:
+            pages["group_posts"] = reverse(
+                "posts:group_list", args=[group.slug]
+            )
+        author = User.objects.annotate(
+            total=Count("posts")
+        ).order_by("-total", "pk").first()
+        if author is not None:
+            pages["profile"] = reverse("posts:profile", args=[author.username])
+        post = Post.objects.order_by("-comments_count", "pk").first()
+        if post is not None:
+            pages["post_detail"] = reverse(
+                "posts:post_detail", args=[post.pk]
+            )
+        reader = User.objects.annotate(
+            total=Count("follower")
+        ).order_by("-total", "pk").first()
+        if reader is not None:
+            pages["follow_index"] = reverse("posts:follow_index")
+        return pages, reader
+
+    def measure(self, client, path, options):
+        def request():
+            if options["cold"]:
+                cache.clear()
+            started = time.perf_counter()
+            response = client.get(path)
+            elapsed = time.perf_counter() - started
+            if response.status_code != 200:
+                raise CommandError(f"{path}: {response.status_code}")
+            return elapsed
+
+        for _ in range(options["warmup"]):
+            request()
+        latencies = sorted(request() for _ in range(options["requests"]))
+        if options["cold"]:
+            cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            client.get(path)
+        return {
+            "path": path,
+            "p50": statistics.median(latencies) * 1000,
+            "p99": _percentile(latencies, 0.99),
+            "mean": statistics.mean(latencies) * 1000,
+            "queries": len(queries),
+        }
+
+    def handle(self, *args, **options):
+        if options["requests"] < 1:
+            raise CommandError("Нужен хотя бы один запрос.")
+        if settings.DEBUG:
+            self.stderr.write(
+                "DEBUG включён: замеры включают накладные расходы отладки."
+            )
+        pages, reader = self.pages()
+        anonymous, member = Client(), Client()
+        if reader is not None:
+            member.force_login(reader)
+        result = {
+            "commit": _commit(),
+            "date": timezone.now().isoformat(),
+            "database": connection.vendor,
+            "debug": settings.DEBUG,
+            "options": {
+                key: options[key] for key in ("requests", "warmup", "cold")
+            },
+            "rows": {
+                model.__name__.lower(): model.objects.count()
+                for model in (User, Group, Post, Comment, Follow)
+            },
+            "pages": {},
+        }
+        for name, path in pages.items():
+            client = member if name == "follow_index" else anonymous
+            result["pages"][name] = page = self.measure(client, path, options)
+            self.stdout.write(
+                "{}: p50 {p50:.1f} мс, p99 {p99:.1f} мс, "
+                "запросов {queries}".format(name, **page)
+            )
+        if options["compare"]:
+            with open(options["compare"], encoding="utf-8") as stream:
+                self.compare(json.load(stream), result)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as stream:
+                json.dump(result, stream, ensure_ascii=False, indent=2)
+
+    def compare(self, before, after):
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"Относительно {before.get('commit') or 'прошлого замера'}:"
+        ))
+        for name, page in after["pages"].items():
+            old = before["pages"].get(name)
+            if old is None:
+                continue
+            changes = [
+                "{} {:+.0f}%".format(
+                    metric, (page[metric] / old[metric] - 1) * 100
+                )
+                for metric in ("p50", "p99")
+                if old[metric]
+            ]
+            changes.append(
+                "запросов {} → {}".format(old["queries"], page["queries"])
+            )
+            self.stdout.write(f"{name}: {', '.join(changes)}")
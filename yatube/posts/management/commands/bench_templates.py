@@ -0,0 +1,112 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.template import RequestContext
+from django.template.backends.django import DjangoTemplates
+from django.test import RequestFactory
+from django.utils import timezone
+
+from posts.models import Group, Post, User
+
+LOADERS = [
+    "django.template.loaders.filesystem.Loader",
+    "django.template.loaders.app_directories.Loader",
+]
+
+# Страница ленты: base.html и карточка поста на каждой итерации цикла.
+PAGE = (
+    "{% extends 'base.html' %}{% load inline_include %}"
+    "{% block content %}{% for post in posts %}"
+    "{% TAG 'posts/includes/post_list.html' %}"
+    "{% endfor %}{% endblock %}"
+)
+PAGES = {
+    f"bench/{tag}.html": PAGE.replace("TAG", tag)
+    for tag in ("include", "inline_include")
+}
+
+
+def _posts(count):
+    """Посты в памяти: замеряется только отрисовка, без базы."""
+    group = Group(pk=1, title="Сообщество", slug="group")
+    now = timezone.now()
+    return [
+        Post(
+            pk=number,
+            text="Текст поста " * 20,
+            pub_date=now,
+            author=User(pk=number, username=f"author{number}"),
+            group=group if number % 2 else None,
+        )
+        for number in range(1, count + 1)
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает отрисовку ленты из 10 и 100 постов: загрузчик без "
+        "кеша и {% include %} (как при DEBUG) против cached.Loader и "
+        "{% inline_include %}."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=100,
+            help="Сколько раз отрисовать каждую страницу.",
+        )
+        parser.add_argument(
+            "--posts",
+            type=int,
+            nargs="+",
+            default=[10, 100],
+            help="Размеры страниц в постах.",
+        )
+
+    def engine(self, cached):
+        conf = settings.TEMPLATES[0]
+        loaders = [("django.template.loaders.locmem.Loader", PAGES), *LOADERS]
+        if cached:
+            loaders = [("django.template.loaders.cached.Loader", loaders)]
+        backend = DjangoTemplates({
+            "NAME": "bench",
+            "DIRS": conf["DIRS"],
+            "APP_DIRS": False,
+            "OPTIONS": {**conf["OPTIONS"], "loaders": loaders, "debug": False},
+        })
+        return backend.engine
+
+    def measure(self, engine, tag, posts, repeat):
+        request = RequestFactory().get("/")
+        request.user = AnonymousUser()
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            # Шаблон берётся у загрузчика, как render() в представлении.
+            template = engine.get_template(f"bench/{tag}.html")
+            template.render(RequestContext(request, {"posts": posts}))
+            timings.append(time.perf_counter() - started)
+        return statistics.median(timings) * 1000
+
+    def handle(self, *args, **options):
+        modes = [
+            ("без кеша, include", False, "include"),
+            ("cached.Loader, include", True, "include"),
+            ("cached.Loader, inline_include", True, "inline_include"),
+        ]
+        for count in options["posts"]:
+            posts = _posts(count)
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{count} постов"))
+            results = []
+            for label, cached, tag in modes:
+                engine = self.engine(cached)
+                median = self.measure(engine, tag, posts, options["repeat"])
+                results.append(median)
+                self.stdout.write(
+                    f"{label}: {median:.2f} мс "
+                    f"(×{results[0] / median:.1f})"
+                )
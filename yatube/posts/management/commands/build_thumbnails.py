@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = "Строит превью для постов с картинкой, у которых его ещё нет."
+
+    def handle(self, *args, **options):
+        post_ids = Post.objects.exclude(image="").filter(
+            thumbnail=""
+        ).values_list("pk", flat=True)
+        built = failed = 0
+        for post_id in post_ids.iterator():
+            try:
+                built += thumbnails.build(post_id)
+            except Exception as error:
+                failed += 1
+                self.stderr.write(f"Пост {post_id}: {error}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Превью построено: {built}, с ошибками: {failed}"
+            )
+        )
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        "Выгружает пользователей, сообщества, посты, комментарии и "
+        "подписки в NDJSON, картинки постов — в tar (см. posts.transfer)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Файл NDJSON для выгрузки.")
+        parser.add_argument(
+            "--images",
+            help="Архив tar, в который сложить картинки постов.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=2000,
+            help="Сколько строк читать из базы за один запрос.",
+        )
+
+    def handle(self, *args, **options):
+        with open(options["path"], "w", encoding="utf-8") as stream:
+            rows = transfer.export_rows(stream, options["chunk_size"])
+        for model, _, _ in transfer.EXPORTS:
+            self.stdout.write(f"{model}: {rows[model]}")
+        if options["images"]:
+            packed, missing = transfer.export_images(options["images"])
+            self.stdout.write(f"Картинок: {packed}, без файла: {missing}")
+        self.stdout.write(self.style.SUCCESS("Выгрузка готова"))
@@ -0,0 +1,24 @@
+import glob
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import ingest
+
+
+class Command(BaseCommand):
+    help = (
+        "Досылает в базу комментарии из журналов буфера, оставшихся "
+        "от остановленных процессов. Запускайте до старта воркеров."
+    )
+
+    def handle(self, *args, **options):
+        pattern = os.path.join(settings.POSTS_COMMENT_LOG_DIR, "*.ndjson")
+        written = 0
+        for path in sorted(glob.glob(pattern)):
+            written += ingest.write_batch(ingest.read_log(path))
+            os.remove(path)
+        self.stdout.write(
+            self.style.SUCCESS(f"Записано комментариев: {written}")
+        )
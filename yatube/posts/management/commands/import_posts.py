@@ -0,0 +1,64 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+from posts.models import Comment, Post
+
+
+class Command(BaseCommand):
+    help = (
+        "Загружает выгрузку export_posts пакетами bulk_create и "
+        "показывает скорость загрузки в строках в секунду."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Файл NDJSON из export_posts.")
+        parser.add_argument(
+            "--images",
+            help="Архив tar с картинками из export_posts.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Сколько строк вставлять одним запросом.",
+        )
+        parser.add_argument(
+            "--drop-indexes",
+            action="store_true",
+            help=(
+                "Снять индексы лент на время загрузки. Только для базы, "
+                "которая ещё не обслуживает сайт."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        importer = transfer.Importer(options["batch_size"])
+        if options["images"]:
+            files = importer.load_images(options["images"])
+            self.stdout.write(f"Картинок: {files}")
+        with open(options["path"], encoding="utf-8") as stream:
+            records = transfer.read_rows(stream)
+            if options["drop_indexes"]:
+                with transfer.without_indexes(Post, Comment):
+                    importer.load(records)
+            else:
+                importer.load(records)
+        for model, _, _ in transfer.EXPORTS:
+            rows, seconds = importer.rows[model], importer.seconds[model]
+            speed = rows / seconds if seconds else 0
+            self.stdout.write(
+                f"{model}: {rows} строк за {seconds:.2f} с "
+                f"({speed:.0f} строк/с)"
+            )
+        started = time.monotonic()
+        importer.finish()
+        self.stdout.write(
+            f"Ленты, счётчики и поиск: {time.monotonic() - started:.2f} с"
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Загрузка готова. Превью картинок построит build_thumbnails."
+            )
+        )
@@ -0,0 +1,63 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from posts.models import Comment, Follow, Group, Post, User
+from posts.timeline import timeline_posts
+from posts.views import NUMBER_POSTS
+
+
+class Command(BaseCommand):
+    help = (
+        "Показывает планы запросов лент и время выборки первой страницы, "
+        "чтобы проверить, что запросы идут по индексам."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=20,
+            help="Сколько раз выполнить каждый запрос для замера времени.",
+        )
+
+    def feed_queries(self):
+        """Запросы в том виде, в котором их строят представления."""
+        queries = {"index": Post.objects.for_feed()}
+        group = Group.objects.annotate(
+            total=Count("posts")
+        ).order_by("-total").first()
+        if group is not None:
+            queries["group_posts"] = group.posts.for_feed()
+        author = User.objects.annotate(
+            total=Count("posts")
+        ).order_by("-total").first()
+        if author is not None:
+            queries["profile"] = author.posts.for_feed()
+        post = Post.objects.order_by("-comments_count").first()
+        if post is not None:
+            queries["post_detail comments"] = (
+                Comment.objects.with_related().filter(
+                    post=post, parent=None
+                ).order_by("-created", "-pk")
+            )
+        follow = Follow.objects.first()
+        if follow is not None:
+            queries["profile follow check"] = Follow.objects.filter(
+                user_id=follow.user_id, author_id=follow.author_id
+            )
+            queries["follow_index"] = timeline_posts(follow.user).for_feed()
+        return queries
+
+    def handle(self, *args, **options):
+        repeat = options["repeat"]
+        for name, queryset in self.feed_queries().items():
+            page = queryset[:NUMBER_POSTS]
+            started = time.perf_counter()
+            for _ in range(repeat):
+                list(page)
+            elapsed = (time.perf_counter() - started) / repeat * 1000
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write(page.explain())
+            self.stdout.write(f"первая страница: {elapsed:.2f} мс\n")
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import recount_all
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает счётчики постов, подписок и комментариев."
+
+    def handle(self, *args, **options):
+        users = recount_all()
+        self.stdout.write(
+            self.style.SUCCESS(f"Счётчики пересчитаны для {users} польз.")
+        )
@@ -0,0 +1,190 @@
+import datetime
+import random
+from itertools import accumulate
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from faker import Faker
+
+from posts import transfer
+from posts.models import Comment, Post
+
+# Доля комментариев-ответов и постов с сообществом.
+REPLY_SHARE = 0.2
+GROUP_SHARE = 0.7
+TEXT_POOL = 500
+CHUNK = 10000
+
+
+def zipf_weights(count, alpha):
+    """Накопленные веса закона Ципфа: первый элемент самый «горячий»."""
+    return list(
+        accumulate(1 / (rank + 1) ** alpha for rank in range(count))
+    )
+
+
+class LoadGenerator:
+    """Записи в формате posts.transfer для синтетической нагрузки.
+
+    Одинаковые параметры и seed дают одинаковые записи. Пользователи
+    с меньшим id популярнее: у них больше подписчиков и постов, а
+    комментарии достаются в основном немногим «горячим» постам.
+    """
+
+    def __init__(self, users, groups, posts, comments, follows, alpha=1.1,
+                 seed=0, days=365):
+        self.users, self.groups, self.posts = users, groups, posts
+        self.comments = comments if posts else 0
+        self.follows = follows
+        self.alpha = alpha
+        self.rng = random.Random(seed)
+        self.fake = Faker("ru_RU")
+        self.fake.seed_instance(seed)
+        self.end = timezone.now().replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+        self.step = datetime.timedelta(days=days) / max(posts, 1)
+        self.user_ids = range(1, users + 1)
+        self.user_weights = zipf_weights(users, alpha)
+
+    def __iter__(self):
+        self.texts = [
+            self.fake.paragraph(nb_sentences=4) for _ in range(TEXT_POOL)
+        ]
+        yield from self.generate_users()
+        yield from self.generate_groups()
+        yield from self.generate_posts()
+        yield from self.generate_comments()
+        yield from self.generate_follows()
+
+    def pub_date(self, number):
+        # Даты растут вместе с id поста, как у настоящих публикаций.
+        return self.end - self.step * (self.posts - number)
+
+    def generate_users(self):
+        for number in self.user_ids:
+            yield {
+                "model": "user", "pk": number,
+                "username": f"{self.fake.user_name()}{number}",
+            }
+
+    def generate_groups(self):
+        for number in range(1, self.groups + 1):
+            yield {
+                "model": "group", "pk": number,
+                "title": self.fake.catch_phrase()[:200],
+                "slug": f"group-{number}",
+                "description": self.fake.sentence(),
+            }
+
+    def generate_posts(self):
+        rng = self.rng
+        for start in range(1, self.posts + 1, CHUNK):
+            size = min(CHUNK, self.posts + 1 - start)
+            authors = rng.choices(
+                self.user_ids, cum_weights=self.user_weights, k=size
+            )
+            for number, author in zip(range(start, start + size), authors):
+                date = self.pub_date(number).isoformat()
+                group = None
+                if self.groups and rng.random() < GROUP_SHARE:
+                    group = rng.randint(1, self.groups)
+                yield {
+                    "model": "post", "pk": number,
+                    "text": rng.choice(self.texts),
+                    "pub_date": date, "created": date,
+                    "author": author, "group": group, "image": "",
+                }
+
+    def generate_comments(self):
+        rng = self.rng
+        # Ранг «горячести» не совпадает с id, иначе горячими были бы
+        # самые старые посты.
+        hot_posts = list(range(1, self.posts + 1))
+        rng.shuffle(hot_posts)
+        post_weights = zipf_weights(self.posts, self.alpha)
+        roots = {}
+        for start in range(1, self.comments + 1, CHUNK):
+            size = min(CHUNK, self.comments + 1 - start)
+            targets = rng.choices(hot_posts, cum_weights=post_weights, k=size)
+            for number, post in zip(range(start, start + size), targets):
+                parent = roots.get(post)
+                if parent is None or rng.random() >= REPLY_SHARE:
+                    parent = None
+                    roots.setdefault(post, number)
+                created = self.pub_date(post) + datetime.timedelta(
+                    minutes=rng.randint(1, 60 * 24)
+                )
+                yield {
+                    "model": "comment", "pk": number,
+                    "text": rng.choice(self.texts),
+                    "created": created.isoformat(),
+                    "post": post,
+                    "author": rng.randint(1, self.users),
+                    "parent": parent,
+                }
+
+    def generate_follows(self):
+        # Число подписок — по Парето со средним follows, на кого — по
+        # популярности: получается граф со степенным распределением.
+        for user in self.user_ids:
+            wanted = min(
+                int(self.rng.paretovariate(1.5) * self.follows / 3),
+                self.users - 1,
+            )
+            authors = set(self.rng.choices(
+                self.user_ids, cum_weights=self.user_weights, k=wanted
+            ))
+            for author in sorted(authors - {user}):
+                yield {"model": "follow", "user": user, "author": author}
+
+
+class Command(BaseCommand):
+    help = (
+        "Наполняет базу синтетическими данными для нагрузочных замеров: "
+        "степенной граф подписок, комментарии к «горячим» постам."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=10000)
+        parser.add_argument("--groups", type=int, default=50)
+        parser.add_argument("--posts", type=int, default=1000000)
+        parser.add_argument("--comments", type=int, default=2000000)
+        parser.add_argument(
+            "--follows",
+            type=int,
+            default=20,
+            help="Среднее число подписок пользователя.",
+        )
+        parser.add_argument(
+            "--alpha",
+            type=float,
+            default=1.1,
+            help="Показатель степенного закона популярности.",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument(
+            "--drop-indexes",
+            action="store_true",
+            help="Снять индексы лент на время загрузки.",
+        )
+
+    def handle(self, *args, **options):
+        records = LoadGenerator(
+            options["users"], options["groups"], options["posts"],
+            options["comments"], options["follows"],
+            alpha=options["alpha"], seed=options["seed"],
+        )
+        importer = transfer.Importer(options["batch_size"])
+        if options["drop_indexes"]:
+            with transfer.without_indexes(Post, Comment):
+                importer.load(records)
+        else:
+            importer.load(records)
+        importer.finish()
+        for model, _, _ in transfer.EXPORTS:
+            rows, seconds = importer.rows[model], importer.seconds[model]
+            speed = rows / seconds if seconds else 0
+            self.stdout.write(f"{model}: {rows} ({speed:.0f} строк/с)")
+        self.stdout.write(self.style.SUCCESS("Данные для замеров готовы"))
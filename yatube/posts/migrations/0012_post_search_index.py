@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.db import migrations
+from django.db.utils import OperationalError
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        try:
+            schema_editor.execute(
+                'CREATE VIRTUAL TABLE posts_post_fts '
+                "USING fts5(text, tokenize = 'unicode61')"
+            )
+        except OperationalError:
+            # SQLite собран без FTS5: поиск будет работать по индексу
+            # в памяти процесса.
+            return
+        schema_editor.execute(
+            'INSERT INTO posts_post_fts (rowid, text) '
+            'SELECT id, text FROM posts_post'
+        )
+    elif connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX posts_post_text_search ON posts_post '
+            'USING GIN (to_tsvector(%s, text))',
+            [settings.POSTS_SEARCH_CONFIG],
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS posts_post_fts')
+    elif connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS posts_post_text_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_userstats'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_post_thumbnail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_variants',
+            field=models.TextField(blank=True, editable=False, help_text='JSON: {mime: [[ширина, файл], ...]}', verbose_name='Варианты картинки'),
+        ),
+    ]
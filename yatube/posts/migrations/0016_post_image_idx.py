@@ -0,0 +1,53 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:33
+
+import json
+import re
+from collections import Counter
+
+from django.db import migrations, models
+
+
+CONTENT_NAME_RE = re.compile(r"^(?:[\w-]+/)*[0-9a-f]{64}(?:\.\w+)?$")
+
+
+def count_file_references(apps, schema_editor):
+    Post = apps.get_model("posts", "Post")
+    StoredFile = apps.get_model("core", "StoredFile")
+    references = Counter()
+    posts = Post.objects.exclude(image="").values_list(
+        "image", "image_variants"
+    )
+    for image, image_variants in posts.iterator():
+        references[image] += 1
+        try:
+            variants = json.loads(image_variants)
+            names = [name for files in variants.values() for _, name in files]
+        except (ValueError, TypeError, AttributeError):
+            continue
+        references.update(names)
+    StoredFile.objects.bulk_create(
+        [
+            StoredFile(name=name, references=count)
+            for name, count in references.items()
+            if CONTENT_NAME_RE.match(name)
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+        ('posts', '0015_post_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['image'], name='post_image_idx'),
+        ),
+        migrations.RunPython(
+            count_file_references, migrations.RunPython.noop
+        ),
+    ]
@@ -30,6 +30,18 @@ class Group(models.Model):
         verbose_name_plural = "Сообщества"
 
 
+class CommentQuerySet(models.QuerySet):
+    def with_related(self):
+        """Комментарии вместе с авторами одним запросом."""
+        return self.select_related("author")
+
+
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Посты для ленты: автор и группа подтягиваются JOIN-ом."""
+        return self.select_related("author", "group")
+
+
 class Post(CreatedModel):
     text = models.TextField(
         verbose_name="Текст",
@@ -65,10 +77,45 @@ class Post(CreatedModel):
         blank=True,
     )
 
+    # Готовятся в фоне после загрузки картинки (см. posts.thumbnails),
+    # пока их нет, шаблоны показывают заглушку.
+    thumbnail = models.ImageField(
+        "Превью",
+        upload_to="cache/posts/",
+        blank=True,
+        editable=False,
+    )
+    image_variants = models.TextField(
+        "Варианты картинки",
+        blank=True,
+        editable=False,
+        help_text="JSON: {mime: [[ширина, файл], ...]}",
+    )
+
+    comments_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Количество комментариев",
+    )
+
+    objects = PostQuerySet.as_manager()
+
     class Meta:
         ordering = ["-pub_date"]
         verbose_name = "Пост"
         verbose_name_plural = "Посты"
+        # Индексы под ленты: фильтр по автору или группе + сортировка.
+        indexes = [
+            models.Index(fields=["-pub_date"], name="post_pub_date_idx"),
+            models.Index(
+                fields=["author", "-pub_date"], name="post_author_pub_date_idx"
+            ),
+            models.Index(
+                fields=["group", "-pub_date"], name="post_group_pub_date_idx"
+            ),
+            # Поиск постов с той же картинкой, чтобы взять их варианты.
+            models.Index(fields=["image"], name="post_image_idx"),
+        ]
 
 
 class Comment(CreatedModel):
@@ -89,11 +136,37 @@ class Comment(CreatedModel):
         "Текст Комментария",
         help_text="Введите текст комментария",
     )
+    # Ответы только одного уровня: ответ на ответ цепляется к корню ветки.
+    parent = models.ForeignKey(
+        "self",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="replies",
+        verbose_name="Ответ на",
+    )
+    replies_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Количество ответов",
+    )
+
+    objects = CommentQuerySet.as_manager()
 
     class Meta:
         ordering = ["-created"]
         verbose_name = "Комментарий"
         verbose_name_plural = "Комментарии"
+        indexes = [
+            models.Index(
+                fields=["post", "-created"], name="comment_post_created_idx"
+            ),
+            # Порции корневых комментариев поста и ответов ветки.
+            models.Index(
+                fields=["post", "parent", "created"],
+                name="comment_thread_idx",
+            ),
+        ]
 
 
 class Follow(models.Model):
@@ -116,3 +189,78 @@ class Follow(models.Model):
         ordering = ("-user",)
         verbose_name = "Подписка"
         verbose_name_plural = "Подписки"
+        constraints = [
+            models.UniqueConstraint(
+                fields=("user", "author"),
+                name="unique_follow",
+            ),
+        ]
+
+
+class TimelineEntry(models.Model):
+    """Запись в готовой ленте подписок пользователя (fan-out on write)."""
+
+    user = models.ForeignKey(
+        User,
+        related_name="timeline",
+        on_delete=models.CASCADE,
+        verbose_name="Читатель",
+    )
+    post = models.ForeignKey(
+        Post,
+        related_name="timeline_entries",
+        on_delete=models.CASCADE,
+        verbose_name="Пост",
+    )
+    # Копия Post.pub_date: лента читается одним проходом по индексу.
+    pub_date = models.DateTimeField(
+        verbose_name="Дата публикации"
+    )
+
+    class Meta:
+        ordering = ("-pub_date",)
+        verbose_name = "Запись ленты"
+        verbose_name_plural = "Записи ленты"
+        constraints = [
+            models.UniqueConstraint(
+                fields=("user", "post"),
+                name="unique_timeline_entry",
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=("user", "-pub_date", "-id"),
+                name="timeline_user_pub_date_idx",
+            ),
+        ]
+
+
+class UserStats(models.Model):
+    """Счётчики пользователя, которые обновляются сигналами."""
+
+    user = models.OneToOneField(
+        User,
+        related_name="stats",
+        on_delete=models.CASCADE,
+        primary_key=True,
+        verbose_name="Пользователь",
+    )
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Количество постов",
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Количество подписчиков",
+    )
+    following_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Количество подписок",
+    )
+
+    class Meta:
+        verbose_name = "Статистика пользователя"
+        verbose_name_plural = "Статистика пользователей"
+
+    def __str__(self):
+        return f"Статистика {self.user}"
@@ -0,0 +1,145 @@
+import base64
+import binascii
+import datetime
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+class CursorPage:
+    """Страница ленты, построенная по курсору (дата, id)."""
+
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, cursor, has_next,
+                 has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.cursor = cursor or ""
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        # repr входит в ключ фрагментного кеша, поэтому содержит курсор.
+        return "<Cursor page %r>" % self.cursor
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    @property
+    def next_cursor(self):
+        if not self.has_next():
+            return None
+        return self.paginator.encode_cursor(self.object_list[-1])
+
+    @property
+    def previous_cursor(self):
+        if not self.has_previous():
+            return None
+        return self.paginator.encode_cursor(
+            self.object_list[0], backwards=True
+        )
+
+
+class CursorPaginator:
+    """Постраничный вывод без COUNT(*) и OFFSET.
+
+    Страница выбирается условием по ключу (дата, id), поэтому глубина
+    листания не влияет на стоимость запроса. По умолчанию дата — pub_date
+    поста, для комментариев передаётся date_field="created". Записи идут
+    от новых к старым, с ascending=True — от старых к новым.
+
+    Ключом может быть и не дата, например название группы: тогда
+    parse_key — функция, которая восстанавливает значение ключа из
+    курсора (для строк — str).
+    """
+
+    def __init__(self, object_list, per_page, date_field="pub_date",
+                 ascending=False, parse_key=parse_datetime):
+        self.object_list = object_list
+        self.per_page = per_page
+        self.date_field = date_field
+        self.ascending = ascending
+        self.parse_key = parse_key
+
+    def encode_cursor(self, obj, backwards=False):
+        key = getattr(obj, self.date_field)
+        if isinstance(key, datetime.datetime):
+            key = key.isoformat()
+        position = [key, obj.pk, int(backwards)]
+        raw = json.dumps(position, separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    def decode_cursor(self, cursor):
+        """Разбирает курсор в (ключ, pk, backwards) или возвращает None."""
+        if not cursor:
+            return None
+        padding = "=" * (-len(cursor) % 4)
+        try:
+            raw = base64.urlsafe_b64decode(cursor + padding)
+            key, pk, backwards = json.loads(raw.decode())
+            key = self.parse_key(key)
+            pk = int(pk)
+        except (binascii.Error, ValueError, TypeError):
+            return None
+        if key is None:
+            return None
+        return key, pk, bool(backwards)
+
+    def _ordering(self, descending):
+        if descending:
+            return f"-{self.date_field}", "-pk"
+        return self.date_field, "pk"
+
+    def _after(self, queryset, date, pk, descending):
+        """Записи за позицией (дата, pk) в заданном направлении."""
+        field = self.date_field
+        lookup = "lt" if descending else "gt"
+        return queryset.filter(
+            Q(**{f"{field}__{lookup}": date})
+            | Q(**{field: date, f"pk__{lookup}": pk})
+        ).order_by(*self._ordering(descending))
+
+    def get_page(self, cursor):
+        """Возвращает страницу после (или перед) позицией курсора.
+
+        Неверный или пустой курсор отдаёт первую страницу, как и
+        Paginator.get_page() для неверного номера.
+        """
+        position = self.decode_cursor(cursor)
+        queryset = self.object_list
+        descending = not self.ascending
+        backwards = False
+        if position is None:
+            queryset = queryset.order_by(*self._ordering(descending))
+        else:
+            date, pk, backwards = position
+            queryset = self._after(
+                queryset, date, pk, descending != backwards
+            )
+        # Берём на одну запись больше, чтобы узнать, есть ли продолжение.
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+            return CursorPage(rows, self, cursor, bool(rows), has_more)
+        return CursorPage(
+            rows, self, cursor, has_more, position is not None and bool(rows)
+        )
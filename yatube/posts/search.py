@@ -0,0 +1,238 @@
+"""Полнотекстовый поиск по постам.
+
+Движок выбирается по базе данных:
+
+* SQLite — виртуальная таблица FTS5 ``posts_post_fts`` (rowid = id поста),
+  ранжирование по bm25;
+* PostgreSQL — GIN-индекс по ``to_tsvector(text)``, ранжирование ts_rank;
+  индекс по выражению база поддерживает сама;
+* иначе (или SQLite без FTS5) — инвертированный индекс в памяти процесса.
+
+Индексы FTS5 и в памяти обновляются сигналами сохранения и удаления Post.
+"""
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import connection
+
+from .models import Post
+
+FTS_TABLE = "posts_post_fts"
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text):
+    return [token.lower() for token in TOKEN_RE.findall(text)]
+
+
+class SearchResults:
+    """Ранжированный список id, который Paginator листает как обычный.
+
+    Посты загружаются только для запрошенного среза и в порядке ранга.
+    """
+
+    def __init__(self, ids):
+        self.ids = ids
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        ids = self.ids[index]
+        posts = Post.objects.for_feed().in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
+
+
+class SQLiteFTSBackend:
+    def search(self, tokens, limit):
+        # Каждое слово в кавычках: спецсимволы FTS5 не ломают запрос.
+        match = " ".join('"%s"' % token for token in tokens)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+                f"ORDER BY bm25({FTS_TABLE}) LIMIT %s",
+                [match, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def index_post(self, post):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [post.pk]
+            )
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)",
+                [post.pk, post.text],
+            )
+
+    def remove_post(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [post_id]
+            )
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, text) "
+                f"SELECT id, text FROM {Post._meta.db_table}"
+            )
+
+
+class PostgresBackend:
+    def search(self, tokens, limit):
+        config = settings.POSTS_SEARCH_CONFIG
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT id FROM {Post._meta.db_table}, "
+                "plainto_tsquery(%s, %s) query "
+                "WHERE to_tsvector(%s, text) @@ query "
+                "ORDER BY ts_rank(to_tsvector(%s, text), query) DESC, id DESC "
+                "LIMIT %s",
+                [config, " ".join(tokens), config, config, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def index_post(self, post):
+        pass
+
+    def remove_post(self, post_id):
+        pass
+
+    def rebuild(self):
+        pass
+
+
+class MemoryBackend:
+    """Инвертированный индекс в памяти с ранжированием BM25.
+
+    Индекс строится при первом поиске и дальше обновляется сигналами.
+    Изменения, сделанные в других процессах, он не видит.
+    """
+
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.built = False
+        self.postings = defaultdict(dict)
+        self.terms = {}
+        self.lengths = {}
+
+    def _add(self, post_id, text):
+        tokens = tokenize(text)
+        self.lengths[post_id] = len(tokens)
+        self.terms[post_id] = Counter(tokens)
+        for token, frequency in self.terms[post_id].items():
+            self.postings[token][post_id] = frequency
+
+    def _remove(self, post_id):
+        self.lengths.pop(post_id, None)
+        for token in self.terms.pop(post_id, ()):
+            self.postings[token].pop(post_id, None)
+            if not self.postings[token]:
+                del self.postings[token]
+
+    def _build(self):
+        for post_id, text in Post.objects.values_list("pk", "text").iterator():
+            self._add(post_id, text)
+        self.built = True
+
+    def search(self, tokens, limit):
+        with self.lock:
+            if not self.built:
+                self._build()
+            matches = [self.postings.get(token, {}) for token in set(tokens)]
+            if not matches or not all(matches):
+                return []
+            candidates = set.intersection(*(set(m) for m in matches))
+            total = len(self.lengths)
+            average = sum(self.lengths.values()) / total
+            scores = Counter()
+            for postings in matches:
+                idf = math.log(1 + (total - len(postings) + 0.5) / (
+                    len(postings) + 0.5
+                ))
+                for post_id in candidates:
+                    frequency = postings[post_id]
+                    norm = 1 - self.b + self.b * (
+                        self.lengths[post_id] / average
+                    )
+                    scores[post_id] += idf * frequency * (self.k1 + 1) / (
+                        frequency + self.k1 * norm
+                    )
+        ranked = sorted(scores, key=lambda pk: (-scores[pk], -pk))
+        return ranked[:limit]
+
+    def index_post(self, post):
+        with self.lock:
+            if self.built:
+                self._remove(post.pk)
+                self._add(post.pk, post.text)
+
+    def remove_post(self, post_id):
+        with self.lock:
+            if self.built:
+                self._remove(post_id)
+
+    def rebuild(self):
+        with self.lock:
+            self.postings.clear()
+            self.terms.clear()
+            self.lengths.clear()
+            self._build()
+
+
+_memory_backend = MemoryBackend()
+_fts_available = {}
+
+
+def _sqlite_has_fts():
+    alias = connection.alias
+    if alias not in _fts_available:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' "
+                "AND name = %s",
+                [FTS_TABLE],
+            )
+            _fts_available[alias] = cursor.fetchone() is not None
+    return _fts_available[alias]
+
+
+def get_backend():
+    if connection.vendor == "postgresql":
+        return PostgresBackend()
+    if connection.vendor == "sqlite" and _sqlite_has_fts():
+        return SQLiteFTSBackend()
+    return _memory_backend
+
+
+def search_posts(query):
+    """Посты, подходящие под запрос, от самых релевантных."""
+    tokens = tokenize(query)
+    if not tokens:
+        return SearchResults([])
+    ids = get_backend().search(tokens, settings.POSTS_SEARCH_MAX_RESULTS)
+    return SearchResults(ids)
+
+
+def index_post(post):
+    get_backend().index_post(post)
+
+
+def remove_post(post_id):
+    get_backend().remove_post(post_id)
+
+
+def rebuild_index():
+    """Переиндексирует все посты, например после массовой загрузки."""
+    get_backend().rebuild()
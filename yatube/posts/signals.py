@@ -0,0 +1,176 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core import media
+
+from . import counters, events, feed_cache, search, thumbnails, timeline
+from .models import Comment, Follow, Group, Post, User
+
+# Поля автора, которые выводятся в карточках постов.
+AUTHOR_NAME_FIELDS = ("username", "first_name", "last_name")
+
+
+@receiver(post_save, sender=Post)
+def push_post_to_timelines(sender, instance, created, **kwargs):
+    if created:
+        timeline.push_post(instance)
+
+
+@receiver(post_save, sender=Post)
+def announce_new_post(sender, instance, created, **kwargs):
+    if created:
+        events.publish_post(instance)
+
+
+@receiver(post_save, sender=Post)
+def count_created_post(sender, instance, created, **kwargs):
+    if created:
+        counters.bump(instance.author_id, posts_count=1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    counters.bump(instance.author_id, create=False, posts_count=-1)
+
+
+@receiver(post_save, sender=Comment)
+def count_created_comment(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_comments(instance.post_id, 1)
+        if instance.parent_id is not None:
+            counters.bump_replies(instance.parent_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    counters.bump_comments(instance.post_id, -1)
+    if instance.parent_id is not None:
+        counters.bump_replies(instance.parent_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def count_created_follow(sender, instance, created, **kwargs):
+    if created:
+        counters.bump(instance.author_id, followers_count=1)
+        counters.bump(instance.user_id, following_count=1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    counters.bump(instance.author_id, create=False, followers_count=-1)
+    counters.bump(instance.user_id, create=False, following_count=-1)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, **kwargs):
+    if created:
+        timeline.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def prune_timeline(sender, instance, **kwargs):
+    timeline.unfollowed(instance.user_id, instance.author_id)
+
+
+@receiver(pre_save, sender=Post)
+def remember_previous_state(sender, instance, **kwargs):
+    # Пост, перенесённый в другую группу, должен пропасть из старой ленты,
+    # а у заменённой картинки — освободиться файлы.
+    if instance.pk is None:
+        return
+    previous = Post.objects.filter(pk=instance.pk).values_list(
+        "group_id", "image", "image_variants"
+    ).first()
+    if previous is not None:
+        group_id, image, image_variants = previous
+        instance._previous_group_id = group_id
+        instance._previous_files = thumbnails.post_files(
+            image, image_variants
+        )
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def bump_post_feeds(sender, instance, **kwargs):
+    previous_group_id = getattr(instance, "_previous_group_id", None)
+    feed_cache.bump(
+        *feed_cache.feeds_for_post(instance, previous_group_id)
+    )
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def bump_author_feed(sender, instance, **kwargs):
+    # Страницы автора показывают число подписчиков и кнопку подписки,
+    # их ETag строится по поколению ленты автора.
+    feed_cache.bump(feed_cache.author_feed(instance.author_id))
+
+
+@receiver(pre_save, sender=User)
+def remember_author_name(sender, instance, update_fields=None, **kwargs):
+    # Вход пользователя сохраняет только last_login: лишний запрос ни к чему.
+    if instance.pk is None or (
+        update_fields is not None
+        and not set(update_fields) & set(AUTHOR_NAME_FIELDS)
+    ):
+        return
+    instance._previous_name = User.objects.filter(
+        pk=instance.pk
+    ).values_list(*AUTHOR_NAME_FIELDS).first()
+
+
+@receiver(post_save, sender=User)
+def bump_author_name_feeds(sender, instance, created, **kwargs):
+    # Имя автора есть в карточках всех его постов: в общей ленте, ленте
+    # автора и лентах групп, где он писал.
+    previous = getattr(instance, "_previous_name", None)
+    if created or previous is None:
+        return
+    del instance._previous_name
+    name = tuple(getattr(instance, field) for field in AUTHOR_NAME_FIELDS)
+    if name == previous:
+        return
+    group_ids = Post.objects.filter(
+        author_id=instance.pk, group__isnull=False
+    ).order_by().values_list("group_id", flat=True).distinct()
+    feed_cache.bump(
+        feed_cache.GLOBAL_FEED,
+        feed_cache.author_feed(instance.pk),
+        *(feed_cache.group_feed(group_id) for group_id in group_ids),
+    )
+
+
+@receiver(post_save, sender=Group)
+def bump_group_feeds(sender, instance, created, **kwargs):
+    if not created:
+        feed_cache.bump(
+            feed_cache.GLOBAL_FEED, feed_cache.group_feed(instance.pk)
+        )
+
+
+@receiver(post_save, sender=Post)
+def index_post_text(sender, instance, **kwargs):
+    search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def remove_post_text(sender, instance, **kwargs):
+    search.remove_post(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def reference_post_files(sender, instance, **kwargs):
+    files = set(thumbnails.post_files(
+        instance.image.name, instance.image_variants
+    ))
+    previous = set(getattr(instance, "_previous_files", ()))
+    media.acquire(*(files - previous))
+    media.release(*(previous - files))
+    instance._previous_files = list(files)
+
+
+@receiver(post_delete, sender=Post)
+def release_post_files(sender, instance, **kwargs):
+    media.release(*thumbnails.post_files(
+        instance.image.name, instance.image_variants
+    ))
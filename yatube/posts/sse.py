@@ -0,0 +1,217 @@
+"""ASGI-приложение с потоками Server-Sent Events о новых постах.
+
+Django 2.2 умеет только WSGI, поэтому потоки событий обслуживает
+отдельное минимальное ASGI-приложение (yatube/asgi.py), которое
+запускается рядом с WSGI-процессами, например под uvicorn, а прокси
+направляет в него пути /events/. Одно соединение — одна сопрограмма
+и одна подписка в брокере (posts.events), так что несколько процессов
+asyncio держат тысячи ожидающих клиентов.
+
+Адреса:
+
+* /events/ — общая лента;
+* /events/group/<slug>/ — лента группы;
+* /events/profile/<username>/ — лента автора;
+* /events/follow/ — лента подписок (по сессионной куке).
+
+Событие ``posts`` несёт число новых постов с момента загрузки страницы
+и id последнего. id события — то же число, поэтому браузер после
+переподключения (заголовок Last-Event-ID) продолжает счёт.
+"""
+import asyncio
+import json
+import re
+from http.cookies import SimpleCookie
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.core.exceptions import PermissionDenied
+from django.db import connections
+from django.utils.module_loading import import_string
+
+from . import feed_cache
+from .events import get_broker
+from .models import Follow, Group, User
+
+
+def _global_channels(request):
+    return [feed_cache.GLOBAL_FEED]
+
+
+def _group_channels(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        "pk", flat=True
+    ).first()
+    return None if group_id is None else [feed_cache.group_feed(group_id)]
+
+
+def _profile_channels(request, username):
+    author_id = User.objects.filter(username=username).values_list(
+        "pk", flat=True
+    ).first()
+    return None if author_id is None else [feed_cache.author_feed(author_id)]
+
+
+def _follow_channels(request):
+    user_id = _session_user_id(request)
+    if user_id is None:
+        raise PermissionDenied
+    authors = Follow.objects.filter(user_id=user_id).values_list(
+        "author_id", flat=True
+    )
+    return [feed_cache.author_feed(author_id) for author_id in authors]
+
+
+ROUTES = [
+    (re.compile(r"^/events/$"), _global_channels),
+    (re.compile(r"^/events/group/(?P<slug>[-\w]+)/$"), _group_channels),
+    (
+        re.compile(r"^/events/profile/(?P<username>[\w.@+-]+)/$"),
+        _profile_channels,
+    ),
+    (re.compile(r"^/events/follow/$"), _follow_channels),
+]
+
+
+def _session_user_id(request):
+    cookie = SimpleCookie()
+    cookie.load(request["headers"].get("cookie", ""))
+    morsel = cookie.get(settings.SESSION_COOKIE_NAME)
+    if morsel is None:
+        return None
+    engine = import_string(settings.SESSION_ENGINE)
+    # Те же проверки, что у AuthenticationMiddleware: хеш пароля в сессии
+    # и is_active у бэкенда. Сессия, сброшенная сменой пароля, и
+    # отключённый пользователь дают анонима.
+    user = get_user(SimpleNamespace(session=engine.SessionStore(morsel.value)))
+    return user.pk if user.is_authenticated else None
+
+
+def _resolve(request):
+    """Каналы для пути запроса; None — нет такой ленты."""
+    try:
+        for pattern, channels in ROUTES:
+            match = pattern.match(request["path"])
+            if match:
+                return channels(request, **match.groupdict())
+        return None
+    finally:
+        # Запрос выполняется в потоке пула, соединения закрываем сами.
+        connections.close_all()
+
+
+async def _respond(send, status, body):
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"text/plain; charset=utf-8")],
+    })
+    await send({"type": "http.response.body", "body": body.encode()})
+
+
+def _last_event_id(headers):
+    try:
+        return max(int(headers.get("last-event-id", 0)), 0)
+    except ValueError:
+        return 0
+
+
+async def _wait_disconnect(receive):
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+async def _stream(subscription, receive, send):
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [
+            (b"content-type", b"text/event-stream; charset=utf-8"),
+            (b"cache-control", b"no-cache"),
+            (b"x-accel-buffering", b"no"),
+        ],
+    })
+    retry = settings.POSTS_EVENTS_RETRY * 1000
+    await send({
+        "type": "http.response.body",
+        "body": f"retry: {retry}\n\n".encode(),
+        "more_body": True,
+    })
+    disconnected = asyncio.ensure_future(_wait_disconnect(receive))
+    try:
+        while True:
+            changed = asyncio.ensure_future(subscription.changed.wait())
+            done, _ = await asyncio.wait(
+                {changed, disconnected},
+                timeout=settings.POSTS_EVENTS_HEARTBEAT,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if changed not in done:
+                changed.cancel()
+            if disconnected in done:
+                return
+            if changed in done:
+                subscription.changed.clear()
+                data = json.dumps({
+                    "count": subscription.count,
+                    "latest": subscription.latest,
+                })
+                chunk = (
+                    f"id: {subscription.count}\n"
+                    f"event: posts\ndata: {data}\n\n"
+                )
+            else:
+                # Комментарий не даёт прокси закрыть молчащее соединение.
+                chunk = ": ping\n\n"
+            await send({
+                "type": "http.response.body",
+                "body": chunk.encode(),
+                "more_body": True,
+            })
+    finally:
+        disconnected.cancel()
+        subscription.close()
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await get_broker().start()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+    if scope["method"] != "GET":
+        await _respond(send, 405, "Method Not Allowed")
+        return
+    headers = {
+        name.decode("latin-1").lower(): value.decode("latin-1")
+        for name, value in scope.get("headers", [])
+    }
+    request = {"path": scope["path"], "headers": headers}
+    loop = asyncio.get_running_loop()
+    try:
+        channels = await loop.run_in_executor(None, _resolve, request)
+    except PermissionDenied:
+        await _respond(send, 403, "Forbidden")
+        return
+    if channels is None:
+        await _respond(send, 404, "Not Found")
+        return
+    broker = get_broker()
+    await broker.start()
+    subscription = broker.subscribe(channels)
+    subscription.count = _last_event_id(headers)
+    await _stream(subscription, receive, send)
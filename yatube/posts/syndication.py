@@ -0,0 +1,200 @@
+"""Ленты RSS, Atom и JSON Feed: общая, группы и автора.
+
+Тело ленты строится один раз на поколение ленты (feed_cache) и хранится
+в кеше целиком, поэтому опрос лент роботами стоит одного чтения кеша.
+Сохранение поста меняет поколение, и следующий запрос строит ленту
+заново. ETag — хеш тела, Last-Modified — время его построения, так что
+на условный запрос неизменной ленты отдаётся 304.
+"""
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.contrib.syndication.views import Feed
+from django.core.cache import cache
+from django.http import Http404, HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.feedgenerator import (
+    Atom1Feed,
+    Rss201rev2Feed,
+    SyndicationFeed,
+)
+from django.utils.http import http_date, quote_etag
+
+from . import feed_cache
+from .models import Group, Post, User
+
+
+class JSONFeed(SyndicationFeed):
+    """JSON Feed 1.1 (https://jsonfeed.org/version/1.1)."""
+
+    content_type = "application/feed+json; charset=utf-8"
+
+    def write(self, outfile, encoding):
+        feed = {
+            "version": "https://jsonfeed.org/version/1.1",
+            "title": self.feed["title"],
+            "home_page_url": self.feed["link"],
+            "feed_url": self.feed["feed_url"],
+            "description": self.feed["description"],
+            "items": [self._item(item) for item in self.items],
+        }
+        outfile.write(json.dumps(feed, ensure_ascii=False).encode(encoding))
+
+    @staticmethod
+    def _item(item):
+        data = {
+            "id": item["unique_id"] or item["link"],
+            "url": item["link"],
+            "title": item["title"],
+            "content_text": item["description"],
+            "date_published": item["pubdate"].isoformat(),
+        }
+        if item["author_name"]:
+            data["authors"] = [{"name": item["author_name"]}]
+        return data
+
+
+FORMATS = {
+    "rss": Rss201rev2Feed,
+    "atom": Atom1Feed,
+    "json": JSONFeed,
+}
+
+
+class PostsFeed(Feed):
+    """Общая лента; подклассы задают объект, название и выборку."""
+
+    title = "Yatube: последние записи"
+    description = "Новые посты всех авторов"
+
+    def feed_name(self, obj):
+        return feed_cache.GLOBAL_FEED
+
+    def posts(self, obj):
+        return Post.objects.all()
+
+    def link(self, obj):
+        return reverse("posts:index")
+
+    def items(self, obj):
+        posts = self.posts(obj)
+        ids = feed_cache.get_ids(
+            self.feed_name(obj),
+            feed_cache.get_version(self.feed_name(obj)),
+            posts,
+            settings.POSTS_SYNDICATION_ITEMS,
+        )
+        by_pk = posts.for_feed().in_bulk(ids)
+        return [by_pk[pk] for pk in ids if pk in by_pk]
+
+    def item_title(self, post):
+        return post.text[:50]
+
+    def item_description(self, post):
+        return post.text
+
+    def item_link(self, post):
+        return reverse("posts:post_detail", args=[post.pk])
+
+    def item_pubdate(self, post):
+        return post.pub_date
+
+    def item_author_name(self, post):
+        return post.author.get_full_name() or post.author.username
+
+
+class GroupPostsFeed(PostsFeed):
+    def get_object(self, request, slug):
+        return get_object_or_404(Group, slug=slug)
+
+    def feed_name(self, group):
+        return feed_cache.group_feed(group.pk)
+
+    def posts(self, group):
+        return group.posts.all()
+
+    def title(self, group):
+        return f"Yatube: {group.title}"
+
+    def description(self, group):
+        return group.description or f"Новые посты группы {group.title}"
+
+    def link(self, group):
+        return reverse("posts:group_list", args=[group.slug])
+
+
+class AuthorPostsFeed(PostsFeed):
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username)
+
+    def feed_name(self, author):
+        return feed_cache.author_feed(author.pk)
+
+    def posts(self, author):
+        return author.posts.all()
+
+    def title(self, author):
+        return f"Yatube: {author.get_full_name() or author.username}"
+
+    def description(self, author):
+        return f"Новые посты пользователя {author.username}"
+
+    def link(self, author):
+        return reverse("posts:profile", args=[author.username])
+
+
+def _blob_key(request, feed_name, fmt):
+    version = feed_cache.get_version(feed_name)
+    host = request.get_host()
+    return f"posts:syndication:{host}:{feed_name}:{version}:{fmt}"
+
+
+def _build(feed, obj, request, fmt):
+    feed.feed_type = FORMATS[fmt]
+    generator = feed.get_feed(obj, request)
+    response = HttpResponse(content_type=generator.content_type)
+    generator.write(response, "utf-8")
+    content = response.content
+    return {
+        "content": content,
+        "content_type": generator.content_type,
+        "etag": quote_etag(hashlib.md5(content).hexdigest()),
+        "built": int(time.time()),
+    }
+
+
+def serve(request, feed, fmt, **kwargs):
+    if fmt not in FORMATS:
+        raise Http404("Неизвестный формат ленты")
+    obj = feed.get_object(request, **kwargs)
+    key = _blob_key(request, feed.feed_name(obj), fmt)
+    blob = cache.get(key)
+    if blob is None:
+        blob = _build(feed, obj, request, fmt)
+        cache.set(key, blob, settings.POSTS_FEED_CACHE_TIMEOUT)
+    response = get_conditional_response(
+        request, etag=blob["etag"], last_modified=blob["built"]
+    )
+    if response is None:
+        response = HttpResponse(
+            blob["content"], content_type=blob["content_type"]
+        )
+    response["ETag"] = blob["etag"]
+    response["Last-Modified"] = http_date(blob["built"])
+    return response
+
+
+def index_feed(request, fmt):
+    return serve(request, PostsFeed(), fmt)
+
+
+def group_feed(request, slug, fmt):
+    return serve(request, GroupPostsFeed(), fmt, slug=slug)
+
+
+def author_feed(request, username, fmt):
+    return serve(request, AuthorPostsFeed(), fmt, username=username)
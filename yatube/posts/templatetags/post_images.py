@@ -0,0 +1,37 @@
+from django import template
+from django.core.files.storage import default_storage
+
+from ..thumbnails import parse_variants
+
+register = template.Library()
+
+DEFAULT_SIZES = "(max-width: 960px) 100vw, 960px"
+
+
+def _srcset(files):
+    return ", ".join(
+        f"{default_storage.url(name)} {width}w" for width, name in files
+    )
+
+
+@register.inclusion_tag("posts/includes/post_image.html")
+def post_picture(post, css_class="", sizes=DEFAULT_SIZES):
+    """<picture> с вариантами картинки поста или заглушка, пока их нет.
+
+    Картинки тег не открывает: всё берётся из Post.image_variants.
+    """
+    context = {"post": post, "css_class": css_class, "sizes": sizes}
+    variants = parse_variants(post.image_variants)
+    if variants is None:
+        # Вариантов ещё нет — показываем заглушку.
+        return context
+    jpeg = variants.pop("image/jpeg")
+    context.update(
+        sources=[
+            {"type": mime, "srcset": _srcset(files)}
+            for mime, files in variants.items()
+        ],
+        srcset=_srcset(jpeg),
+        src=post.thumbnail.url,
+    )
+    return context
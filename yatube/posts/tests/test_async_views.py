@@ -0,0 +1,94 @@
+from django.core.cache import cache
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User
+
+
+class AsyncViewsTests(TransactionTestCase):
+    """Асинхронные страницы отдают то же, что синхронные."""
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username="author")
+        self.reader = User.objects.create_user(username="reader")
+        self.group = Group.objects.create(title="Группа", slug="group")
+        for number in range(13):
+            Post.objects.create(
+                text=f"Пост {number}", author=self.author, group=self.group
+            )
+        self.post = Post.objects.latest("pk")
+        Comment.objects.create(
+            post=self.post, author=self.reader, text="Комментарий"
+        )
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.client.force_login(self.reader)
+
+    def get_both(self, url):
+        sync_response = self.client.get(url)
+        cache.clear()
+        with override_settings(ROOT_URLCONF="yatube.asgi_urls"):
+            async_response = self.client.get(url)
+            # resolver_match ленивый: разрешаем внутри override_settings.
+            self.assertEqual(
+                async_response.resolver_match.func.__module__,
+                "posts.async_views",
+            )
+        return sync_response, async_response
+
+    def test_pages_match_sync_views(self):
+        pages = [
+            reverse("posts:index"),
+            reverse("posts:index") + "?page=2",
+            reverse("posts:index") + "?page=99",
+            reverse("posts:group_list", args=[self.group.slug]),
+            reverse("posts:profile", args=[self.author.username]),
+            reverse("posts:follow_index"),
+        ]
+        for url in pages:
+            with self.subTest(url=url):
+                sync_response, async_response = self.get_both(url)
+                self.assertEqual(async_response.status_code, 200)
+                sync_page = sync_response.context["page_obj"]
+                async_page = async_response.context["page_obj"]
+                self.assertEqual(async_page.number, sync_page.number)
+                self.assertEqual(
+                    [post.pk for post in async_page],
+                    [post.pk for post in sync_page],
+                )
+                self.assertEqual(
+                    async_page.paginator.count, sync_page.paginator.count
+                )
+
+    def test_profile_context(self):
+        url = reverse("posts:profile", args=[self.author.username])
+        sync_response, async_response = self.get_both(url)
+        for key in ("author", "posts_count", "followers_count", "following"):
+            with self.subTest(key=key):
+                self.assertEqual(
+                    async_response.context[key], sync_response.context[key]
+                )
+        self.assertTrue(async_response.context["following"])
+
+    def test_post_detail(self):
+        url = reverse("posts:post_detail", args=[self.post.pk])
+        sync_response, async_response = self.get_both(url)
+        self.assertEqual(async_response.context["post"], self.post)
+        self.assertEqual(
+            list(async_response.context["comments"]),
+            list(sync_response.context["comments"]),
+        )
+        self.assertContains(async_response, "Комментарий")
+
+    def test_missing_objects(self):
+        with override_settings(ROOT_URLCONF="yatube.asgi_urls"):
+            for url in ("/group/missing/", "/profile/missing/",
+                        "/posts/0/"):
+                with self.subTest(url=url):
+                    self.assertEqual(self.client.get(url).status_code, 404)
+            self.client.logout()
+            response = self.client.get(reverse("posts:follow_index"))
+            self.assertRedirects(
+                response, "/auth/login/?next=/follow/",
+                fetch_redirect_response=False,
+            )
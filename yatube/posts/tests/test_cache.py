@@ -30,16 +30,61 @@ class CacheTests(TestCase):
 
     def test_cache_index_page(self):
         """Содержимое главной страницы сайта кешируется."""
+        response = self.author_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Тестовый текст')
+        # update() не шлёт сигналов, поэтому версия ленты не меняется.
+        Post.objects.filter(pk=CacheTests.post.pk).update(text='Изменён')
+        response = self.author_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Тестовый текст')
+        cache.clear()
+        response = self.author_client.get(reverse('posts:index'))
+        self.assertNotContains(response, 'Тестовый текст')
+
+    def test_cache_invalidated_on_post_changes(self):
+        """Создание и удаление поста сразу видны в лентах."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[CacheTests.group.slug]),
+            reverse('posts:profile', args=[CacheTests.user.username]),
+        )
+        for url in urls:
+            self.author_client.get(url)
         new_post = Post.objects.create(
             text='Проверка кеша',
             group=CacheTests.group,
             author=CacheTests.user
         )
-        response = self.author_client.get(reverse('posts:index'))
-        self.assertContains(response, new_post)
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.author_client.get(url)
+                self.assertContains(response, new_post)
         new_post.delete()
-        response = self.author_client.get(reverse('posts:index'))
-        self.assertContains(response, new_post)
-        cache.clear()
-        response = self.author_client.get(reverse('posts:index'))
-        self.assertNotContains(response, new_post)
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.author_client.get(url)
+                self.assertNotContains(response, new_post)
+
+    def test_cache_invalidated_on_author_name_change(self):
+        """Новое имя автора сразу видно в лентах."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[CacheTests.group.slug]),
+            reverse('posts:profile', args=[CacheTests.user.username]),
+        )
+        for url in urls:
+            self.guest_client.get(url)
+        author = User.objects.get(pk=CacheTests.user.pk)
+        author.first_name = 'Лев'
+        author.last_name = 'Толстой'
+        author.save()
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertContains(response, 'Лев Толстой')
+
+    def test_cached_page_skips_post_queries(self):
+        """Повторный показ главной не запрашивает посты и их число."""
+        self.guest_client.get(reverse('posts:index'))
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Тестовый текст')
@@ -0,0 +1,119 @@
+import datetime
+from http import HTTPStatus
+
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Comment, Post, User
+
+
+@override_settings(POSTS_COMMENTS_PER_PAGE=3)
+class CommentPagesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="author")
+        cls.post = Post.objects.create(text="Пост", author=cls.author)
+        start = timezone.now()
+        cls.comments = []
+        for number in range(5):
+            comment = Comment.objects.create(
+                post=cls.post, author=cls.author, text=f"Комментарий {number}"
+            )
+            # Разные даты, чтобы порядок не зависел от скорости теста.
+            Comment.objects.filter(pk=comment.pk).update(
+                created=start + datetime.timedelta(minutes=number)
+            )
+            cls.comments.append(comment)
+        cls.detail_url = reverse("posts:post_detail", args=[cls.post.pk])
+        cls.list_url = reverse("posts:comment_list", args=[cls.post.pk])
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    @staticmethod
+    def pks(page):
+        return [comment.pk for comment in page]
+
+    def test_post_detail_shows_first_batch(self):
+        response = self.client.get(self.detail_url)
+        page = response.context["comments"]
+        expected = [comment.pk for comment in reversed(self.comments)]
+        self.assertEqual(self.pks(page), expected[:3])
+        self.assertIn(self.list_url, page.next_url)
+
+    def test_next_batches(self):
+        """Порции по курсору в обоих порядках не теряют комментариев."""
+        for order, expected in (
+            ("newest", [c.pk for c in reversed(self.comments)]),
+            ("oldest", [c.pk for c in self.comments]),
+        ):
+            with self.subTest(order=order):
+                response = self.client.get(self.list_url, {"order": order})
+                page = response.context["comments"]
+                self.assertEqual(self.pks(page), expected[:3])
+                response = self.client.get(page.next_url)
+                page = response.context["comments"]
+                self.assertEqual(self.pks(page), expected[3:])
+                self.assertIsNone(page.next_url)
+                self.assertTemplateUsed(
+                    response, "posts/includes/comments.html"
+                )
+
+    def test_json_batch(self):
+        response = self.client.get(
+            self.list_url, {"format": "json", "order": "oldest"}
+        )
+        data = response.json()
+        self.assertEqual(
+            [item["id"] for item in data["results"]],
+            [comment.pk for comment in self.comments[:3]],
+        )
+        self.assertEqual(data["results"][0]["text"], "Комментарий 0")
+        self.assertTrue(data["next"])
+
+    def test_missing_post(self):
+        response = self.client.get(
+            reverse("posts:comment_list", args=[self.post.pk + 100])
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_replies(self):
+        """Ответы одного уровня: ответ на ответ попадает в ту же ветку."""
+        root = self.comments[0]
+        add_url = reverse("posts:add_comment", args=[self.post.pk])
+        self.client.post(add_url, {"text": "Ответ", "parent": root.pk})
+        reply = Comment.objects.latest("pk")
+        self.client.post(add_url, {"text": "Ещё ответ", "parent": reply.pk})
+        nested = Comment.objects.latest("pk")
+        self.assertEqual(reply.parent_id, root.pk)
+        self.assertEqual(nested.parent_id, root.pk)
+        root.refresh_from_db()
+        self.assertEqual(root.replies_count, 2)
+
+        response = self.client.get(self.detail_url, {"order": "oldest"})
+        self.assertNotIn(reply.pk, self.pks(response.context["comments"]))
+        response = self.client.get(
+            self.list_url, {"parent": root.pk, "format": "json"}
+        )
+        self.assertEqual(
+            [item["id"] for item in response.json()["results"]],
+            [reply.pk, nested.pk],
+        )
+
+        reply.delete()
+        root.refresh_from_db()
+        self.assertEqual(root.replies_count, 1)
+
+    def test_reply_to_other_post_is_plain_comment(self):
+        other = Post.objects.create(text="Другой пост", author=self.author)
+        foreign = Comment.objects.create(
+            post=other, author=self.author, text="Чужой"
+        )
+        self.client.post(
+            reverse("posts:add_comment", args=[self.post.pk]),
+            {"text": "Ответ", "parent": foreign.pk},
+        )
+        self.assertIsNone(Comment.objects.latest("pk").parent_id)
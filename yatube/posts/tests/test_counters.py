@@ -0,0 +1,71 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from ..counters import get_stats
+from ..models import Comment, Follow, Post, User, UserStats
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="author")
+        cls.reader = User.objects.create_user(username="reader")
+
+    def setUp(self):
+        # Свежие объекты, чтобы не тянуть закешированный user.stats.
+        self.author = User.objects.get(pk=CountersTests.author.pk)
+        self.reader = User.objects.get(pk=CountersTests.reader.pk)
+
+    def test_post_counters(self):
+        """Счётчик постов меняется при создании и удалении поста."""
+        post = Post.objects.create(text="Тестовый пост", author=self.author)
+        Post.objects.create(text="Ещё пост", author=self.author)
+        self.assertEqual(get_stats(self.author).posts_count, 2)
+        post.delete()
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).posts_count, 1
+        )
+
+    def test_follow_counters(self):
+        """Счётчики подписок меняются у автора и у подписчика."""
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(get_stats(self.author).followers_count, 1)
+        self.assertEqual(get_stats(self.reader).following_count, 1)
+        follow.delete()
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).followers_count, 0
+        )
+        self.assertEqual(
+            UserStats.objects.get(user=self.reader).following_count, 0
+        )
+
+    def test_comment_counter(self):
+        """Счётчик комментариев поста меняется вместе с комментариями."""
+        post = Post.objects.create(text="Тестовый пост", author=self.author)
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text="Комментарий"
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+
+    def test_recount_stats_fixes_drift(self):
+        """Команда recount_stats восстанавливает разошедшиеся счётчики."""
+        post = Post.objects.create(text="Тестовый пост", author=self.author)
+        Comment.objects.create(post=post, author=self.reader, text="Текст")
+        Follow.objects.create(user=self.reader, author=self.author)
+        UserStats.objects.update(posts_count=100, followers_count=100)
+        Post.objects.update(comments_count=100)
+        out = StringIO()
+        call_command("recount_stats", stdout=out)
+        self.assertIn("Счётчики пересчитаны для 2", out.getvalue())
+        stats = UserStats.objects.get(user=self.author)
+        self.assertEqual(stats.posts_count, 1)
+        self.assertEqual(stats.followers_count, 1)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
@@ -0,0 +1,89 @@
+from http import HTTPStatus
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="auth")
+        cls.reader = User.objects.create_user(username="reader")
+        cls.group = Group.objects.create(title="Группа", slug="group")
+        cls.post = Post.objects.create(
+            text="Текст", author=cls.user, group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+        self.urls = {
+            "index": reverse("posts:index"),
+            "group": reverse("posts:group_list", args=[self.group.slug]),
+            "profile": reverse("posts:profile", args=[self.user.username]),
+            "post": reverse("posts:post_detail", args=[self.post.pk]),
+        }
+
+    def revalidate(self, url, client=None):
+        client = client or self.client
+        etag = client.get(url)["ETag"]
+        return client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_not_modified_without_render(self):
+        """Неизменная страница отдаётся кодом 304 без шаблонов."""
+        for name, url in self.urls.items():
+            with self.subTest(page=name):
+                response = self.revalidate(url)
+                self.assertEqual(
+                    response.status_code, HTTPStatus.NOT_MODIFIED
+                )
+                self.assertFalse(response.templates)
+
+    def test_new_post_changes_feeds(self):
+        etags = {name: self.client.get(url)["ETag"]
+                 for name, url in self.urls.items()}
+        Post.objects.create(text="Новый", author=self.user, group=self.group)
+        for name, url in self.urls.items():
+            with self.subTest(page=name):
+                response = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[name]
+                )
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_comment_and_follow_change_pages(self):
+        post_etag = self.client.get(self.urls["post"])["ETag"]
+        profile_etag = self.client.get(self.urls["profile"])["ETag"]
+        Comment.objects.create(post=self.post, author=self.reader, text="Ок")
+        Follow.objects.create(user=self.reader, author=self.user)
+        self.assertNotEqual(
+            self.client.get(self.urls["post"])["ETag"], post_etag
+        )
+        self.assertNotEqual(
+            self.client.get(self.urls["profile"])["ETag"], profile_etag
+        )
+
+    def test_etag_depends_on_user_and_page(self):
+        url = self.urls["index"]
+        etag = self.client.get(url)["ETag"]
+        self.assertNotEqual(self.client_class().get(url)["ETag"], etag)
+        self.assertNotEqual(self.client.get(url, {"page": 2})["ETag"], etag)
+
+    def test_post_etag_follows_csrf_token(self):
+        """После нового входа страница поста не отдаётся со старым токеном."""
+        url = self.urls["post"]
+        etag = self.client.get(url)["ETag"]
+        self.client.logout()
+        self.client.force_login(self.reader)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_missing_objects_still_404(self):
+        response = self.client.get(
+            reverse("posts:profile", args=["nobody"]),
+            HTTP_IF_NONE_MATCH="*",
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
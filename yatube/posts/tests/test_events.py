@@ -0,0 +1,188 @@
+import asyncio
+import json
+import threading
+from http import HTTPStatus
+
+from django.conf import settings
+from django.test import TransactionTestCase, override_settings
+
+from ..events import LocalBroker, get_broker
+from ..feed_cache import GLOBAL_FEED, author_feed, group_feed
+from ..models import Follow, Group, Post, User
+from ..sse import application
+
+
+async def _wait_for(condition):
+    for _ in range(200):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("Не дождались условия")
+
+
+def _body(sent):
+    return b"".join(
+        message.get("body", b"") for message in sent
+        if message["type"] == "http.response.body"
+    ).decode()
+
+
+def run_stream(path, action=None, headers=()):
+    """Открывает поток, выполняет action(sent), затем отключается.
+
+    Возвращает отправленные приложением сообщения ASGI.
+    """
+    async def main():
+        inbox = asyncio.Queue()
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "path": path,
+            "headers": list(headers),
+        }
+        task = asyncio.ensure_future(application(scope, inbox.get, send))
+        await _wait_for(lambda: sent or task.done())
+        if action is not None and sent[0]["status"] == HTTPStatus.OK:
+            await action(sent)
+        await inbox.put({"type": "http.disconnect"})
+        await asyncio.wait_for(task, 5)
+        return sent
+
+    return asyncio.run(main())
+
+
+class LocalBrokerTests(TransactionTestCase):
+    def test_publish_from_other_thread(self):
+        """Событие из другого потока доходит только подписчикам канала."""
+        broker = LocalBroker()
+
+        async def main():
+            matching = broker.subscribe([GLOBAL_FEED])
+            other = broker.subscribe([group_feed(1)])
+            thread = threading.Thread(
+                target=broker.publish, args=([GLOBAL_FEED], {"post": 7})
+            )
+            thread.start()
+            await asyncio.wait_for(matching.changed.wait(), 5)
+            thread.join()
+            await asyncio.sleep(0)
+            self.assertEqual((matching.count, matching.latest), (1, 7))
+            self.assertEqual(other.count, 0)
+            matching.close()
+            other.close()
+            self.assertEqual(broker.subscribers_count(), 0)
+
+        asyncio.run(main())
+
+
+class EventStreamTests(TransactionTestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username="author")
+        self.group = Group.objects.create(title="Группа", slug="group")
+        self.broker = get_broker()
+
+    async def create_post(self, **kwargs):
+        """Создаёт пост в другом потоке, как это делает WSGI-процесс."""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, lambda: Post.objects.create(
+            text="Новый пост", author=self.author, **kwargs
+        ))
+
+    def test_new_post_event(self):
+        """Новый пост приходит событием в потоки его лент."""
+        created = []
+
+        async def action(sent):
+            await _wait_for(lambda: self.broker.subscribers_count())
+            await self.create_post(group=self.group)
+            created.append(Post.objects.latest("pk").pk)
+            await _wait_for(lambda: "event: posts" in _body(sent))
+
+        for path in ("/events/", "/events/group/group/",
+                     "/events/profile/author/"):
+            with self.subTest(path=path):
+                created.clear()
+                sent = run_stream(path, action)
+                self.assertEqual(sent[0]["status"], HTTPStatus.OK)
+                self.assertIn(
+                    (b"content-type", b"text/event-stream; charset=utf-8"),
+                    sent[0]["headers"],
+                )
+                body = _body(sent)
+                data = json.loads(body.split("data: ")[1].split("\n")[0])
+                self.assertEqual(data, {"count": 1, "latest": created[0]})
+                self.assertIn("id: 1\n", body)
+        self.assertEqual(self.broker.subscribers_count(), 0)
+
+    def test_other_feed_is_silent(self):
+        """Пост без группы не попадает в поток группы."""
+        async def action(sent):
+            await _wait_for(lambda: self.broker.subscribers_count())
+            await self.create_post()
+            await asyncio.sleep(0.1)
+
+        sent = run_stream("/events/group/group/", action)
+        self.assertNotIn("event: posts", _body(sent))
+
+    def test_last_event_id_continues_count(self):
+        async def action(sent):
+            await _wait_for(lambda: self.broker.subscribers_count())
+            await self.create_post()
+            await _wait_for(lambda: "event: posts" in _body(sent))
+
+        sent = run_stream("/events/", action, [(b"last-event-id", b"4")])
+        self.assertIn('"count": 5', _body(sent))
+
+    @override_settings(POSTS_EVENTS_HEARTBEAT=0.05)
+    def test_heartbeat(self):
+        async def action(sent):
+            await _wait_for(lambda: ": ping" in _body(sent))
+
+        sent = run_stream("/events/", action)
+        self.assertTrue(_body(sent).startswith(
+            f"retry: {settings.POSTS_EVENTS_RETRY * 1000}\n\n"
+        ))
+
+    def test_unknown_feeds(self):
+        for path in ("/events/group/missing/", "/events/profile/missing/",
+                     "/events/unknown/"):
+            with self.subTest(path=path):
+                sent = run_stream(path)
+                self.assertEqual(sent[0]["status"], HTTPStatus.NOT_FOUND)
+
+    def test_follow_stream(self):
+        """Поток подписок требует входа и слушает ленты авторов."""
+        sent = run_stream("/events/follow/")
+        self.assertEqual(sent[0]["status"], HTTPStatus.FORBIDDEN)
+
+        reader = User.objects.create_user(username="reader")
+        Follow.objects.create(user=reader, author=self.author)
+        self.client.force_login(reader)
+        session = self.client.cookies[settings.SESSION_COOKIE_NAME].value
+        cookie = f"{settings.SESSION_COOKIE_NAME}={session}".encode()
+        channels = []
+
+        async def action(sent):
+            await _wait_for(lambda: self.broker.subscribers_count())
+            channels.extend(self.broker._subscribers)
+
+        sent = run_stream("/events/follow/", action, [(b"cookie", cookie)])
+        self.assertEqual(sent[0]["status"], HTTPStatus.OK)
+        self.assertEqual(channels, [author_feed(self.author.pk)])
+
+        # Смена пароля и отключение закрывают поток, как и страницы.
+        reader.set_password("new-password")
+        reader.save()
+        sent = run_stream("/events/follow/", headers=[(b"cookie", cookie)])
+        self.assertEqual(sent[0]["status"], HTTPStatus.FORBIDDEN)
+        self.client.force_login(reader)
+        session = self.client.cookies[settings.SESSION_COOKIE_NAME].value
+        cookie = f"{settings.SESSION_COOKIE_NAME}={session}".encode()
+        User.objects.filter(pk=reader.pk).update(is_active=False)
+        sent = run_stream("/events/follow/", headers=[(b"cookie", cookie)])
+        self.assertEqual(sent[0]["status"], HTTPStatus.FORBIDDEN)
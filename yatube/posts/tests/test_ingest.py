@@ -0,0 +1,214 @@
+import atexit
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import ingest
+from ..models import Comment, Post, User
+
+
+class BufferTestCase(TestCase):
+    buffer_class = "posts.ingest.CommentBuffer"
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="author")
+        cls.reader = User.objects.create_user(username="reader")
+        cls.post = Post.objects.create(text="Пост", author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        log_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(log_dir.cleanup)
+        self.log_dir = log_dir.name
+        settings_override = override_settings(
+            POSTS_COMMENT_BUFFER=self.buffer_class,
+            POSTS_COMMENT_FLUSH_INTERVAL=None,
+            POSTS_COMMENT_LOG_DIR=self.log_dir,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        ingest._buffer = None
+        self.addCleanup(setattr, ingest, "_buffer", None)
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def comment(self, text, post=None, **data):
+        post = post or self.post
+        return self.client.post(
+            reverse("posts:add_comment", args=[post.pk]),
+            {"text": text, **data},
+        )
+
+
+class CommentBufferTests(BufferTestCase):
+    def test_comment_waits_for_flush(self):
+        self.comment("Отложенный")
+        self.assertFalse(Comment.objects.exists())
+        self.assertEqual(ingest.get_buffer().flush(), 1)
+        comment = Comment.objects.get()
+        self.assertEqual(comment.text, "Отложенный")
+        self.assertEqual(comment.author, self.reader)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+
+    def test_read_your_own_writes(self):
+        """Автор видит свой комментарий до сброса, другие — после."""
+        url = reverse("posts:post_detail", args=[self.post.pk])
+        etag = self.client.get(url)["ETag"]
+        self.comment("Мой комментарий")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, "Мой комментарий")
+        other = Client()
+        other.force_login(self.author)
+        self.assertNotContains(other.get(url), "Мой комментарий")
+
+        ingest.get_buffer().flush()
+        response = self.client.get(url)
+        self.assertEqual(response.context["pending_comments"], [])
+        self.assertContains(response, "Мой комментарий", count=1)
+        self.assertContains(other.get(url), "Мой комментарий")
+
+    def test_counters_once_per_batch(self):
+        other_post = Post.objects.create(text="Другой", author=self.author)
+        root = Comment.objects.create(
+            post=self.post, author=self.author, text="Корень"
+        )
+        self.comment("Первый")
+        self.comment("Второй", parent=root.pk)
+        self.comment("Третий", parent=root.pk)
+        self.comment("К другому посту", post=other_post)
+        with self.assertNumQueries(8):
+            # Посты, корни веток и авторы, SAVEPOINT, вставка, два UPDATE
+            # счётчиков, RELEASE.
+            self.assertEqual(ingest.get_buffer().flush(), 4)
+        self.post.refresh_from_db()
+        other_post.refresh_from_db()
+        root.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 4)
+        self.assertEqual(other_post.comments_count, 1)
+        self.assertEqual(root.replies_count, 2)
+
+    def test_deleted_post_is_skipped(self):
+        doomed = Post.objects.create(text="Удалим", author=self.author)
+        self.comment("Пропадёт", post=doomed)
+        self.comment("Останется")
+        doomed.delete()
+        self.assertEqual(ingest.get_buffer().flush(), 1)
+        self.assertEqual(Comment.objects.get().text, "Останется")
+
+    def test_deleted_author_is_skipped(self):
+        """Удалённый до сброса автор не срывает пакет и не застревает."""
+        self.comment("Пропадёт")
+        User.objects.filter(pk=self.reader.pk).delete()
+        buffer = ingest.get_buffer()
+        other = Client()
+        other.force_login(self.author)
+        other.post(
+            reverse("posts:add_comment", args=[self.post.pk]),
+            {"text": "Останется"},
+        )
+        self.assertEqual(buffer.flush(), 1)
+        self.assertEqual(buffer._pending, [])
+        self.assertEqual(Comment.objects.get().text, "Останется")
+
+    def test_integrity_error_drops_only_bad_comment(self):
+        """Пакет, нарушивший ограничение, пишется по одному."""
+        self.comment("Плохой")
+        self.comment("Хороший")
+        original = ingest.write_batch
+
+        def write_batch(entries):
+            if any(entry["text"] == "Плохой" for entry in entries):
+                raise IntegrityError("FOREIGN KEY constraint failed")
+            return original(entries)
+
+        buffer = ingest.get_buffer()
+        ingest.write_batch = write_batch
+        try:
+            with self.assertLogs("posts.ingest", "ERROR"):
+                self.assertEqual(buffer.flush(), 1)
+        finally:
+            ingest.write_batch = original
+        self.assertEqual(buffer._pending, [])
+        self.assertEqual(Comment.objects.get().text, "Хороший")
+
+    def test_flush_keeps_comment_time(self):
+        """Дата комментария — время отправки, а не время сброса."""
+        self.comment("Давний")
+        [entry] = ingest.get_buffer()._pending
+        entry["created"] = "2020-01-02T03:04:05+00:00"
+        ingest.get_buffer().flush()
+        self.assertEqual(
+            Comment.objects.get().created.isoformat(),
+            "2020-01-02T03:04:05+00:00",
+        )
+
+    def test_batch_size_wakes_flusher(self):
+        with override_settings(POSTS_COMMENT_BATCH_SIZE=2):
+            buffer = ingest.get_buffer()
+            self.comment("Раз")
+            self.assertEqual(len(buffer._pending), 1)
+            self.comment("Два")
+        self.assertEqual(buffer.flush(), 2)
+
+
+class DurableCommentBufferTests(BufferTestCase):
+    buffer_class = "posts.ingest.DurableCommentBuffer"
+
+    def log_files(self):
+        return sorted(os.listdir(self.log_dir))
+
+    def test_comments_logged_until_flush(self):
+        self.comment("В журнале")
+        [name] = self.log_files()
+        with open(os.path.join(self.log_dir, name), encoding="utf-8") as log:
+            entry = json.loads(log.readline())
+        self.assertEqual(entry["text"], "В журнале")
+        ingest.get_buffer().flush()
+        self.assertEqual(self.log_files(), [])
+        self.assertTrue(Comment.objects.filter(text="В журнале").exists())
+
+    def test_failed_flush_keeps_log(self):
+        self.comment("Переживёт ошибку")
+        buffer = ingest.get_buffer()
+        original = ingest.write_batch
+
+        def broken(entries):
+            raise RuntimeError("база недоступна")
+
+        ingest.write_batch = broken
+        try:
+            with self.assertRaises(RuntimeError):
+                buffer.flush()
+        finally:
+            ingest.write_batch = original
+        self.assertEqual(len(self.log_files()), 1)
+        self.comment("Следующий")
+        self.assertEqual(buffer.flush(), 2)
+        self.assertEqual(self.log_files(), [])
+
+    def test_replay_leftover_log(self):
+        """Журнал упавшего процесса досылает flush_comment_log."""
+        self.comment("Из журнала")
+        # Процесс «упал»: буфер забыт, журнал остался.
+        buffer = ingest.get_buffer()
+        atexit.unregister(buffer.flush)
+        buffer._file.close()
+        ingest._buffer = None
+        path = os.path.join(self.log_dir, self.log_files()[0])
+        with open(path, "a", encoding="utf-8") as log:
+            log.write('{"token": "обрыв')
+        out = StringIO()
+        call_command("flush_comment_log", stdout=out)
+        self.assertIn("Записано комментариев: 1", out.getvalue())
+        self.assertEqual(Comment.objects.get().text, "Из журнала")
+        self.assertEqual(self.log_files(), [])
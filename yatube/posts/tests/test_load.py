@@ -0,0 +1,97 @@
+import json
+import os
+import tempfile
+from collections import Counter
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+
+from ..management.commands.seed_load import LoadGenerator
+from ..models import Comment, Follow, Group, Post, User
+
+
+class SeedLoadTests(TestCase):
+    options = {
+        "users": 30, "groups": 3, "posts": 200, "comments": 400,
+        "follows": 5,
+    }
+
+    def test_same_seed_same_records(self):
+        first = list(LoadGenerator(**self.options, seed=1))
+        second = list(LoadGenerator(**self.options, seed=1))
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, list(LoadGenerator(**self.options)))
+
+    def test_skewed_graph(self):
+        """Популярным авторам достаётся больше подписчиков и постов."""
+        records = list(LoadGenerator(**self.options))
+        followers = Counter(
+            record["author"] for record in records
+            if record["model"] == "follow"
+        )
+        posts = Counter(
+            record["author"] for record in records
+            if record["model"] == "post"
+        )
+        self.assertEqual(followers.most_common(1)[0][0], 1)
+        self.assertGreater(posts[1], posts[30])
+        comments = Counter(
+            record["post"] for record in records
+            if record["model"] == "comment"
+        )
+        # Десятая часть постов собирает больше половины комментариев.
+        hot = sum(total for _, total in comments.most_common(20))
+        self.assertGreater(hot, 200)
+
+    def test_seed_command(self):
+        call_command("seed_load", **self.options, stdout=StringIO())
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 400)
+        self.assertTrue(Follow.objects.exists())
+        top = User.objects.order_by("pk").first()
+        self.assertEqual(top.stats.posts_count, top.posts.count())
+
+
+class BenchPagesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command(
+            "seed_load", "--users=5", "--groups=2", "--posts=30",
+            "--comments=20", stdout=StringIO(),
+        )
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.output = os.path.join(directory.name, "bench.json")
+
+    def bench(self, *args):
+        out = StringIO()
+        call_command(
+            "bench_pages", "--requests=3", "--warmup=1",
+            f"--output={self.output}", *args, stdout=out, stderr=StringIO(),
+        )
+        return out.getvalue()
+
+    def test_report_and_compare(self):
+        self.bench()
+        with open(self.output, encoding="utf-8") as stream:
+            result = json.load(stream)
+        self.assertEqual(
+            set(result["pages"]),
+            {"index", "group_posts", "profile", "post_detail",
+             "follow_index"},
+        )
+        self.assertEqual(result["rows"]["post"], 30)
+        page = result["pages"]["post_detail"]
+        self.assertLessEqual(page["p50"], page["p99"])
+        self.assertGreater(page["queries"], 0)
+
+        output = self.bench("--cold", f"--compare={self.output}")
+        self.assertIn("запросов", output.splitlines()[-1])
@@ -0,0 +1,81 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from core.models import StoredFile
+
+from .. import thumbnails
+from ..models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def make_image(name="image.png", color="red"):
+    data = BytesIO()
+    Image.new("RGB", (400, 200), color).save(data, "PNG")
+    return SimpleUploadedFile(name, data.getvalue(), content_type="image/png")
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, POSTS_THUMBNAIL_SYNC=True)
+class PostMediaTests(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="auth")
+        self.client.force_login(self.user)
+
+    def create(self, text, **kwargs):
+        self.client.post(
+            reverse("posts:post_create"),
+            {"text": text, "image": make_image(**kwargs)},
+        )
+        return Post.objects.get(text=text)
+
+    def references(self, post):
+        names = thumbnails.post_files(post.image.name, post.image_variants)
+        return {
+            name: StoredFile.objects.get(name=name).references
+            for name in names
+        }
+
+    def test_duplicates_share_files(self):
+        """Одинаковые картинки и их варианты хранятся один раз."""
+        first = self.create("Первый")
+        second = self.create("Второй", name="copy.png")
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(first.image_variants, second.image_variants)
+        self.assertEqual(set(self.references(first).values()), {2})
+
+    def test_delete_removes_orphans(self):
+        first = self.create("Первый")
+        second = self.create("Второй")
+        files = list(self.references(first))
+        first.delete()
+        self.assertTrue(all(default_storage.exists(name) for name in files))
+        second.delete()
+        self.assertFalse(any(default_storage.exists(name) for name in files))
+        self.assertFalse(StoredFile.objects.exists())
+
+    def test_replaced_image_removed(self):
+        post = self.create("Пост")
+        old_files = list(self.references(post))
+        self.client.post(
+            reverse("posts:post_edit", args=[post.pk]),
+            {"text": "Пост", "image": make_image(color="blue")},
+        )
+        post.refresh_from_db()
+        self.assertFalse(
+            any(default_storage.exists(name) for name in old_files)
+        )
+        self.assertEqual(set(self.references(post).values()), {1})
+        self.assertTrue(default_storage.exists(post.image.name))
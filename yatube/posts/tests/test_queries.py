@@ -0,0 +1,122 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User
+
+
+class QueryCountTests(TestCase):
+    """Число запросов страницы не зависит от числа постов на ней."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="author")
+        cls.reader = User.objects.create_user(username="reader")
+        cls.group = Group.objects.create(
+            title="Тестовая группа",
+            slug="test-slug",
+            description="Тестовое описание",
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.post = Post.objects.create(
+            text="Тестовый пост",
+            author=cls.author,
+            group=cls.group,
+        )
+        Comment.objects.create(
+            post=cls.post, author=cls.reader, text="Комментарий"
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            self.reader_client.get(url)
+        return len(context)
+
+    def add_posts(self):
+        for i in range(9):
+            author = User.objects.create_user(username=f"author{i}")
+            Follow.objects.create(user=self.reader, author=author)
+            Post.objects.create(
+                text=f"Тестовый пост {i}", author=author, group=self.group
+            )
+
+    def test_feeds_constant_queries(self):
+        """Ленты делают одинаковое число запросов для 1 и 10 постов."""
+        urls = (
+            reverse("posts:index"),
+            reverse("posts:group_list", args=[self.group.slug]),
+            reverse("posts:follow_index"),
+        )
+        expected = {url: self.count_queries(url) for url in urls}
+        self.add_posts()
+        for url in urls:
+            with self.subTest(url=url):
+                cache.clear()
+                with self.assertNumQueries(expected[url]):
+                    response = self.reader_client.get(url)
+                self.assertEqual(len(response.context["page_obj"]), 10)
+
+    def test_profile_constant_queries(self):
+        """Профиль делает одинаковое число запросов для 1 и 10 постов."""
+        url = reverse("posts:profile", args=[self.author.username])
+        expected = self.count_queries(url)
+        Post.objects.bulk_create(
+            Post(text=f"Пост {i}", author=self.author, group=self.group)
+            for i in range(9)
+        )
+        cache.clear()
+        with self.assertNumQueries(expected):
+            self.reader_client.get(url)
+
+    def test_post_detail_constant_queries(self):
+        """Страница поста не делает запрос на каждый комментарий."""
+        url = reverse("posts:post_detail", args=[self.post.pk])
+        expected = self.count_queries(url)
+        for i in range(9):
+            author = User.objects.create_user(username=f"commenter{i}")
+            Comment.objects.create(
+                post=self.post, author=author, text=f"Комментарий {i}"
+            )
+        with self.assertNumQueries(expected):
+            self.reader_client.get(url)
+
+
+class QueryPlanTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        author = User.objects.create_user(username="author")
+        reader = User.objects.create_user(username="reader")
+        group = Group.objects.create(title="Группа", slug="test-slug")
+        Follow.objects.create(user=reader, author=author)
+        post = Post.objects.create(text="Пост", author=author, group=group)
+        Comment.objects.create(post=post, author=reader, text="Текст")
+
+    def test_feeds_use_indexes(self):
+        """Запросы лент выбирают строки по составным индексам."""
+        out = StringIO()
+        call_command("query_plans", repeat=1, stdout=out)
+        plans = out.getvalue()
+        for index in (
+            "post_pub_date_idx",
+            "post_author_pub_date_idx",
+            "post_group_pub_date_idx",
+            "comment_thread_idx",
+            # Уникальный индекс (user, author) SQLite называет сам.
+            "sqlite_autoindex_posts_follow",
+            "timeline_user_pub_date_idx",
+        ):
+            with self.subTest(index=index):
+                self.assertIn(index, plans)
@@ -0,0 +1,82 @@
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Post, User
+from ..search import MemoryBackend, SQLiteFTSBackend, get_backend, tokenize
+
+
+class SearchViewTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="auth")
+        cls.rare = Post.objects.create(
+            text="Котики и собаки гуляют в парке", author=cls.user
+        )
+        cls.often = Post.objects.create(
+            text="Котики, котики и ещё раз котики", author=cls.user
+        )
+        Post.objects.create(text="Про погоду", author=cls.user)
+
+    def search(self, query, **params):
+        response = self.client.get(
+            reverse("posts:search"), {"q": query, **params}
+        )
+        return list(response.context["page_obj"])
+
+    def test_search_uses_fts_on_sqlite(self):
+        """На SQLite поиск идёт через таблицу FTS5."""
+        self.assertIsInstance(get_backend(), SQLiteFTSBackend)
+
+    def test_search_ranked(self):
+        """Посты ранжируются по релевантности."""
+        self.assertEqual(self.search("котики"), [self.often, self.rare])
+        self.assertEqual(self.search("котики парке"), [self.rare])
+        self.assertEqual(self.search("ничего"), [])
+
+    def test_search_ignores_query_syntax(self):
+        """Спецсимволы в запросе не ломают поиск."""
+        self.assertEqual(self.search('"котики" OR*'), [])
+        self.assertEqual(self.search('погоду"'), list(
+            Post.objects.filter(text="Про погоду")
+        ))
+
+    def test_index_follows_post_changes(self):
+        """Индекс обновляется при изменении и удалении поста."""
+        rare = Post.objects.get(pk=self.rare.pk)
+        rare.text = "Собаки гуляют в парке"
+        rare.save()
+        self.assertEqual(self.search("котики"), [self.often])
+        Post.objects.get(pk=self.often.pk).delete()
+        self.assertEqual(self.search("котики"), [])
+
+    def test_search_pagination_keeps_query(self):
+        """Ссылки пагинации сохраняют поисковый запрос."""
+        Post.objects.bulk_create(
+            Post(text=f"Котики {i}", author=self.user) for i in range(12)
+        )
+        get_backend().rebuild()
+        response = self.client.get(reverse("posts:search"), {"q": "котики"})
+        self.assertContains(response, "?q=%D0%BA%D0%BE%D1%82%D0%B8%D0%BA")
+        self.assertEqual(len(self.search("котики", page=2)), 4)
+
+
+class MemoryBackendTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="auth")
+
+    def test_memory_index(self):
+        """Индекс в памяти ищет, ранжирует и обновляется."""
+        backend = MemoryBackend()
+        rare = Post.objects.create(text="Котики в парке", author=self.user)
+        often = Post.objects.create(text="Котики котики", author=self.user)
+        self.assertEqual(
+            backend.search(tokenize("котики"), 10), [often.pk, rare.pk]
+        )
+        rare.text = "Собаки в парке"
+        backend.index_post(rare)
+        self.assertEqual(backend.search(tokenize("парке"), 10), [rare.pk])
+        backend.remove_post(often.pk)
+        self.assertEqual(backend.search(tokenize("котики"), 10), [])
@@ -0,0 +1,96 @@
+import json
+from http import HTTPStatus
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Group, Post, User
+
+
+class SyndicationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="auth")
+        cls.group = Group.objects.create(title="Группа", slug="group")
+        cls.post = Post.objects.create(
+            text="Пост в группе", author=cls.user, group=cls.group
+        )
+        Post.objects.create(text="Пост без группы", author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_formats(self):
+        """Все три формата отдаются с нужным типом содержимого."""
+        url_name = "posts:index_feed"
+        types = {
+            "rss": "application/rss+xml",
+            "atom": "application/atom+xml",
+            "json": "application/feed+json",
+        }
+        for fmt, content_type in types.items():
+            with self.subTest(fmt=fmt):
+                response = self.client.get(reverse(url_name, args=[fmt]))
+                self.assertTrue(response["Content-Type"].startswith(
+                    content_type
+                ))
+                self.assertContains(response, "Пост в группе")
+        response = self.client.get(reverse(url_name, args=["xml"]))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_group_and_author_feeds(self):
+        response = self.client.get(
+            reverse("posts:group_feed", args=["group", "json"])
+        )
+        items = json.loads(response.content)["items"]
+        self.assertEqual(
+            [item["content_text"] for item in items], ["Пост в группе"]
+        )
+        self.assertTrue(items[0]["url"].endswith(
+            reverse("posts:post_detail", args=[self.post.pk])
+        ))
+        response = self.client.get(
+            reverse("posts:author_feed", args=["auth", "rss"])
+        )
+        self.assertContains(response, "Пост без группы")
+        response = self.client.get(
+            reverse("posts:author_feed", args=["nobody", "rss"])
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    @override_settings(POSTS_SYNDICATION_ITEMS=1)
+    def test_items_limit(self):
+        response = self.client.get(reverse("posts:index_feed", args=["json"]))
+        self.assertEqual(len(json.loads(response.content)["items"]), 1)
+
+    def test_cached_blob_and_conditional_get(self):
+        """Повторный запрос не ходит в базу, условный получает 304."""
+        url = reverse("posts:index_feed", args=["atom"])
+        response = self.client.get(url)
+        with self.assertNumQueries(0):
+            cached = self.client.get(url)
+        self.assertEqual(cached.content, response.content)
+        not_modified = self.client.get(
+            url, HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        self.assertEqual(not_modified.status_code, HTTPStatus.NOT_MODIFIED)
+        not_modified = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]
+        )
+        self.assertEqual(not_modified.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_invalidated_on_post_save(self):
+        url = reverse("posts:index_feed", args=["rss"])
+        etag = self.client.get(url)["ETag"]
+        Post.objects.create(text="Свежий пост", author=self.user)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertContains(response, "Свежий пост")
+
+    def test_pages_link_feeds(self):
+        response = self.client.get(reverse("posts:index"))
+        self.assertContains(
+            response, reverse("posts:index_feed", args=["atom"])
+        )
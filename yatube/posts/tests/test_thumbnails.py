@@ -0,0 +1,138 @@
+import json
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from .. import thumbnails
+from ..models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def make_image(name="image.png", size=(1000, 400), color="red"):
+    data = BytesIO()
+    Image.new("RGB", size, color).save(data, "PNG")
+    return SimpleUploadedFile(name, data.getvalue(), content_type="image/png")
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="auth")
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_placeholder_until_thumbnail_ready(self):
+        """Пока превью не готово, в ленте заглушка, после — картинка."""
+        post = Post.objects.create(
+            text="Пост", author=self.user, image=make_image()
+        )
+        response = self.client.get(reverse("posts:index"))
+        self.assertContains(response, "Изображение обрабатывается")
+        self.assertTrue(thumbnails.build(post.pk))
+        post.refresh_from_db()
+        self.assertTrue(post.thumbnail)
+        self.assertEqual(post.thumbnail.width, 960)
+        self.assertEqual(post.thumbnail.height, 339)
+        response = self.client.get(reverse("posts:index"))
+        self.assertNotContains(response, "Изображение обрабатывается")
+        self.assertContains(response, post.thumbnail.url)
+        self.assertContains(response, '<source type="image/webp"')
+
+    def test_variants(self):
+        """Варианты всех ширин до исходной, имена — по хешу содержимого."""
+        post = Post.objects.create(
+            text="Пост", author=self.user, image=make_image()
+        )
+        thumbnails.build(post.pk)
+        post.refresh_from_db()
+        variants = json.loads(post.image_variants)
+        self.assertIn("image/webp", variants)
+        for files in variants.values():
+            self.assertEqual([width for width, _ in files], [320, 640, 960])
+        self.assertEqual(post.thumbnail.name, variants["image/jpeg"][-1][1])
+        other = Post.objects.create(
+            text="Копия", author=self.user, image=make_image("copy.png")
+        )
+        thumbnails.build(other.pk)
+        other.refresh_from_db()
+        self.assertEqual(json.loads(other.image_variants), variants)
+
+    def test_small_image_not_upscaled(self):
+        """Узкая картинка даёт один вариант своей ширины."""
+        post = Post.objects.create(
+            text="Пост", author=self.user, image=make_image(size=(100, 50))
+        )
+        thumbnails.build(post.pk)
+        post.refresh_from_db()
+        self.assertEqual(post.thumbnail.width, 100)
+        self.assertEqual(post.thumbnail.height, 35)
+        for files in json.loads(post.image_variants).values():
+            self.assertEqual([width for width, _ in files], [100])
+
+    def test_render_does_no_image_work(self):
+        """Рендеринг не открывает файлы: битая картинка не мешает ленте."""
+        Post.objects.create(
+            text="Пост", author=self.user, image="posts/missing.jpg"
+        )
+        response = self.client.get(reverse("posts:index"))
+        self.assertContains(response, "Изображение обрабатывается")
+
+    @override_settings(POSTS_THUMBNAIL_SYNC=True)
+    def test_create_and_edit_schedule_thumbnail(self):
+        """Загрузка картинки ставит превью, замена картинки — новое."""
+        self.client.post(
+            reverse("posts:post_create"),
+            {"text": "С картинкой", "image": make_image("first.png")},
+        )
+        post = Post.objects.get(text="С картинкой")
+        first = post.thumbnail.name
+        self.assertTrue(first)
+        self.client.post(
+            reverse("posts:post_edit", args=[post.pk]),
+            {"text": "Без замены"},
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.thumbnail.name, first)
+        self.client.post(
+            reverse("posts:post_edit", args=[post.pk]),
+            {
+                "text": "С заменой",
+                "image": make_image("second.png", color="blue"),
+            },
+        )
+        post.refresh_from_db()
+        self.assertTrue(post.thumbnail)
+        self.assertNotEqual(post.thumbnail.name, first)
+
+    @override_settings(POSTS_THUMBNAIL_SYNC=False)
+    def test_schedule_waits_for_commit(self):
+        """В фоне превью строится только после коммита транзакции."""
+        self.client.post(
+            reverse("posts:post_create"),
+            {"text": "С картинкой", "image": make_image()},
+        )
+        # TestCase не коммитит транзакцию, задача в пул не уходит.
+        self.assertFalse(Post.objects.get(text="С картинкой").thumbnail)
+
+    def test_build_without_image(self):
+        """Посты без картинки и удалённые посты пропускаются."""
+        post = Post.objects.create(text="Пост", author=self.user)
+        self.assertFalse(thumbnails.build(post.pk))
+        self.assertFalse(thumbnails.build(0))
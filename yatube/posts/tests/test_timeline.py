@@ -0,0 +1,68 @@
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Follow, Post, TimelineEntry, User
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="author")
+        cls.reader = User.objects.create_user(username="reader")
+        cls.old_post = Post.objects.create(
+            text="Пост до подписки",
+            author=cls.author,
+        )
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def feed(self):
+        response = self.reader_client.get(reverse("posts:follow_index"))
+        return list(response.context["page_obj"])
+
+    def test_follow_backfills_timeline(self):
+        """Подписка заполняет ленту старыми постами автора."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertTrue(
+            TimelineEntry.objects.filter(
+                user=self.reader, post=self.old_post
+            ).exists()
+        )
+        self.assertEqual(self.feed(), [self.old_post])
+
+    def test_new_post_pushed_to_followers(self):
+        """Новый пост раскладывается по лентам подписчиков."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        new_post = Post.objects.create(text="Новый пост", author=self.author)
+        self.assertEqual(self.feed(), [new_post, self.old_post])
+
+    def test_unfollow_prunes_timeline(self):
+        """Отписка убирает посты автора из ленты."""
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        follow.delete()
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.reader).exists()
+        )
+        self.assertEqual(self.feed(), [])
+
+    @override_settings(POSTS_FANOUT_MAX_FOLLOWERS=0)
+    def test_popular_author_read_on_request(self):
+        """Посты популярного автора подмешиваются при чтении ленты."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        new_post = Post.objects.create(text="Новый пост", author=self.author)
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.feed(), [new_post, self.old_post])
+
+    @override_settings(POSTS_FANOUT_MAX_FOLLOWERS=1)
+    def test_author_drops_to_fanout_limit(self):
+        """Посты, вышедшие при многих подписчиках, остаются в лентах."""
+        other = User.objects.create_user(username="other")
+        Follow.objects.create(user=other, author=self.author)
+        Follow.objects.create(user=self.reader, author=self.author)
+        new_post = Post.objects.create(text="Новый пост", author=self.author)
+        self.assertFalse(TimelineEntry.objects.filter(post=new_post).exists())
+        Follow.objects.get(user=other).delete()
+        self.assertEqual(self.feed(), [new_post, self.old_post])
@@ -0,0 +1,132 @@
+import json
+import os
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+from PIL import Image
+
+from core.models import StoredFile
+
+from ..models import Comment, Follow, Group, Post, TimelineEntry, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def make_image():
+    data = BytesIO()
+    Image.new("RGB", (40, 20), "blue").save(data, "PNG")
+    return SimpleUploadedFile("image.png", data.getvalue())
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, POSTS_THUMBNAIL_SYNC=True)
+class TransferTests(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.author = User.objects.create_user(username="author")
+        self.reader = User.objects.create_user(username="reader")
+        self.group = Group.objects.create(title="Группа", slug="group")
+        self.post = Post.objects.create(
+            text="С картинкой", author=self.author, group=self.group,
+            image=make_image(),
+        )
+        Post.objects.create(text="Без картинки", author=self.reader)
+        self.root = Comment.objects.create(
+            post=self.post, author=self.reader, text="Корень"
+        )
+        Comment.objects.create(
+            post=self.post, author=self.author, text="Ответ",
+            parent=self.root,
+        )
+        Follow.objects.create(user=self.reader, author=self.author)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.data = os.path.join(directory.name, "posts.ndjson")
+        self.images = os.path.join(directory.name, "images.tar")
+
+    def export(self):
+        call_command(
+            "export_posts", self.data, images=self.images, stdout=StringIO()
+        )
+
+    def import_(self, **options):
+        out = StringIO()
+        call_command(
+            "import_posts", self.data, images=self.images, stdout=out,
+            batch_size=1, **options,
+        )
+        return out.getvalue()
+
+    def test_export_format(self):
+        self.export()
+        with open(self.data, encoding="utf-8") as stream:
+            records = [json.loads(line) for line in stream]
+        self.assertEqual(
+            [record["model"] for record in records],
+            ["user"] * 2 + ["group"] + ["post"] * 2 + ["comment"] * 2
+            + ["follow"],
+        )
+        post = records[3]
+        self.assertEqual(post["pk"], self.post.pk)
+        self.assertEqual(post["image"], self.post.image.name)
+
+    def test_round_trip_into_empty_base(self):
+        self.export()
+        pub_date = self.post.pub_date
+        image = self.post.image.name
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        self.assertFalse(default_storage.exists(image))
+
+        output = self.import_()
+        self.assertIn("строк/с", output)
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual(post.pub_date, pub_date)
+        self.assertEqual(post.author.username, "author")
+        self.assertEqual(post.group.slug, "group")
+        self.assertEqual(post.comments_count, 2)
+        self.assertTrue(default_storage.exists(post.image.name))
+        self.assertEqual(StoredFile.objects.get(name=image).references, 1)
+        root = Comment.objects.get(pk=self.root.pk)
+        self.assertEqual(root.replies_count, 1)
+        reader = User.objects.get(username="reader")
+        self.assertFalse(reader.has_usable_password())
+        self.assertEqual(reader.stats.following_count, 1)
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=reader, post=post).exists()
+        )
+
+    def test_import_next_to_existing_rows(self):
+        """Совпадающие пользователи и подписки не дублируются."""
+        self.export()
+        self.import_()
+        self.assertEqual(User.objects.count(), 2)
+        self.assertEqual(Group.objects.count(), 1)
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertEqual(Post.objects.count(), 4)
+        copy = Post.objects.exclude(pk=self.post.pk).get(text="С картинкой")
+        self.assertEqual(copy.comments_count, 2)
+        self.assertEqual(copy.image.name, self.post.image.name)
+        reply = copy.comments.get(text="Ответ")
+        self.assertEqual(reply.parent.post, copy)
+        self.assertEqual(self.author.stats.posts_count, 2)
+
+    def test_drop_indexes(self):
+        self.export()
+        self.import_(drop_indexes=True)
+        with connection.cursor() as cursor:
+            indexes = connection.introspection.get_constraints(
+                cursor, Post._meta.db_table
+            )
+        self.assertIn("post_pub_date_idx", indexes)
+        self.assertEqual(Post.objects.count(), 4)
@@ -0,0 +1,124 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from ..models import Post, User
+from ..uploads import OversizedUpload, SizeLimitUploadHandler
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def make_image(size=(200, 100), image_format="JPEG", **options):
+    data = BytesIO()
+    Image.new("RGB", size, "green").save(data, image_format, **options)
+    return data.getvalue()
+
+
+def exif_with_orientation():
+    exif = Image.Exif()
+    exif[0x0112] = 6  # повернуть на 90°
+    exif[0x010F] = "Camera"
+    return exif.tobytes()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImageUploadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="auth")
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def upload(self, content, name="image.jpg"):
+        return self.client.post(
+            reverse("posts:post_create"),
+            {
+                "text": "Пост",
+                "image": SimpleUploadedFile(name, content),
+            },
+        )
+
+    def assert_rejected(self, response, message):
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(message, response.context["form"].errors["image"][0])
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(POSTS_IMAGE_MAX_BYTES=1000)
+    def test_too_many_bytes(self):
+        """Слишком большой файл отклоняется, не дочитываясь до конца."""
+        content = make_image((400, 400), "PNG")
+        self.assertGreater(len(content), 1000)
+        self.assert_rejected(self.upload(content, "big.png"), "Файл больше")
+
+    @override_settings(POSTS_IMAGE_MAX_PIXELS=10000)
+    def test_too_many_pixels(self):
+        """Размеры проверяются по заголовку."""
+        self.assert_rejected(self.upload(make_image()), "мегапикселей")
+
+    def test_unsupported_format(self):
+        self.assert_rejected(
+            self.upload(make_image(image_format="BMP"), "image.bmp"),
+            "Поддерживаются только",
+        )
+
+    def test_not_an_image(self):
+        self.assert_rejected(
+            self.upload(b"not an image"), "Загрузите правильное изображение"
+        )
+
+    def test_truncated_image(self):
+        """Заголовок целый, а пиксели обрезаны: ошибка формы, а не 500."""
+        data = BytesIO()
+        Image.effect_noise((400, 400), 64).convert("RGB").save(data, "JPEG")
+        content = data.getvalue()
+        self.assert_rejected(
+            self.upload(content[:len(content) // 2]),
+            "Загрузите правильное изображение",
+        )
+
+    def test_exif_stripped(self):
+        """EXIF убирается, ориентация из него применяется к пикселям."""
+        self.upload(make_image(exif=exif_with_orientation()))
+        post = Post.objects.get()
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.size, (100, 200))
+            self.assertNotIn("exif", image.info)
+
+    @override_settings(POSTS_IMAGE_MAX_SIDE=50)
+    def test_oversized_original_downsampled(self):
+        self.upload(make_image(), "image.jpg")
+        post = Post.objects.get()
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.size, (50, 25))
+            self.assertEqual(image.format, "JPEG")
+
+
+class SizeLimitUploadHandlerTests(TestCase):
+    @override_settings(POSTS_IMAGE_MAX_BYTES=10)
+    def test_stops_passing_chunks(self):
+        handler = SizeLimitUploadHandler()
+        handler.new_file("image", "image.jpg", "image/jpeg", None)
+        self.assertEqual(handler.receive_data_chunk(b"12345", 0), b"12345")
+        self.assertIsNone(handler.receive_data_chunk(b"1234567", 5))
+        upload = handler.file_complete(5)
+        self.assertIsInstance(upload, OversizedUpload)
+        self.assertEqual(upload.size, 12)
+
+    def test_small_file_passed_through(self):
+        handler = SizeLimitUploadHandler()
+        handler.new_file("image", "image.jpg", "image/jpeg", None)
+        handler.receive_data_chunk(b"12345", 0)
+        self.assertIsNone(handler.file_complete(5))
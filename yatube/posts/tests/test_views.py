@@ -1,5 +1,5 @@
 from django import forms
-from django.test import Client, TestCase
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from django.core.cache import cache
 
@@ -206,6 +206,57 @@ class PaginatorViewsTest(TestCase):
                 ),
 
 
+@override_settings(POSTS_CURSOR_PAGINATION=True)
+class CursorPaginatorViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="CursorNoName")
+        cls.posts = Post.objects.bulk_create(
+            [
+                Post(text=f"Тестовый текст{i}", author=cls.user)
+                for i in range(13)
+            ]
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cursor_pages_walk_whole_feed(self):
+        """Курсоры ведут по всей ленте без пропусков и повторов."""
+        url = reverse("posts:profile", kwargs={"username": "CursorNoName"})
+        first_page = self.client.get(url).context["page_obj"]
+        self.assertEqual(len(first_page), 10)
+        self.assertFalse(first_page.has_previous())
+        second_page = self.client.get(
+            url, {"cursor": first_page.next_cursor}
+        ).context["page_obj"]
+        self.assertEqual(len(second_page), 3)
+        self.assertFalse(second_page.has_next())
+        walked = list(first_page) + list(second_page)
+        expected = list(
+            Post.objects.filter(author=self.user).order_by("-pub_date", "-pk")
+        )
+        self.assertEqual(walked, expected)
+        back_page = self.client.get(
+            url, {"cursor": second_page.previous_cursor}
+        ).context["page_obj"]
+        self.assertEqual(list(back_page), list(first_page))
+
+    def test_page_number_still_works(self):
+        """Ссылки ?page=N работают и при включённом курсоре."""
+        response = self.client.get(reverse("posts:index"), {"page": 2})
+        self.assertEqual(len(response.context["page_obj"]), 3)
+        self.assertEqual(response.context["page_obj"].number, 2)
+
+    def test_broken_cursor_returns_first_page(self):
+        """Неверный курсор отдаёт первую страницу."""
+        response = self.client.get(
+            reverse("posts:index"), {"cursor": "not-a-cursor"}
+        )
+        self.assertEqual(len(response.context["page_obj"]), 10)
+
+
 class FollowTests(TestCase):
     class FollowViewsTest(TestCase):
         @classmethod
@@ -0,0 +1,191 @@
+"""Превью картинок постов готовятся в фоне, а не при рендеринге.
+
+post_create и post_edit после сохранения ставят задачу в пул потоков;
+задача уходит в пул только после коммита транзакции, чтобы рабочий поток
+увидел новую картинку. Готовое превью записывается в Post.thumbnail,
+а до тех пор шаблоны показывают заглушку и никогда не трогают файлы.
+
+Из картинки режется набор вариантов одинаковой пропорции 960:339
+(обрезка по центру) шириной из POSTS_IMAGE_WIDTHS: в WebP, в AVIF, если
+Pillow его умеет, и в JPEG для старых браузеров. Файлы называются по хешу
+содержимого, поэтому их можно отдавать с вечным кешированием, а
+одинаковые варианты хранятся один раз. Список вариантов хранится
+в Post.image_variants, в Post.thumbnail — JPEG для src по умолчанию.
+Посты с одной и той же картинкой получают готовые варианты друг друга.
+"""
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from PIL import Image, ImageOps, features
+
+from core import media
+from core.storage import content_name
+
+from . import feed_cache
+from .models import Post
+
+ASPECT = 339 / 960
+FALLBACK_WIDTH = 960
+
+# MIME-тип: (формат Pillow, расширение, параметры сохранения).
+FORMATS = {
+    "image/avif": ("AVIF", "avif", {"quality": 60}),
+    "image/webp": ("WEBP", "webp", {"quality": 80, "method": 6}),
+    "image/jpeg": ("JPEG", "jpg", {"quality": 85, "optimize": True}),
+}
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.POSTS_THUMBNAIL_WORKERS,
+                thread_name_prefix="thumbnails",
+            )
+        return _executor
+
+
+def output_formats():
+    """Форматы вариантов: JPEG всегда, AVIF — если Pillow собран с ним."""
+    return [
+        mime for mime in FORMATS
+        if mime != "image/avif" or features.check("avif")
+    ]
+
+
+def variant_widths(source_width):
+    """Ширины вариантов: крупнее исходной картинки не растягиваем.
+
+    Картинка уже самой узкой ширины даёт один вариант своей ширины.
+    """
+    widths = sorted(settings.POSTS_IMAGE_WIDTHS)
+    return [
+        width for width in widths if width <= source_width
+    ] or [min(widths[0], source_width)]
+
+
+def _save(image, mime):
+    image_format, extension, options = FORMATS[mime]
+    data = BytesIO()
+    image.save(data, image_format, **options)
+    content = ContentFile(data.getvalue())
+    name = content_name(f"cache/posts/variant.{extension}", content)
+    # Имя зависит только от содержимого: такой файл уже тот же самый.
+    if not default_storage.exists(name):
+        name = default_storage.save(name, content)
+    return name
+
+
+def render(image_name):
+    """Режет варианты картинки и возвращает {mime: [[ширина, файл]]}."""
+    with default_storage.open(image_name) as source:
+        image = ImageOps.exif_transpose(Image.open(source)).convert("RGB")
+    variants = {mime: [] for mime in output_formats()}
+    for width in variant_widths(image.width):
+        size = (width, round(width * ASPECT))
+        resized = ImageOps.fit(image, size, Image.LANCZOS)
+        for mime, files in variants.items():
+            files.append([width, _save(resized, mime)])
+    return variants
+
+
+def parse_variants(value):
+    """Post.image_variants как словарь или None, если вариантов нет."""
+    try:
+        variants = json.loads(value)
+    except ValueError:
+        return None
+    if not isinstance(variants, dict) or "image/jpeg" not in variants:
+        return None
+    return variants
+
+
+def variant_files(variants):
+    if not variants:
+        return []
+    return [name for files in variants.values() for _, name in files]
+
+
+def post_files(image, image_variants):
+    """Все файлы хранилища, на которые ссылается пост."""
+    return [image, *variant_files(parse_variants(image_variants))]
+
+
+def _shared_variants(post):
+    donor = Post.objects.filter(image=post.image.name).exclude(
+        pk=post.pk
+    ).exclude(image_variants="").values_list(
+        "image_variants", flat=True
+    ).first()
+    return parse_variants(donor) if donor else None
+
+
+def fallback(variants):
+    """JPEG-вариант для src: самый широкий, но не шире FALLBACK_WIDTH."""
+    jpeg = variants["image/jpeg"]
+    suitable = [item for item in jpeg if item[0] <= FALLBACK_WIDTH]
+    return (suitable or jpeg)[-1][1]
+
+
+def build(post_id):
+    """Готовит варианты картинки поста и сбрасывает кеш лент с ним.
+
+    Возвращает True, если варианты записаны. Если картинку успели
+    заменить, пока шло построение, результат отбрасывается: новые
+    варианты поставит в очередь следующее сохранение.
+    """
+    post = Post.objects.only(
+        "image", "image_variants", "author_id", "group_id"
+    ).filter(pk=post_id).first()
+    if post is None or not post.image:
+        return False
+    variants = _shared_variants(post) or render(post.image.name)
+    with transaction.atomic():
+        updated = Post.objects.filter(
+            pk=post_id, image=post.image.name
+        ).update(
+            thumbnail=fallback(variants),
+            image_variants=json.dumps(variants),
+        )
+        if not updated:
+            return False
+        media.release(
+            *variant_files(parse_variants(post.image_variants))
+        )
+        media.acquire(*variant_files(variants))
+    feed_cache.bump(*feed_cache.feeds_for_post(post))
+    return True
+
+
+def _run(post_id):
+    try:
+        build(post_id)
+    except Exception:
+        logger.exception("Не удалось построить превью поста %s", post_id)
+    finally:
+        # Соединения рабочего потока сами не закрываются.
+        connections.close_all()
+
+
+def schedule(post):
+    """Ставит построение превью в очередь, если у поста есть картинка."""
+    if not post.image:
+        return
+    if settings.POSTS_THUMBNAIL_SYNC:
+        build(post.pk)
+        return
+    post_id = post.pk
+    transaction.on_commit(lambda: _get_executor().submit(_run, post_id))
@@ -0,0 +1,122 @@
+"""Лента подписок, собираемая при записи (fan-out on write).
+
+Новый пост сразу раскладывается по лентам подписчиков автора, поэтому
+follow_index читает готовый список вместо соединения Follow и Post.
+Авторы, у которых подписчиков больше POSTS_FANOUT_MAX_FOLLOWERS, в ленты
+не раскладываются: их посты подмешиваются при чтении (fan-out on read).
+
+Режим автора не хранится, а считается по текущему числу подписчиков.
+Когда после отписки их снова становится POSTS_FANOUT_MAX_FOLLOWERS,
+посты автора перестают подмешиваться при чтении, поэтому его последние
+посты раскладываются по лентам всех оставшихся подписчиков.
+"""
+from django.conf import settings
+from django.db.models import Count, Q
+
+from .models import Follow, Post, TimelineEntry
+
+
+def is_fanout_author(author_id):
+    """Раскладываются ли посты автора по лентам подписчиков."""
+    followers = Follow.objects.filter(author_id=author_id).count()
+    return followers <= settings.POSTS_FANOUT_MAX_FOLLOWERS
+
+
+def _recent_posts(author_id):
+    return list(
+        Post.objects.filter(author_id=author_id).order_by(
+            "-pub_date"
+        ).values_list("pk", "pub_date")[:settings.POSTS_TIMELINE_BACKFILL]
+    )
+
+
+def push_post(post):
+    """Добавляет новый пост в ленты всех подписчиков автора."""
+    if not is_fanout_author(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list("user_id", flat=True)
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+            for user_id in followers.iterator()
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def backfill(user_id, author_id):
+    """Заполняет ленту последними постами автора после подписки."""
+    if not is_fanout_author(author_id):
+        return
+    posts = _recent_posts(author_id)
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+            for pk, pub_date in posts
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def backfill_followers(author_id):
+    """Раскладывает последние посты автора по лентам всех подписчиков."""
+    posts = _recent_posts(author_id)
+    if not posts:
+        return
+    followers = Follow.objects.filter(
+        author_id=author_id
+    ).values_list("user_id", flat=True)
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+            for user_id in followers.iterator()
+            for pk, pub_date in posts
+        ),
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+def prune(user_id, author_id):
+    """Убирает из ленты посты автора после отписки."""
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def unfollowed(user_id, author_id):
+    """Чистит ленту после отписки; при спуске до порога — fan-out."""
+    prune(user_id, author_id)
+    followers = Follow.objects.filter(author_id=author_id).count()
+    if followers == settings.POSTS_FANOUT_MAX_FOLLOWERS:
+        # Пока подписчиков было больше порога, посты автора в ленты не
+        # попадали и брались при чтении; теперь чтение их не подмешивает.
+        backfill_followers(author_id)
+
+
+def read_time_authors(user_id):
+    """Авторы из подписок пользователя, чьи посты читаются при запросе."""
+    followed = Follow.objects.filter(user_id=user_id).values("author_id")
+    return list(
+        Follow.objects.filter(author_id__in=followed)
+        .order_by()
+        .values("author_id")
+        .annotate(followers=Count("pk"))
+        .filter(followers__gt=settings.POSTS_FANOUT_MAX_FOLLOWERS)
+        .values_list("author_id", flat=True)
+    )
+
+
+def timeline_posts(user):
+    """Посты ленты подписок пользователя, от новых к старым."""
+    authors = read_time_authors(user.pk)
+    if not authors:
+        return Post.objects.filter(timeline_entries__user=user).order_by(
+            "-timeline_entries__pub_date", "-timeline_entries__id"
+        )
+    entries = TimelineEntry.objects.filter(user=user).values("post_id")
+    return Post.objects.filter(
+        Q(pk__in=entries) | Q(author_id__in=authors)
+    ).order_by("-pub_date", "-pk")
@@ -0,0 +1,309 @@
+"""Перенос постов между базами: NDJSON и tar с картинками.
+
+export_rows() потоком пишет пользователей, сообщества, посты,
+комментарии и подписки — по одной JSON-записи в строке, в этом
+порядке, — а export_images() складывает файлы картинок постов в tar.
+Обе функции читают базу через iterator() и не держат выгрузку в памяти.
+
+Importer загружает такую выгрузку в базу, где уже могут быть данные:
+
+* пользователи сопоставляются по username, недостающие создаются
+  без пароля; сообщества — по slug;
+* посты и комментарии получают id выгрузки, сдвинутые на максимальный
+  id в базе, поэтому ссылки на них пересчитываются без таблиц
+  соответствия, а в пустую базу id переносятся как есть;
+* записи вставляются пакетами bulk_create по batch_size строк, каждый
+  пакет — в своей транзакции.
+
+bulk_create не отправляет сигналов, поэтому ленты, счётчики, поиск
+и ссылки на файлы не обновляются на каждую строку: finish() делает всё
+это один раз после загрузки. Превью картинок не переносятся, их строит
+``manage.py build_thumbnails``.
+"""
+import json
+import tarfile
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils.dateparse import parse_datetime
+
+from core import media
+
+from . import counters, feed_cache, search, timeline
+from .models import Comment, Follow, Group, Post, User
+
+# Что выгружается и в каком порядке: записи ссылаются только на
+# записи из предыдущих разделов.
+EXPORTS = (
+    ("user", User.objects.order_by("pk"), ("pk", "username")),
+    (
+        "group",
+        Group.objects.order_by("pk"),
+        ("pk", "title", "slug", "description"),
+    ),
+    (
+        "post",
+        Post.objects.order_by("pk"),
+        ("pk", "text", "pub_date", "created", "author", "group", "image"),
+    ),
+    (
+        "comment",
+        Comment.objects.order_by("pk"),
+        ("pk", "text", "created", "post", "author", "parent"),
+    ),
+    ("follow", Follow.objects.order_by("pk"), ("user", "author")),
+)
+
+
+def _dump(value):
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+def export_rows(stream, chunk_size=2000):
+    """Пишет выгрузку в текстовый поток; возвращает Counter строк."""
+    rows = Counter()
+    for model, queryset, fields in EXPORTS:
+        values = queryset.values_list(*fields).iterator(chunk_size)
+        for row in values:
+            record = {"model": model}
+            record.update(zip(fields, map(_dump, row)))
+            stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+            rows[model] += 1
+    return rows
+
+
+def export_images(path):
+    """Складывает картинки постов в tar; возвращает (файлов, пропущено)."""
+    names = Post.objects.exclude(image="").order_by("image").values_list(
+        "image", flat=True
+    ).distinct()
+    packed = missing = 0
+    with tarfile.open(path, "w|") as archive:
+        for name in names.iterator():
+            if not default_storage.exists(name):
+                missing += 1
+                continue
+            info = tarfile.TarInfo(name)
+            info.size = default_storage.size(name)
+            with default_storage.open(name) as content:
+                archive.addfile(info, content)
+            packed += 1
+    return packed, missing
+
+
+def read_rows(stream):
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+@contextmanager
+def keep_dates():
+    """Даёт bulk_create записать даты из выгрузки вместо текущей."""
+    fields = [
+        Post._meta.get_field("pub_date"),
+        Post._meta.get_field("created"),
+        Comment._meta.get_field("created"),
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+@contextmanager
+def without_indexes(*models):
+    """Снимает индексы из Meta.indexes моделей и строит их заново в конце.
+
+    Уникальные ограничения и индексы внешних ключей остаются. Пока
+    индексов нет, ленты сайта читаются полным просмотром таблицы, поэтому
+    так стоит загружать только в базу, которая ещё не обслуживает сайт.
+    """
+    indexes = [
+        (model, index) for model in models for index in model._meta.indexes
+    ]
+    with connection.schema_editor() as editor:
+        for model, index in indexes:
+            editor.remove_index(model, index)
+    try:
+        yield
+    finally:
+        with connection.schema_editor() as editor:
+            for model, index in indexes:
+                editor.add_index(model, index)
+
+
+def _max_pk(model):
+    return model.objects.aggregate(last=Max("pk"))["last"] or 0
+
+
+class Importer:
+    """Загружает выгрузку export_rows() и картинки export_images()."""
+
+    def __init__(self, batch_size=1000):
+        self.batch_size = batch_size
+        self.post_offset = _max_pk(Post)
+        self.comment_offset = _max_pk(Comment)
+        self.users = {}
+        self.groups = {}
+        self.images = {}
+        self.image_references = Counter()
+        self.authors = set()
+        self.touched_groups = set()
+        self.rows = Counter()
+        self.seconds = Counter()
+
+    def load_images(self, path):
+        """Сохраняет картинки из tar; возвращает число файлов."""
+        with tarfile.open(path, "r|*") as archive:
+            for member in archive:
+                if not member.isfile():
+                    continue
+                content = ContentFile(archive.extractfile(member).read())
+                # Хранилище само не пишет файл, который у него уже есть,
+                # и может выдать другое имя: посты получат его.
+                self.images[member.name] = default_storage.save(
+                    member.name, content
+                )
+        return len(self.images)
+
+    def load(self, records):
+        """Загружает записи пакетами; модели идут подряд, как в выгрузке."""
+        batch, model = [], None
+        for record in records:
+            if record["model"] != model or len(batch) >= self.batch_size:
+                self._write(model, batch)
+                batch, model = [], record["model"]
+            batch.append(record)
+        self._write(model, batch)
+
+    def _write(self, model, batch):
+        if not batch:
+            return
+        started = time.monotonic()
+        with transaction.atomic(), keep_dates():
+            getattr(self, f"_load_{model}")(batch)
+        self.seconds[model] += time.monotonic() - started
+        self.rows[model] += len(batch)
+
+    def _load_user(self, batch):
+        usernames = {record["username"]: record["pk"] for record in batch}
+        existing = dict(
+            User.objects.filter(username__in=usernames).values_list(
+                "username", "pk"
+            )
+        )
+        User.objects.bulk_create(
+            User(username=username, password=make_password(None))
+            for username in usernames
+            if username not in existing
+        )
+        for username, pk in User.objects.filter(
+            username__in=usernames
+        ).values_list("username", "pk"):
+            self.users[usernames[username]] = pk
+
+    def _load_group(self, batch):
+        slugs = {record["slug"]: record for record in batch}
+        existing = set(
+            Group.objects.filter(slug__in=slugs).values_list(
+                "slug", flat=True
+            )
+        )
+        Group.objects.bulk_create(
+            Group(
+                title=record["title"],
+                slug=slug,
+                description=record["description"],
+            )
+            for slug, record in slugs.items()
+            if slug not in existing
+        )
+        for slug, pk in Group.objects.filter(slug__in=slugs).values_list(
+            "slug", "pk"
+        ):
+            self.groups[slugs[slug]["pk"]] = pk
+
+    def _load_post(self, batch):
+        posts = []
+        for record in batch:
+            image = self.images.get(record["image"], record["image"])
+            post = Post(
+                pk=record["pk"] + self.post_offset,
+                text=record["text"],
+                pub_date=parse_datetime(record["pub_date"]),
+                created=parse_datetime(record["created"]),
+                author_id=self.users[record["author"]],
+                group_id=self.groups.get(record["group"]),
+                image=image,
+            )
+            posts.append(post)
+            self.authors.add(post.author_id)
+            if post.group_id is not None:
+                self.touched_groups.add(post.group_id)
+            if image:
+                self.image_references[image] += 1
+        Post.objects.bulk_create(posts)
+
+    def _load_comment(self, batch):
+        Comment.objects.bulk_create(
+            Comment(
+                pk=record["pk"] + self.comment_offset,
+                text=record["text"],
+                created=parse_datetime(record["created"]),
+                post_id=record["post"] + self.post_offset,
+                author_id=self.users[record["author"]],
+                parent_id=(
+                    None if record["parent"] is None
+                    else record["parent"] + self.comment_offset
+                ),
+            )
+            for record in batch
+        )
+
+    def _load_follow(self, batch):
+        follows = [
+            Follow(
+                user_id=self.users[record["user"]],
+                author_id=self.users[record["author"]],
+            )
+            for record in batch
+        ]
+        self.authors.update(follow.author_id for follow in follows)
+        Follow.objects.bulk_create(follows, ignore_conflicts=True)
+
+    def finish(self):
+        """Делает за сигналы то, что они сделали бы для каждой строки."""
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), [Post, Comment]
+        )
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+        media.acquire_counts(self.image_references)
+        counters.recount_all()
+        search.rebuild_index()
+        authors = sorted(self.authors)
+        for start in range(0, len(authors), self.batch_size):
+            follows = Follow.objects.filter(
+                author_id__in=authors[start:start + self.batch_size]
+            ).values_list("user_id", "author_id")
+            for user_id, author_id in follows.iterator():
+                timeline.backfill(user_id, author_id)
+        feed_cache.bump(
+            feed_cache.GLOBAL_FEED,
+            *map(feed_cache.group_feed, self.touched_groups),
+            *map(feed_cache.author_feed, self.authors),
+        )
@@ -0,0 +1,161 @@
+"""Приём картинок постов с ограничениями по памяти.
+
+* SizeLimitUploadHandler стоит первым в FILE_UPLOAD_HANDLERS и перестаёт
+  принимать файл, как только он превысил POSTS_IMAGE_MAX_BYTES: остаток
+  запроса вычитывается, но никуда не пишется.
+* inspect() проверяет формат и размеры по заголовку файла, не декодируя
+  пиксели.
+* normalize() убирает EXIF и уменьшает слишком большие оригиналы. Декодов
+  одновременно идёт не больше POSTS_IMAGE_DECODE_SLOTS, а JPEG сразу
+  декодируется в уменьшенном масштабе, так что память на один декод
+  ограничена POSTS_IMAGE_MAX_PIXELS.
+"""
+import os
+import threading
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile, UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from PIL import Image, ImageOps
+
+ALLOWED_FORMATS = {"JPEG", "PNG", "GIF", "WEBP"}
+
+SAVE_OPTIONS = {
+    "JPEG": {"quality": 90, "optimize": True},
+    "PNG": {"optimize": True},
+    "GIF": {},
+    "WEBP": {"quality": 90},
+}
+
+_decode_slots = None
+_decode_slots_lock = threading.Lock()
+
+
+def _get_decode_slots():
+    global _decode_slots
+    with _decode_slots_lock:
+        if _decode_slots is None:
+            _decode_slots = threading.BoundedSemaphore(
+                settings.POSTS_IMAGE_DECODE_SLOTS
+            )
+        return _decode_slots
+
+
+class OversizedUpload(UploadedFile):
+    """Файл, который не дочитали: известны только имя и размер."""
+
+    def __init__(self, name, content_type, size):
+        super().__init__(BytesIO(), name, content_type, size)
+
+
+class SizeLimitUploadHandler(FileUploadHandler):
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.POSTS_IMAGE_MAX_BYTES:
+            # Следующие обработчики этот кусок уже не получат.
+            return None
+        return raw_data
+
+    def file_complete(self, file_size):
+        if self.received <= settings.POSTS_IMAGE_MAX_BYTES:
+            return None
+        return OversizedUpload(
+            self.file_name, self.content_type, self.received
+        )
+
+
+class ImageRejected(ValueError):
+    """Картинка не подходит; текст исключения показывается в форме."""
+
+
+def _source(upload):
+    if hasattr(upload, "temporary_file_path"):
+        return upload.temporary_file_path()
+    upload.seek(0)
+    return upload
+
+
+def inspect(upload):
+    """Открывает картинку по заголовку и проверяет формат и размеры."""
+    if upload.size > settings.POSTS_IMAGE_MAX_BYTES:
+        raise ImageRejected(
+            "Файл больше {} МБ.".format(
+                settings.POSTS_IMAGE_MAX_BYTES // 2 ** 20
+            )
+        )
+    try:
+        # open() читает только заголовок, пиксели не декодируются.
+        image = Image.open(_source(upload))
+    except Image.DecompressionBombError:
+        image = None
+    except Exception as exc:
+        raise ImageRejected(
+            "Загрузите правильное изображение."
+        ) from exc
+    if image is None or image.width * image.height > (
+        settings.POSTS_IMAGE_MAX_PIXELS
+    ):
+        raise ImageRejected(
+            "Изображение больше {} мегапикселей.".format(
+                settings.POSTS_IMAGE_MAX_PIXELS // 10 ** 6
+            )
+        )
+    if image.format not in ALLOWED_FORMATS:
+        raise ImageRejected(
+            "Поддерживаются только JPEG, PNG, GIF и WebP."
+        )
+    return image
+
+
+def _needs_rewrite(image):
+    max_side = settings.POSTS_IMAGE_MAX_SIDE
+    if max(image.size) > max_side:
+        return True
+    # GIF без уменьшения не перекодируем, чтобы не потерять анимацию;
+    # EXIF в нём не бывает.
+    return image.format != "GIF"
+
+
+def _rewrite(source, image_format, max_side):
+    image = Image.open(source)
+    # Для JPEG декодер сразу уменьшает картинку в 2-8 раз.
+    image.draft("RGB", (max_side, max_side))
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((max_side, max_side), Image.LANCZOS)
+    if image_format == "JPEG" and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    data = BytesIO()
+    # Метаданные не передаём, поэтому EXIF в файл не попадает.
+    image.save(data, image_format, **SAVE_OPTIONS[image_format])
+    return data
+
+
+def normalize(upload, image):
+    """Возвращает картинку без EXIF и не больше POSTS_IMAGE_MAX_SIDE.
+
+    image — результат inspect() для этого же файла. Заголовок уже
+    проверен, но сами пиксели могут оказаться битыми или обрезанными:
+    тогда декод бросает ImageRejected.
+    """
+    if not _needs_rewrite(image):
+        upload.seek(0)
+        return upload
+    image_format = image.format
+    max_side = settings.POSTS_IMAGE_MAX_SIDE
+    with _get_decode_slots():
+        try:
+            data = _rewrite(_source(upload), image_format, max_side)
+        except (OSError, SyntaxError, Image.DecompressionBombError) as exc:
+            raise ImageRejected(
+                "Загрузите правильное изображение."
+            ) from exc
+    return SimpleUploadedFile(
+        os.path.basename(upload.name),
+        data.getvalue(),
+        content_type=Image.MIME.get(image_format),
+    )
@@ -1,6 +1,6 @@
 from django.urls import path
 
-from . import views
+from . import syndication, views
 
 app_name = "posts"
 
@@ -15,6 +15,11 @@ urlpatterns = [
         views.add_comment,
         name='add_comment'
     ),
+    path(
+        'posts/<int:post_id>/comments/',
+        views.comment_list,
+        name='comment_list'
+    ),
     path('follow/', views.follow_index, name='follow_index'),
     path(
         'profile/<str:username>/follow/',
@@ -26,5 +31,17 @@ urlpatterns = [
         views.profile_unfollow,
         name='profile_unfollow'
     ),
+    path('search/', views.search, name='search'),
+    path('feeds/<str:fmt>/', syndication.index_feed, name='index_feed'),
+    path(
+        'group/<slug:slug>/feeds/<str:fmt>/',
+        syndication.group_feed,
+        name='group_feed'
+    ),
+    path(
+        'profile/<str:username>/feeds/<str:fmt>/',
+        syndication.author_feed,
+        name='author_feed'
+    ),
     path('', views.index, name='index'),
 ]
@@ -1,33 +1,68 @@
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.db.models import QuerySet
+from django.http import Http404, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
+from django.utils.http import urlencode
+from django.views.decorators.http import condition
 
+from . import comments, etags, feed_cache, ingest, thumbnails
+from .counters import get_stats
 from .forms import CommentForm, PostForm
 from .models import Follow, Group, Post, User
+from .paginators import CursorPaginator
+from .search import search_posts
+from .timeline import timeline_posts
 
 NUMBER_POSTS: int = 10
 
 
-def paginator_func(posts, request):
+def paginator_func(posts, request, feed=None):
+    """Страница ленты; если лента названа, список id страницы кешируется."""
+    if feed is None:
+        return _paginate(posts, request)
+    version = feed_cache.get_version(feed)
+    page_obj = feed_cache.get_page(
+        feed, version, request, posts, NUMBER_POSTS
+    )
+    if page_obj is None:
+        page_obj = _paginate(posts, request)
+        feed_cache.set_page(feed, version, request, page_obj)
+    return page_obj
+
+
+def _paginate(posts, request):
+    cursor = request.GET.get("cursor")
+    # Старые ссылки вида ?page=N продолжают работать в любом режиме,
+    # а выдачу поиска, упорядоченную по рангу, листаем только по номеру.
+    if isinstance(posts, QuerySet) and (cursor is not None or (
+        settings.POSTS_CURSOR_PAGINATION and "page" not in request.GET
+    )):
+        return CursorPaginator(posts, NUMBER_POSTS).get_page(cursor)
     paginator = Paginator(posts, NUMBER_POSTS)
     page_number = request.GET.get("page")
     return paginator.get_page(page_number)
 
 
+@condition(etag_func=etags.index_etag)
 def index(request):
-    posts = Post.objects.all()
-    page_obj = paginator_func(posts, request)
+    posts = Post.objects.for_feed()
+    page_obj = paginator_func(posts, request, feed_cache.GLOBAL_FEED)
     context = {
         "page_obj": page_obj,
     }
     return render(request, "posts/index.html", context)
 
 
+@condition(etag_func=etags.group_etag)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
-    page_obj = paginator_func(posts, request)
+    posts = group.posts.for_feed()
+    page_obj = paginator_func(
+        posts, request, feed_cache.group_feed(group.pk)
+    )
     context = {
         "group": group,
         "page_obj": page_obj,
@@ -36,34 +71,74 @@ def group_posts(request, slug):
     return render(request, "posts/group_list.html", context)
 
 
+@condition(etag_func=etags.profile_etag)
 def profile(request, username):
     author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
-    page_obj = paginator_func(posts, request)
-    following = Follow.objects.filter(author__username=username).count()
+    posts = author.posts.for_feed()
+    page_obj = paginator_func(
+        posts, request, feed_cache.author_feed(author.pk)
+    )
+    stats = get_stats(author)
+    following = request.user.is_authenticated and Follow.objects.filter(
+        user=request.user, author=author
+    ).exists()
     context = {
         "author": author,
         "page_obj": page_obj,
-        "posts_count": author.posts.count(),
+        "posts_count": stats.posts_count,
+        "followers_count": stats.followers_count,
         "following": following,
     }
     return render(request, "posts/profile.html", context)
 
 
+@condition(etag_func=etags.post_detail_etag)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(
+        Post.objects.for_feed().select_related("author__stats"),
+        pk=post_id,
+    )
     form = CommentForm(request.POST or None)
-    comments = post.comments.all()
     context = {
         "post": post,
         "author": post.author,
-        "posts_count": post.author.posts.count(),
-        "comments": comments,
+        "posts_count": get_stats(post.author).posts_count,
+        "comments": comments.comment_page(post.pk, request),
+        "pending_comments": ingest.pending_comments(post.pk, request.user),
         "form": form,
     }
     return render(request, "posts/post_detail.html", context)
 
 
+def comment_list(request, post_id):
+    """Следующая порция комментариев: HTML-фрагмент или ?format=json."""
+    if not Post.objects.filter(pk=post_id).exists():
+        raise Http404("Пост не найден")
+    parent_id = comments.get_parent_id(request)
+    page = comments.comment_page(post_id, request, parent_id)
+    if request.GET.get("format") == "json":
+        return JsonResponse({
+            "results": [comments.serialize(comment) for comment in page],
+            "next": page.next_url,
+        })
+    context = {
+        "post_id": post_id,
+        "comments": page,
+    }
+    return render(request, "posts/includes/comments.html", context)
+
+
+def search(request):
+    query = request.GET.get("q", "").strip()
+    page_obj = paginator_func(search_posts(query), request)
+    context = {
+        "query": query,
+        "page_obj": page_obj,
+        "page_query": urlencode({"q": query}) + "&",
+    }
+    return render(request, "posts/search.html", context)
+
+
 @login_required
 def post_create(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
@@ -76,6 +151,7 @@ def post_create(request):
     new_post = form.save(commit=False)
     new_post.author = request.user
     new_post.save()
+    thumbnails.schedule(new_post)
     return redirect("posts:profile", request.user)
 
 
@@ -88,7 +164,14 @@ def post_edit(request, post_id):
         )
         if form.is_valid():
             post = form.save(commit=False)
+            image_changed = "image" in form.changed_data
+            if image_changed:
+                # Старые варианты не подходят к новой картинке.
+                post.thumbnail = ""
+                post.image_variants = ""
             post = form.save()
+            if image_changed:
+                thumbnails.schedule(post)
             return redirect("posts:post_detail", post.id)
         context = {
             "form": form,
@@ -108,13 +191,20 @@ def add_comment(request, post_id):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        comment.parent_id = comments.resolve_parent(
+            post.pk, request.POST.get("parent")
+        )
+        buffer = ingest.get_buffer()
+        if buffer is None:
+            comment.save()
+        else:
+            buffer.add(comment)
     return redirect("posts:post_detail", post_id=post_id)
 
 
 @login_required
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
+    post_list = timeline_posts(request.user).for_feed()
     page_obj = paginator_func(post_list, request)
     context = {
         "page_obj": page_obj
@@ -125,10 +215,11 @@ def follow_index(request):
 @login_required
 def profile_follow(request, username):
     user = request.user
-    author = User.objects.get(username=username)
-    is_follower = Follow.objects.filter(user=user, author=author)
-    if user != author and not is_follower.exists():
-        Follow.objects.create(user=user, author=author)
+    author = get_object_or_404(User, username=username)
+    if user != author:
+        # Уникальность (user, author) держит база, get_or_create
+        # переживает гонку двух одновременных подписок.
+        Follow.objects.get_or_create(user=user, author=author)
     return redirect(reverse("posts:profile", args=[username]))
 
 
@@ -0,0 +1,32 @@
+"""
+ASGI config for yatube project.
+
+It exposes the ASGI callable as a module-level variable named
+``application``, for example for ``uvicorn yatube.asgi:application``.
+
+Django 2.2 has no ASGI support of its own: /events/ is served by the
+Server-Sent Events app (posts.sse), everything else by core.asgi, which
+runs Django's middleware in a thread pool and the read-only pages from
+posts.async_views on the event loop.
+"""
+
+import os
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "yatube.settings")
+django.setup()
+
+from core.asgi import ASGIHandler  # noqa: E402
+from posts import sse  # noqa: E402
+
+django_application = ASGIHandler()
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await sse.application(scope, receive, send)
+    elif scope["type"] == "http" and scope["path"].startswith("/events/"):
+        await sse.application(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
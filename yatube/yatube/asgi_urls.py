@@ -0,0 +1,14 @@
+"""Адреса для запросов через yatube/asgi.py.
+
+Страницы из posts.async_views идут первыми, остальное разрешается
+так же, как в yatube.urls.
+"""
+from posts import async_views
+
+from . import urls
+
+handler403 = urls.handler403
+handler404 = urls.handler404
+handler500 = urls.handler500
+
+urlpatterns = async_views.urlpatterns + urls.urlpatterns
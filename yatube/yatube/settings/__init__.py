@@ -0,0 +1,22 @@
+"""Настройки проекта: профиль выбирает переменная окружения DJANGO_ENV.
+
+* dev (по умолчанию) — отладка, debug_toolbar, шаблоны без кеша;
+* prod — без отладки, постоянные соединения с базой и настроенный
+  SQLite (WAL, synchronous=NORMAL, кеш страниц и mmap).
+
+Общая часть — в base.py.
+"""
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+DJANGO_ENV = os.getenv("DJANGO_ENV", "dev")
+
+if DJANGO_ENV == "dev":
+    from .dev import *  # noqa: F401,F403
+elif DJANGO_ENV == "prod":
+    from .prod import *  # noqa: F401,F403
+else:
+    raise ImproperlyConfigured(
+        f"Неизвестный DJANGO_ENV={DJANGO_ENV!r}: ожидается dev или prod."
+    )
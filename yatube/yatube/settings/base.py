@@ -0,0 +1,382 @@
+"""
+Django settings for yatube project: common part of the dev and prod
+profiles, see yatube/settings/__init__.py.
+
+Generated by 'django-admin startproject' using Django 2.2.19.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/2.2/topics/settings/
+
+For the full list of settings and their values, see
+https://docs.djangoproject.com/en/2.2/ref/settings/
+"""
+
+import os
+
+# Build paths inside the project like this: os.path.join(BASE_DIR, ...)
+BASE_DIR = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+
+
+# See https://docs.djangoproject.com/en/2.2/howto/deployment/checklist/
+
+# SECURITY WARNING: keep the secret key used in production secret!
+SECRET_KEY = os.getenv("SECRET_KEY", "")
+
+# SECURITY WARNING: don't run with debug turned on in production!
+DEBUG = False
+
+ALLOWED_HOSTS = [
+    host for host in os.getenv("ALLOWED_HOSTS", "").split(",") if host
+]
+
+# Application definition
+
+INSTALLED_APPS = [
+    "django.contrib.admin",
+    "django.contrib.auth",
+    "django.contrib.contenttypes",
+    "django.contrib.sessions",
+    "django.contrib.messages",
+    "django.contrib.staticfiles",
+
+    "posts.apps.PostsConfig",
+    "users.apps.UsersConfig",
+    "core.apps.CoreConfig",
+    "about.apps.AboutConfig",
+    "api.apps.ApiConfig",
+    "sorl.thumbnail",
+]
+
+MIDDLEWARE = [
+    "core.monitoring.MetricsMiddleware",
+    "django.middleware.security.SecurityMiddleware",
+    "django.contrib.sessions.middleware.SessionMiddleware",
+    "django.middleware.common.CommonMiddleware",
+    "django.middleware.csrf.CsrfViewMiddleware",
+    "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "django.contrib.messages.middleware.MessageMiddleware",
+    "django.middleware.clickjacking.XFrameOptionsMiddleware",
+]
+
+ROOT_URLCONF = "yatube.urls"
+TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
+
+
+def template_loaders(cached):
+    """Загрузчики шаблонов; cached — разбирать каждый шаблон один раз."""
+    loaders = [
+        "django.template.loaders.filesystem.Loader",
+        "django.template.loaders.app_directories.Loader",
+    ]
+    if cached:
+        return [("django.template.loaders.cached.Loader", loaders)]
+    return loaders
+
+
+# Разобранные шаблоны хранятся в памяти процесса (cached.Loader), правки
+# шаблонов видны только после перезапуска. По умолчанию кеш выключен
+# только в профиле dev; TEMPLATES_CACHED=1 или 0 задаёт режим явно.
+TEMPLATES_CACHED = os.getenv("TEMPLATES_CACHED", "1") == "1"
+
+TEMPLATES = [
+    {
+        "BACKEND": "core.monitoring.DjangoTemplates",
+        "NAME": "django",
+        "DIRS": [TEMPLATES_DIR],
+        "OPTIONS": {
+            "loaders": template_loaders(TEMPLATES_CACHED),
+            "context_processors": [
+                "django.template.context_processors.debug",
+                "django.template.context_processors.request",
+                "django.contrib.auth.context_processors.auth",
+                "django.contrib.messages.context_processors.messages",
+                "core.context_processors.year.year",
+            ],
+        },
+    },
+]
+
+WSGI_APPLICATION = "yatube.wsgi.application"
+
+TEST_RUNNER = "core.testing.DiscoverRunner"
+
+
+# Database
+# https://docs.djangoproject.com/en/2.2/ref/settings/#databases
+
+# SQLite по умолчанию или PostgreSQL: DB_ENGINE=django.db.backends.postgresql
+# и параметры подключения DB_NAME, POSTGRES_USER, POSTGRES_PASSWORD,
+# DB_HOST, DB_PORT (нужен пакет psycopg2). За pgbouncer в режиме
+# транзакций задайте DB_DISABLE_SERVER_SIDE_CURSORS=1: iterator() иначе
+# открывает серверные курсоры.
+DB_ENGINE = os.getenv("DB_ENGINE", "django.db.backends.sqlite3")
+
+if DB_ENGINE == "django.db.backends.sqlite3":
+    DATABASES = {
+        "default": {
+            "ENGINE": DB_ENGINE,
+            "NAME": os.getenv("DB_NAME", os.path.join(BASE_DIR, "db.sqlite3")),
+        }
+    }
+else:
+    DATABASES = {
+        "default": {
+            "ENGINE": DB_ENGINE,
+            "NAME": os.getenv("DB_NAME", "yatube"),
+            "USER": os.getenv("POSTGRES_USER", "postgres"),
+            "PASSWORD": os.getenv("POSTGRES_PASSWORD", ""),
+            "HOST": os.getenv("DB_HOST", "localhost"),
+            "PORT": os.getenv("DB_PORT", "5432"),
+            "DISABLE_SERVER_SIDE_CURSORS": (
+                os.getenv("DB_DISABLE_SERVER_SIDE_CURSORS", "0") == "1"
+            ),
+        }
+    }
+
+# PRAGMA, которые core.database выполняет на каждом новом соединении
+# с SQLite, например {"journal_mode": "WAL"}.
+SQLITE_PRAGMAS = {}
+
+
+# Password validation
+# https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
+
+AUTH_PASSWORD_VALIDATORS = [
+    {
+        "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
+    },
+    {
+        "NAME": "django.contrib.auth.password_validation.MinimumLengthValidator",
+    },
+    {
+        "NAME": "django.contrib.auth.password_validation.CommonPasswordValidator",
+    },
+    {
+        "NAME": "django.contrib.auth.password_validation.NumericPasswordValidator",
+    },
+]
+
+
+# Internationalization
+# https://docs.djangoproject.com/en/2.2/topics/i18n/
+
+LANGUAGE_CODE = "ru-ru"
+
+TIME_ZONE = "UTC"
+
+USE_I18N = True
+
+USE_L10N = True
+
+USE_TZ = True
+
+
+# Static files (CSS, JavaScript, Images)
+# https://docs.djangoproject.com/en/2.2/howto/static-files/
+
+STATIC_URL = "/static/"
+
+STATICFILES_DIRS = [
+    os.path.join(BASE_DIR, "static"),
+]
+
+MEDIA_URL = "/media/"
+MEDIA_ROOT = os.path.join(BASE_DIR, "media")
+
+# Файлы называются по хешу содержимого и хранятся в одном экземпляре.
+DEFAULT_FILE_STORAGE = "core.storage.ContentAddressedStorage"
+
+FILE_UPLOAD_HANDLERS = [
+    "posts.uploads.SizeLimitUploadHandler",
+    "django.core.files.uploadhandler.MemoryFileUploadHandler",
+    "django.core.files.uploadhandler.TemporaryFileUploadHandler",
+]
+
+CSRF_FAILURE_VIEW = "core.views.csrf_failure"
+
+# User authentication and authorisation
+
+LOGIN_URL = "users:login"
+
+LOGIN_REDIRECT_URL = "posts:index"
+
+
+#  подключаем движок filebased.EmailBackend
+
+EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
+
+EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
+
+
+# caches
+
+# Общий для всех воркеров кеш: redis://host:6379/0 или путь к файлу SQLite.
+# Без него каждый процесс держит свой LocMemCache.
+SHARED_CACHE_LOCATION = os.getenv("SHARED_CACHE_LOCATION", "")
+
+if SHARED_CACHE_LOCATION:
+    CACHES = {
+        "default": {
+            "BACKEND": "core.cache.backends.TieredCache",
+            "OPTIONS": {
+                "SHARED": "shared",
+                "LOCAL_TIMEOUT": 1,
+                "LOCAL_MAX_ENTRIES": 1000,
+            },
+        },
+        "shared": {
+            "BACKEND": (
+                "core.cache.backends.RedisCache"
+                if SHARED_CACHE_LOCATION.startswith(("redis://", "rediss://"))
+                else "core.cache.backends.SQLiteCache"
+            ),
+            "LOCATION": SHARED_CACHE_LOCATION,
+            "OPTIONS": {
+                "MAX_ENTRIES": 100000,
+            },
+        },
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "core.cache.backends.LocMemCache",
+        }
+    }
+
+
+# posts
+
+# Листать ленты по курсору (?cursor=) вместо номера страницы (?page=).
+POSTS_CURSOR_PAGINATION = False
+
+# Посты авторов с большим числом подписчиков не раскладываются по лентам,
+# а подмешиваются в ленту подписок при чтении.
+POSTS_FANOUT_MAX_FOLLOWERS = 1000
+
+# Сколько последних постов автора попадает в ленту сразу после подписки.
+POSTS_TIMELINE_BACKFILL = 1000
+
+# Сколько секунд живут страницы лент в кеше. Устаревшие страницы
+# отбрасываются сразу при изменении постов, поэтому срок может быть долгим.
+POSTS_FEED_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Конфигурация полнотекстового поиска PostgreSQL и предел выдачи поиска.
+POSTS_SEARCH_CONFIG = "russian"
+POSTS_SEARCH_MAX_RESULTS = 1000
+
+# Превью картинок строятся в фоне этим числом потоков. В режиме SYNC
+# (по умолчанию при отладке и в тестах) превью строится сразу при
+# сохранении, и фоновые потоки не переживают запрос.
+POSTS_THUMBNAIL_WORKERS = 2
+POSTS_THUMBNAIL_SYNC = False
+
+# Сколько комментариев показывать на странице поста и подгружать за раз.
+POSTS_COMMENTS_PER_PAGE = 20
+
+# Отложенная запись комментариев (posts.ingest): пусто — комментарий
+# сохраняется сразу; posts.ingest.CommentBuffer — буфер в памяти;
+# posts.ingest.DurableCommentBuffer — буфер с журналом в
+# POSTS_COMMENT_LOG_DIR. Буфер пишется пакетом по BATCH_SIZE штук или
+# раз в FLUSH_INTERVAL секунд.
+POSTS_COMMENT_BUFFER = os.getenv("POSTS_COMMENT_BUFFER") or None
+POSTS_COMMENT_BATCH_SIZE = 100
+POSTS_COMMENT_FLUSH_INTERVAL = 1
+POSTS_COMMENT_LOG_DIR = os.path.join(BASE_DIR, "comment_log")
+
+# Сколько последних постов попадает в ленты RSS, Atom и JSON Feed.
+POSTS_SYNDICATION_ITEMS = 20
+
+# Ширины вариантов картинки поста для srcset.
+POSTS_IMAGE_WIDTHS = [320, 640, 960, 1920]
+
+# Ограничения на загружаемые картинки: размер файла, число пикселей
+# и длинная сторона, до которой уменьшается оригинал. Одновременно
+# декодируется не больше POSTS_IMAGE_DECODE_SLOTS картинок.
+POSTS_IMAGE_MAX_BYTES = 10 * 2 ** 20
+POSTS_IMAGE_MAX_PIXELS = 40 * 10 ** 6
+POSTS_IMAGE_MAX_SIDE = 2560
+POSTS_IMAGE_DECODE_SLOTS = 2
+
+# Уведомления о новых постах (posts.events, posts.sse). Без адреса Redis
+# события ходят только внутри процесса; если сайт и потоки событий
+# работают в разных процессах, задайте redis://host:6379/0.
+# HEARTBEAT — секунды между пингами молчащего потока, RETRY — пауза
+# перед переподключением браузера.
+POSTS_EVENTS_LOCATION = os.getenv("POSTS_EVENTS_LOCATION", "")
+POSTS_EVENTS_BROKER = (
+    "posts.events.RedisBroker"
+    if POSTS_EVENTS_LOCATION
+    else "posts.events.LocalBroker"
+)
+POSTS_EVENTS_HEARTBEAT = 15
+POSTS_EVENTS_RETRY = 5
+
+
+# asgi
+
+# yatube/asgi.py: адреса с асинхронными страницами, число потоков для
+# синхронного стека Django и пул потоков для параллельных запросов
+# асинхронных страниц к базе и кешу. Асинхронная страница держит поток
+# ASGI_THREADS и до четырёх потоков ASYNC_DB_THREADS, у каждого своё
+# соединение: max_connections базы должен быть не меньше их суммы на
+# каждый процесс. По умолчанию пул вдвое больше ASGI_THREADS — половина
+# обработчиков может одновременно ждать параллельную выборку.
+ASGI_URLCONF = "yatube.asgi_urls"
+ASGI_THREADS = int(os.getenv("ASGI_THREADS", 20))
+ASYNC_DB_THREADS = int(os.getenv("ASYNC_DB_THREADS", 2 * ASGI_THREADS))
+
+
+# api
+
+# Размер страницы API по умолчанию и предел для ?limit=.
+API_PAGE_SIZE = 20
+API_MAX_PAGE_SIZE = 100
+
+
+# metrics
+
+# Метрики запросов (core.monitoring): /metrics для Prometheus отдаётся
+# по заголовку "Authorization: Bearer <METRICS_TOKEN>" или напрямую
+# с адресов METRICS_ALLOWED_IPS; пустой список никого не пускает. Запрос,
+# пришедший через прокси (X-Forwarded-For, X-Real-IP), пускается только
+# по токену: за локальным прокси REMOTE_ADDR у всех 127.0.0.1. Запрос
+# дольше METRICS_SLOW_REQUEST секунд пишется в лог с уровнем WARNING, а
+# для доли METRICS_CAPTURE_RATE запросов — вместе с текстом всех SQL.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+METRICS_ALLOWED_IPS = [
+    ip for ip in os.getenv("METRICS_ALLOWED_IPS", "127.0.0.1").split(",")
+    if ip
+]
+METRICS_SLOW_REQUEST = float(os.getenv("METRICS_SLOW_REQUEST", "1"))
+METRICS_CAPTURE_RATE = float(os.getenv("METRICS_CAPTURE_RATE", "0.01"))
+
+# Запрос одной формы, повторившийся за HTTP-запрос больше THRESHOLD раз,
+# считается N+1: предупреждение в логгере core.nplusone, а при RAISE
+# (включается в тестах, см. core.testing) — ошибка NPlusOneError.
+NPLUSONE_THRESHOLD = int(os.getenv("NPLUSONE_THRESHOLD", "5"))
+NPLUSONE_RAISE = False
+
+# Строка JSON на запрос в логгере core.metrics: INFO — каждый запрос,
+# WARNING — только медленные. Предупреждения о N+1 — в core.nplusone.
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "metrics": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "core.metrics": {
+            "handlers": ["metrics"],
+            "level": os.getenv("METRICS_LOG_LEVEL", "WARNING"),
+            "propagate": False,
+        },
+        "core.nplusone": {
+            "handlers": ["metrics"],
+            "level": "WARNING",
+            "propagate": False,
+        },
+    },
+}
@@ -0,0 +1,46 @@
+"""Профиль разработки: DJANGO_ENV=dev."""
+import os
+
+from .base import *  # noqa: F401,F403
+from .base import INSTALLED_APPS, MIDDLEWARE, TEMPLATES, template_loaders
+
+# SECURITY WARNING: don't run with debug turned on in production!
+DEBUG = True
+
+SECRET_KEY = os.getenv(
+    "SECRET_KEY", "*9a(hlbl_89p5w+topdsh@#t83r2l7cbt%dx7kkors82_58j4r"
+)
+
+ALLOWED_HOSTS = [
+    "localhost",
+    "127.0.0.1",
+    "[::1]",
+    "testserver",
+]
+
+INTERNAL_IPS = [
+    '127.0.0.1',
+]
+
+INSTALLED_APPS = [*INSTALLED_APPS, "debug_toolbar"]
+
+MIDDLEWARE = [
+    *MIDDLEWARE,
+    'debug_toolbar.middleware.DebugToolbarMiddleware',
+]
+
+# Правки шаблонов видны без перезапуска; TEMPLATES_CACHED=1 включает кеш.
+TEMPLATES_CACHED = os.getenv("TEMPLATES_CACHED", "0") == "1"
+TEMPLATES = [{
+    **TEMPLATES[0],
+    "OPTIONS": {
+        **TEMPLATES[0]["OPTIONS"],
+        "loaders": template_loaders(TEMPLATES_CACHED),
+    },
+}]
+
+# debug_toolbar ждёт APP_DIRS, но загрузчики шаблонов заданы явно.
+SILENCED_SYSTEM_CHECKS = ["debug_toolbar.W006"]
+
+# posts
+POSTS_THUMBNAIL_SYNC = True
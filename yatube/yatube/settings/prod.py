@@ -0,0 +1,29 @@
+"""Боевой профиль: DJANGO_ENV=prod."""
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .base import *  # noqa: F401,F403
+from .base import DATABASES, SECRET_KEY
+
+DEBUG = False
+
+if not SECRET_KEY:
+    raise ImproperlyConfigured("DJANGO_ENV=prod требует SECRET_KEY.")
+
+# Соединение с базой живёт между запросами DB_CONN_MAX_AGE секунд
+# (0 — закрывать после каждого запроса, как в dev).
+CONN_MAX_AGE = int(os.getenv("DB_CONN_MAX_AGE", 60))
+DATABASES = {
+    "default": {**DATABASES["default"], "CONN_MAX_AGE": CONN_MAX_AGE},
+}
+
+# SQLite: журнал WAL — чтения не ждут записи; synchronous=NORMAL в WAL
+# не теряет целостность, только последние транзакции при сбое питания;
+# кеш страниц 64 МБ (отрицательное значение — в КиБ) и mmap 256 МБ.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", -64000)),
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", 268435456)),
+}